@@ -32,4 +32,94 @@ END_DATE = '2024-12-31'
 
 # App settings
 DEFAULT_MAP_CENTER = [-6.8, 37.5]  # Approximate center of Tanzania
-DEFAULT_ZOOM = 7
\ No newline at end of file
+DEFAULT_ZOOM = 7
+
+# Annotation QC settings (spatial checks run when a polygon is drawn)
+QC_MAX_OVERLAP_PCT = 10       # % of drawn polygon overlapping another village
+QC_MIN_INSIDE_WARD_PCT = 90   # % of drawn polygon that should fall inside the selected ward
+QC_MIN_AREA_KM2 = 0.01
+QC_MAX_AREA_KM2 = 50
+QC_MIN_COMPACTNESS = 0.05     # Polsby-Popper score, 1.0 = circle
+
+# Geometry normalization at save time (labeling app) - drawn and imported polygons
+GEOMETRY_PRECISION_DEG = 1e-6  # coordinate grid in degrees, about 10 cm
+
+# Grid overlay settings (labeling app)
+GRID_OVERLAY_MAX_CELLS = 2500      # cell budget per map view
+GRID_OVERLAY_MIN_DETAIL_ZOOM = 13  # below this zoom, aggregated cells are shown
+
+# Local tile server (labeling app) - serves vector tiles and cached basemap tiles
+TILE_SERVER_HOST = "127.0.0.1"
+TILE_SERVER_PORT = 8765
+TILE_SERVER_PUBLIC_URL = None                      # URL browsers use to reach the tile server, default http://host:port
+
+# Vector tile settings (labeling app)
+USE_VECTOR_TILES = False                           # serve ward/grid/annotation layers as vector tiles
+VECTOR_TILE_FILE = "tiles/rubeho_layers.mbtiles"   # relative to data/processed
+VECTOR_TILE_MINZOOM = 6
+VECTOR_TILE_MAXZOOM = 14
+VECTOR_TILE_GRID_MINZOOM = 11                      # grid cells are only tiled from this zoom
+VECTOR_TILE_ANNOTATION_THRESHOLD = 1000            # above this many annotations, render them from tiles
+VECTOR_TILE_CACHE_TILES = 2048                     # encoded annotation tiles kept in memory (least recently used dropped)
+
+# Basemap tile cache settings (labeling app)
+USE_TILE_CACHE = False                             # serve basemaps through the local cache
+TILE_CACHE_FILE = "tiles/basemap_cache.sqlite"     # relative to data/processed
+TILE_CACHE_MAX_AGE_DAYS = 90
+BASEMAP_SOURCES = {
+    'osm': 'https://tile.openstreetmap.org/{z}/{x}/{y}.png',
+    'esri': 'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+    'google': 'https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}',
+}
+BASEMAP_PREFETCH_SOURCES = ['esri']                # check each provider's terms before bulk prefetching
+BASEMAP_PREFETCH_ZOOMS = list(range(10, 17))       # zoom levels used while labeling
+
+# Shared annotation cache (labeling app) - one upstream read serves all sessions
+ANNOTATION_CACHE_MAX_AGE_SECONDS = 60             # reload from Sheets when the shared copy is older than this
+
+# Google Sheets client (labeling app) - shared by all sessions
+SHEETS_RATE_PER_MINUTE = 60                       # sustained requests per minute (Sheets default quota per user)
+SHEETS_BURST = 10                                 # requests allowed back to back before throttling
+SHEETS_MAX_RETRIES = 5                            # retries on quota/server errors, with exponential backoff
+SHEETS_BACKOFF_MAX_SECONDS = 32
+
+# Annotation storage (labeling app)
+STORAGE_BACKEND = "sheets"                        # 'sheets', 'sqlite', 'geopackage' or 'duckdb'
+STORAGE_FILES = {                                 # local database per backend, relative to data/processed
+    'sqlite': "labeling/annotations.sqlite",
+    'geopackage': "labeling/annotations.gpkg",
+    'duckdb': "labeling/annotations.duckdb",
+}
+
+# Export of labeled treatment areas (relative to data/processed)
+EXPORT_GEOJSON_FILE = "treatment_areas_labeled.geojson"
+EXPORT_PARQUET_FILE = "treatment_areas_labeled.parquet"
+EXPORT_CHUNK_SIZE = 500                           # annotations held in memory at a time while exporting
+
+# Profiling (labeling app) - timings shown under "Show debug info"
+PROFILING_METRICS_FILE = "metrics/app_metrics.jsonl"   # relative to data/processed
+PROFILING_LOG_RERUNS = False                      # append every rerun's timings to the metrics file
+
+# Session snapshots (labeling app) - restore sessions after a reconnect or server restart
+USE_SESSION_SNAPSHOTS = True
+SESSION_SNAPSHOT_DIR = "labeling/sessions"        # relative to data/processed
+SESSION_SNAPSHOT_MAX_AGE_SECONDS = 7 * 86400       # pending drawings and map view are kept this long
+SNAPSHOT_SHARED_MAX_AGE_SECONDS = 900             # a restarted server trusts the persisted annotations and reference list this long
+
+# Rerun-latency benchmarks (labeling_app/benchmark_app.py) - median budgets per annotation count
+BENCHMARK_SIZES = [50, 1000, 10000]
+BENCHMARK_BUDGETS_MS = {                          # about twice the timings measured when set
+    50: {'first_paint': 1000, 'cold_start': 3000, 'ward_switch': 1000, 'draw_and_save': 1500, 'refresh': 1000, 'progress_tab': 250},
+    1000: {'first_paint': 1000, 'cold_start': 3000, 'ward_switch': 1000, 'draw_and_save': 2500, 'refresh': 1500, 'progress_tab': 250},
+    10000: {'first_paint': 1000, 'cold_start': 10000, 'ward_switch': 3000, 'draw_and_save': 10000, 'refresh': 8000, 'progress_tab': 500},
+}
+
+# Treatment rasterization (05_rasterize_treatment_areas.py) - labeled polygons burned onto the 500m/100m grids
+TREATMENT_RASTER_MODE = "fraction"                 # 'fraction' (covered share of each cell) or 'all_touched'
+TREATMENT_RASTER_SUPERSAMPLE = 10                  # sub-cells per cell side in fraction mode
+TREATMENT_RASTER_DIR = "rasters"                   # relative to data/processed
+
+# Spillover buffers (06_spillover_buffers.py) - control cells must lie this far from any treated cell
+SPILLOVER_BUFFER_RADII = [1000, 2000, 5000]        # metres, one eligibility mask per radius
+SPILLOVER_MAX_DISTANCE = 20000                     # metres; farther cells get distance inf (bounds the tile halo)
+SPILLOVER_TILE_CELLS = 2048                        # distance transform tile size in cells
@@ -1,14 +1,14 @@
-#imports
+#imports - only what the app shell needs; heavy libraries are imported once it is on screen
 import streamlit as st
-import pandas as pd
-import folium
-from streamlit_folium import st_folium
 from datetime import datetime
 from pathlib import Path
+import os
 import sys
-from folium import plugins
-from streamlit_gsheets import GSheetsConnection
+import time
 import json
+import threading
+
+rerun_start = time.perf_counter()
 
 # ============================================================================
 # PAGE CONFIG 
@@ -17,299 +17,542 @@ import json
 # Page config
 st.set_page_config(page_title="Treatment area mapping Rubeho CCT", layout="wide")
 
+# Add utils and project root (for config) to path - once, not again on every rerun
+APP_DIR = Path(__file__).resolve().parent
+for search_path in (str(APP_DIR), str(APP_DIR.parent)):
+    if search_path not in sys.path:
+        sys.path.append(search_path)
+# Headless runs (benchmarks, load tests) can point the app at another data directory
+DATA_DIR = Path(os.environ.get("LABELING_APP_DATA_DIR", APP_DIR.parent / "data"))
+
+from config.settings import (
+    TARGET_CRS, DEFAULT_MAP_CENTER, DEFAULT_ZOOM, QC_MAX_OVERLAP_PCT, QC_MIN_INSIDE_WARD_PCT,
+    QC_MIN_AREA_KM2, QC_MAX_AREA_KM2, QC_MIN_COMPACTNESS, GEOMETRY_PRECISION_DEG,
+    GRID_OVERLAY_MAX_CELLS, GRID_OVERLAY_MIN_DETAIL_ZOOM,
+    TILE_SERVER_HOST, TILE_SERVER_PORT, TILE_SERVER_PUBLIC_URL,
+    USE_VECTOR_TILES, VECTOR_TILE_FILE, VECTOR_TILE_MAXZOOM, VECTOR_TILE_ANNOTATION_THRESHOLD, VECTOR_TILE_CACHE_TILES,
+    USE_TILE_CACHE, TILE_CACHE_FILE, TILE_CACHE_MAX_AGE_DAYS, BASEMAP_SOURCES,
+    ANNOTATION_CACHE_MAX_AGE_SECONDS, SHEETS_RATE_PER_MINUTE, SHEETS_BURST, SHEETS_MAX_RETRIES,
+    SHEETS_BACKOFF_MAX_SECONDS, STORAGE_BACKEND, STORAGE_FILES,
+    EXPORT_GEOJSON_FILE, EXPORT_PARQUET_FILE, EXPORT_CHUNK_SIZE,
+    PROFILING_METRICS_FILE, PROFILING_LOG_RERUNS,
+    USE_SESSION_SNAPSHOTS, SESSION_SNAPSHOT_DIR, SESSION_SNAPSHOT_MAX_AGE_SECONDS, SNAPSHOT_SHARED_MAX_AGE_SECONDS
+)
+from utils.profiling import PROCESS_METRICS, MetricsRecorder, activate, record, timer, timed, count, export_metrics, export_rerun
+
+# Storage overrides for headless runs - another backend, or local worksheets instead of Google Sheets
+STORAGE_BACKEND = os.environ.get("LABELING_APP_STORAGE_BACKEND", STORAGE_BACKEND)
+FAKE_SHEETS_DIR = os.environ.get("LABELING_APP_FAKE_SHEETS")
+FAKE_SHEETS_LATENCY = float(os.environ.get("LABELING_APP_FAKE_SHEETS_LATENCY", 0))
+
+# ============================================================================
+# PROFILING
+# ============================================================================
+# Per-session timings; PROCESS_METRICS aggregates all sessions of this server
+if 'metrics' not in st.session_state:
+    st.session_state.metrics = MetricsRecorder()
+st.session_state.metrics.start_rerun()
+activate(st.session_state.metrics)
+METRICS_FILE = DATA_DIR / "processed" / PROFILING_METRICS_FILE
+
 # ============================================================================
-# GOOGLE SHEETS SETUP - OPTIMIZED
+# APP SHELL - on screen before any heavy import or data load
+# ============================================================================
+st.title("🌳 Treatment area mapping tool")
+
+# Create tabs
+tab1, tab2 = st.tabs(["🗺️ Mapping Interface", "📊 Progress Tracker"])
+loading_status = tab1.empty()
+if 'annotations' not in st.session_state:
+    loading_status.info("⏳ Loading map and annotations...")
+record('first_paint', time.perf_counter() - rerun_start)
+
+# Heavy libraries - the first session after a server restart pays for these, later reruns find them imported
+with timer('imports'):
+    import pandas as pd
+    import folium
+    from folium import plugins
+    from streamlit_folium import st_folium
+    from utils.progress import compute_progress
+    from utils.annotation_cache import SharedAnnotationCache
+    from utils.sheets_client import SheetsClient, GSheetsAppendAdapter
+    from utils.storage import create_store, new_annotation_id, ConflictError
+    from utils.startup import load_concurrently
+    from utils.reference_index import ReferenceIndex
+    from utils.geometry import normalize_annotation
+    from utils.session_snapshot import SnapshotStore, digest, new_session_id, valid_session_id
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# ============================================================================
+# STORAGE SETUP - OPTIMIZED
 # ============================================================================
 @st.cache_resource
 def init_gsheets():
-    return st.connection("gsheets", type=GSheetsConnection)
+    """Sheets connection behind a rate-limited, retrying client shared by all sessions"""
+    if FAKE_SHEETS_DIR:
+        # Benchmarks and load tests only - the fake is never imported in production
+        from utils.fake_sheets import FakeSheetsConnection
+        conn = FakeSheetsConnection.from_directory(FAKE_SHEETS_DIR, latency=FAKE_SHEETS_LATENCY)
+    else:
+        from streamlit_gsheets import GSheetsConnection
+        conn = GSheetsAppendAdapter(st.connection("gsheets", type=GSheetsConnection))
+    return SheetsClient(
+        conn,
+        rate_per_minute=SHEETS_RATE_PER_MINUTE,
+        burst=SHEETS_BURST,
+        max_retries=SHEETS_MAX_RETRIES,
+        backoff_max=SHEETS_BACKOFF_MAX_SECONDS
+    )
+
+@st.cache_resource
+def init_store():
+    """Annotation store for the configured backend (Google Sheets or a local database)"""
+    if STORAGE_BACKEND == 'sheets':
+        return create_store('sheets', sheets_client=init_gsheets())
+    return create_store(STORAGE_BACKEND, path=DATA_DIR / "processed" / STORAGE_FILES[STORAGE_BACKEND])
 
-def load_annotations_from_sheet():
-    """Load from sheet and cache in session state"""
+def load_annotations_from_store():
+    """Load from the store - returns None if it could not be read"""
     try:
-        df = conn.read(worksheet="Sheet1", ttl=0)
-        if df.empty or len(df) == 0:
-            return []
-        
-        annotations = []
-        for idx, row in df.iterrows():
-            ann = row.to_dict()
-            
-            # Handle geometry parsing - it's already a dict-like string from your sheet
-            if 'geometry' in ann and ann['geometry']:
-                geometry_value = ann['geometry']
-                
-                # Skip if it's NaN, None, or empty
-                if pd.isna(geometry_value) or str(geometry_value).strip() in ['', 'nan', 'None']:
-                    st.sidebar.warning(f"Row {idx}: Skipping - empty geometry")
-                    continue
-                
-                # If it's a string, try to parse it
-                if isinstance(geometry_value, str):
-                    try:
-                        # Your data appears to be dict-like strings, try json.loads first
-                        ann['geometry'] = json.loads(geometry_value)
-                    except json.JSONDecodeError:
-                        # If JSON fails, try ast.literal_eval for Python dict strings
-                        try:
-                            import ast
-                            ann['geometry'] = ast.literal_eval(geometry_value)
-                        except (ValueError, SyntaxError) as e:
-                            st.sidebar.error(f"Row {idx} ({ann.get('village_name', 'Unknown')}): Could not parse geometry - {str(e)[:100]}")
-                            continue
-                elif isinstance(geometry_value, dict):
-                    # Already a dict, use as-is
-                    ann['geometry'] = geometry_value
-                else:
-                    st.sidebar.warning(f"Row {idx}: Unexpected geometry type: {type(geometry_value)}")
-                    continue
-            else:
-                # Skip rows without geometry
-                st.sidebar.warning(f"Row {idx}: No geometry column found")
-                continue
-            
-            # Handle boolean conversion for is_treatment
-            if 'is_treatment' in ann:
-                ann['is_treatment'] = str(ann['is_treatment']).strip().upper() in ['TRUE', 'YES', '1', 'T']
-            
-            annotations.append(ann)
-        
-        st.sidebar.success(f"✅ Loaded {len(annotations)} annotations from Sheet1")
+        with timer('store.load_annotations'):
+            annotations, problems = store.load_annotations()
+        for problem in problems:
+            st.sidebar.warning(problem)
+        st.sidebar.success(f"✅ Loaded {len(annotations)} annotations from {store.name}")
         return annotations
         
     except Exception as e:
-        st.sidebar.error(f"Could not load from Google Sheets: {e}")
+        st.sidebar.error(f"Could not load from {store.name}: {e}")
         import traceback
         st.sidebar.code(traceback.format_exc())
-        return []
+        return None
 
-def load_reference_villages_from_sheet():
-    """Load the reference list of treatment villages from Sheet2"""
+@timed('store.load_reference_villages')
+def load_reference_villages_from_store():
+    """Load the reference list of treatment villages"""
     try:
-        df = conn.read(worksheet="ReferenceVillages", ttl=0)
-        if df.empty or len(df) == 0:
-            return None
-        # Normalize: strip whitespace and ensure consistent column names
-        df.columns = df.columns.str.strip().str.lower()
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                df[col] = df[col].str.strip()
-        return df
+        return store.load_reference_villages()
     except Exception as e:
-        st.sidebar.warning(f"Could not load reference villages from Google Sheets: {e}")
+        st.sidebar.warning(f"Could not load reference villages from {store.name}: {e}")
         return None
 
 def is_village_already_mapped(village_name, ward_name):
-    """Check in session state instead of reading from sheet - OPTIMIZED"""
+    """Check in session state instead of reading from the store - OPTIMIZED"""
     return any(
         ann.get('village_name') == village_name and 
         ann.get('ward_name') == ward_name 
         for ann in st.session_state.annotations
     )
 
-def save_annotation_to_sheet(annotation):
-    """Save to sheet - reads once, writes once - OPTIMIZED"""
+def save_annotation_to_store(annotation):
+    """Save to the store - appends only, so concurrent saves never overwrite each other - OPTIMIZED"""
     try:
-        annotation_copy = annotation.copy()
-        annotation_copy['geometry'] = json.dumps(annotation_copy['geometry'])
-        
-        # Read current data
-        df = conn.read(worksheet="Sheet1", ttl=0)
-        new_row = pd.DataFrame([annotation_copy])
-        
-        if df.empty:
-            df = new_row
-        else:
-            df = pd.concat([df, new_row], ignore_index=True)
+        store.add_annotation(annotation)
         
-        # Write back
-        conn.update(worksheet="Sheet1", data=df)
-        
-        # Update session state immediately without re-reading - SAVES 1 API CALL
-        st.session_state.annotations.append(annotation)
+        # Update the shared cache immediately without re-reading - SAVES 1 API CALL
+        annotation_cache.add(annotation)
+        mark_annotations_changed()
         
         return True, "Saved successfully"
+    except ConflictError as e:
+        # Someone else won - pick up their change so this session sees it
+        refresh_annotations()
+        return False, f"Conflict: {e}"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
-def delete_annotation_from_sheet(village_name, ward_name):
-    """Delete from sheet - reads once, writes once - OPTIMIZED"""
+def delete_annotation_from_store(annotation):
+    """Delete the revision of an annotation this session has seen - OPTIMIZED"""
     try:
-        df = conn.read(worksheet="Sheet1", ttl=0)
-        df = df[~((df['village_name'] == village_name) & (df['ward_name'] == ward_name))]
-        conn.update(worksheet="Sheet1", data=df)
+        store.delete_annotation(annotation)
         
-        # Update session state immediately without re-reading - SAVES 1 API CALL
-        st.session_state.annotations = [
-            ann for ann in st.session_state.annotations 
-            if not (ann.get('village_name') == village_name and ann.get('ward_name') == ward_name)
-        ]
+        # Update the shared cache immediately without re-reading - SAVES 1 API CALL
+        annotation_cache.remove(annotation['annotation_id'])
+        mark_annotations_changed()
         
         return True
+    except ConflictError as e:
+        refresh_annotations()
+        st.warning(f"Not deleted - {e}")
+        return False
     except Exception as e:
         st.error(f"Error deleting: {e}")
         return False
 
 try:
-    conn = init_gsheets()
-    sheets_available = True
+    store = init_store()
+    store_available = True
 except Exception as e:
-    st.sidebar.error(f"Google Sheets not available: {e}")
-    sheets_available = False
+    st.sidebar.error(f"Annotation storage ({STORAGE_BACKEND}) not available: {e}")
+    store_available = False
 # ============================================================================
 # GEOSPATIAL DATA SETUP
 # ============================================================================
 
-# Add utils to path
-sys.path.append(str(Path(__file__).parent))
+# Map layers only need folium, so the map still works in basic mode
+from utils.map_layers import (
+    build_annotation_feature_collection, create_annotation_layer, create_grid_layer, create_vector_tile_layer
+)
 
 try:
     from utils.map_utils import DataLoader
+    from utils.validation import AnnotationValidator, project_ward_geometries
+    from utils.grid_overlay import GridOverlay
+    from utils.ward_context import build_ward_contexts, treatment_ward_names, WARD_TOOLTIP_FIELDS
+    from utils.importer import SUPPORTED_EXTENSIONS, read_uploaded_file, plan_import, commit_import
 
     # Initialize data loader
-    DATA_DIR = Path(__file__).parent.parent / "data"
     data_loader = DataLoader(DATA_DIR)
     
-    # Load geospatial data with better error handling
+    # Wards and village lists are independent files - loaded in parallel at startup
+    # The grid is not loaded here - it is served viewport-culled by get_grid_overlay()
     @st.cache_data
-    def load_all_geospatial_data():
-        """Load all geospatial data with proper error handling"""
-        results = {'grid': None, 'wards': None, 'villages': {}}
-        results['grid'] = None
-       
+    def load_ward_layers():
+        """Ward boundaries plus per-ward bounds, view and serialized layers"""
         try:
-            results['wards'] = data_loader.load_ward_data()
+            wards = data_loader.load_ward_data()
+            return wards, build_ward_contexts(wards)
         except Exception as e:
             st.sidebar.warning(f"Ward data not available: {e}")
-        
+            return None, {}
+    
+    @st.cache_data
+    def load_village_lists():
+        """Treatment village lists from the coverage plan (fallback for the reference list)"""
         try:
-            results['villages'] = data_loader.load_village_lists()
+            return data_loader.load_village_lists()
         except Exception as e:
             st.sidebar.warning(f"Village data not available: {e}")
-        
-        return results
+            return {}
     
-    # Load all data
-    geospatial_data = load_all_geospatial_data()
-    ward_gdf = geospatial_data['wards']
-    village_data = geospatial_data['villages']
+    @st.cache_resource
+    def get_grid_overlay():
+        """Grid cells with spatial indexes per zoom level - shared across sessions"""
+        try:
+            grid_gdf = data_loader.load_grid_data()
+        except Exception as e:
+            st.sidebar.warning(f"Grid data not available: {e}")
+            return None
+        return GridOverlay(
+            grid_gdf,
+            max_cells=GRID_OVERLAY_MAX_CELLS,
+            min_detail_zoom=GRID_OVERLAY_MIN_DETAIL_ZOOM
+        )
+    
+    @st.cache_resource
+    def get_tile_server():
+        """Local tile endpoint for vector tiles (wards/grid/annotations) and cached basemap tiles"""
+        if not (USE_VECTOR_TILES or USE_TILE_CACHE):
+            return None
+        from utils.tile_server import TileServer
+        server = TileServer(TILE_SERVER_HOST, TILE_SERVER_PORT)
+
+        if USE_VECTOR_TILES:
+            tile_file = DATA_DIR / "processed" / VECTOR_TILE_FILE
+            if tile_file.exists():
+                from utils.vector_tiles import MBTilesReader, VectorTileSource
+                server.add_source('layers', MBTilesReader(tile_file))
+                server.add_source('annotations', VectorTileSource(max_cached_tiles=VECTOR_TILE_CACHE_TILES))
+            else:
+                st.sidebar.warning(f"Vector tiles not found: {tile_file.name} - run 03_build_vector_tiles.py")
+
+        if USE_TILE_CACHE:
+            from utils.tile_cache import TileCache
+            tile_cache = TileCache(DATA_DIR / "processed" / TILE_CACHE_FILE, BASEMAP_SOURCES, max_age_days=TILE_CACHE_MAX_AGE_DAYS)
+            for source in BASEMAP_SOURCES:
+                server.add_source(f"basemap-{source}", tile_cache.provider(source))
+
+        if not server.sources:
+            return None
+        try:
+            return server.start()
+        except OSError as e:
+            st.sidebar.warning(f"Could not start tile server: {e}")
+            return None
+    
+    geospatial_available = True
  
 except ImportError as e:
     st.error(f"Could not import map utilities: {e}")
     st.info("Running in basic mode without geospatial features")
+    geospatial_available = False
     grid_gdf = None
     ward_gdf = None
+    ward_contexts = {}
     village_data = {}
+    AnnotationValidator = None
+    plan_import = None
+    get_grid_overlay = lambda: None
+    get_tile_server = lambda: None
+
+# ============================================================================
+# SESSION SNAPSHOTS - survive reconnects and server restarts
+# ============================================================================
+@st.cache_resource
+def get_snapshot_store():
+    """Local snapshots of the shared annotation set, the reference list and each session"""
+    if not USE_SESSION_SNAPSHOTS:
+        return None
+    snapshots = SnapshotStore(DATA_DIR / "processed" / SESSION_SNAPSHOT_DIR, max_age_seconds=SESSION_SNAPSHOT_MAX_AGE_SECONDS)
+    snapshots.prune(prefix='session-')
+    return snapshots
+
+snapshots = get_snapshot_store()
+ANNOTATIONS_SNAPSHOT = f"annotations-{STORAGE_BACKEND}"
+REFERENCE_SNAPSHOT = f"reference-{STORAGE_BACKEND}"
+
+# A session is recognized after a reconnect or restart by the sid in its URL
+if snapshots is not None and not valid_session_id(st.query_params.get('sid')):
+    st.query_params['sid'] = new_session_id()
+# No session snapshot without a sid of its own - never a key shared by all sessions
+SESSION_SNAPSHOT = (
+    f"session-{st.query_params['sid']}"
+    if snapshots is not None and valid_session_id(st.query_params.get('sid')) else None
+)
+
+def restore_session_snapshot():
+    """Pending drawing of this sid from before a reconnect or restart; returns its map view"""
+    data, _ = snapshots.load(SESSION_SNAPSHOT) if SESSION_SNAPSHOT is not None else (None, None)
+    if data is None:
+        return {}
+    pending = data.get('pending_annotation')
+    # Skip a drawing that was saved after the snapshot was taken
+    saved_ids = {ann.get('annotation_id') for ann in st.session_state.annotations}
+    if pending and pending.get('annotation_id') not in saved_ids:
+        # Snapshots from before annotation ids have none - it gets one like a new drawing
+        st.session_state['pending_annotation'] = {'annotation_id': new_annotation_id(), 'revision': 0, **pending}
+    if data.get('consumed_drawing_key'):
+        st.session_state['consumed_drawing_key'] = data['consumed_drawing_key']
+    return data.get('view') or {}
+
+def save_snapshots(view):
+    """Persist what changed since the last snapshot - the annotation set is written in the background"""
+    if store_available and annotation_cache.loaded_at is not None:
+        version, annotations = annotation_cache.snapshot()
+        snapshots.save_in_background(ANNOTATIONS_SNAPSHOT, annotations, token=version)
+    reference_df = st.session_state.reference_villages
+    if reference_df is not None and st.session_state.get('snapshot_reference_version') != st.session_state.reference_version:
+        snapshots.save(REFERENCE_SNAPSHOT, reference_df.to_dict(orient='split', index=False))
+        st.session_state.snapshot_reference_version = st.session_state.reference_version
+    if SESSION_SNAPSHOT is not None:
+        snapshots.save(SESSION_SNAPSHOT, {
+            'pending_annotation': st.session_state.get('pending_annotation'),
+            'consumed_drawing_key': st.session_state.get('consumed_drawing_key'),
+            'view': view,
+        })
 
 # ============================================================================
 # SESSION STATE INITIALIZATION
 # ============================================================================
-if 'annotations' not in st.session_state:
-    if sheets_available:
-        st.session_state.annotations = load_annotations_from_sheet()
-    else:
-        st.session_state.annotations = []
+@st.cache_resource
+def get_annotation_cache():
+    """Annotation set shared by all sessions - one Sheets read serves every labeler"""
+    cache = SharedAnnotationCache(max_age_seconds=ANNOTATION_CACHE_MAX_AGE_SECONDS)
+    # After a server restart, start from the persisted set if it is recent enough. It is
+    # served right away; if it is older than the cache max age it is reloaded in the background
+    if snapshots is not None:
+        annotations, saved_at = snapshots.load(ANNOTATIONS_SNAPSHOT, max_age_seconds=SNAPSHOT_SHARED_MAX_AGE_SECONDS)
+        if annotations is not None and cache.seed(annotations, loaded_at=saved_at):
+            snapshots.remember(ANNOTATIONS_SNAPSHOT, cache.version)
+            if store_available and cache.is_stale():
+                cache.refresh_in_background(load_annotations_in_background)
+    return cache
+
+def load_annotations():
+    """Upstream loader for the shared cache"""
+    return load_annotations_from_store() if store_available else []
+
+def load_annotations_in_background():
+    """Upstream loader for refreshes outside a rerun - no page to report problems on"""
+    try:
+        with timer('store.load_annotations'):
+            return store.load_annotations()[0]
+    except Exception:
+        return None
+
+annotation_cache = get_annotation_cache()
+
+# annotations_version is the shared cache version - it changes whenever any session
+# saves, deletes or refreshes, so derived state (QC index, layers) can be reused until then
+def sync_annotations(snapshot):
+    """Point this session at a snapshot of the shared cache"""
+    st.session_state.annotations_version, st.session_state.annotations = snapshot
+
+def mark_annotations_changed():
+    """Pick up the latest shared snapshot after a change to the annotation set"""
+    sync_annotations(annotation_cache.snapshot())
+
+def refresh_annotations():
+    """Reload the shared annotation set from the database"""
+    sync_annotations(annotation_cache.refresh(load_annotations))
+
+# Bumped whenever the reference village list is reloaded
+if 'reference_version' not in st.session_state:
+    st.session_state.reference_version = 0
+
+def mark_reference_changed():
+    """Invalidate everything derived from the reference village list"""
+    st.session_state.reference_version += 1
+
+# ============================================================================
+# STARTUP LOADING - independent sources fetched concurrently
+# ============================================================================
+script_run_ctx = get_script_run_ctx()
+
+def attach_script_context():
+    """Let a loader thread write to this session's page and use st caches"""
+    add_script_run_ctx(threading.current_thread(), script_run_ctx)
+
+# The reference list of a restarted server comes from its snapshot while that is recent
+if 'reference_villages' not in st.session_state and snapshots is not None:
+    reference_data, _ = snapshots.load(REFERENCE_SNAPSHOT, max_age_seconds=SNAPSHOT_SHARED_MAX_AGE_SECONDS)
+    if reference_data is not None:
+        snapshots.remember(REFERENCE_SNAPSHOT, digest(reference_data))
+        st.session_state.reference_villages = pd.DataFrame(reference_data['data'], columns=reference_data['columns'])
 
+startup_loaders = {'annotations': lambda: annotation_cache.get(load_annotations)}
+if geospatial_available:
+    startup_loaders['wards'] = load_ward_layers
+    startup_loaders['villages'] = load_village_lists
 if 'reference_villages' not in st.session_state:
-    if sheets_available:
-        st.session_state.reference_villages = load_reference_villages_from_sheet()
-    else:
-        st.session_state.reference_villages = None
+    startup_loaders['reference_villages'] = load_reference_villages_from_store if store_available else lambda: None
+
+startup = load_concurrently(startup_loaders, thread_setup=attach_script_context)
+sync_annotations(startup['annotations'])
+if geospatial_available:
+    ward_gdf, ward_contexts = startup['wards']
+    village_data = startup['villages']
+if 'reference_villages' in startup:
+    st.session_state.reference_villages = startup['reference_villages']
+# First run of this session - pick up where the sid left off
+if 'restored_view' not in st.session_state:
+    st.session_state.restored_view = restore_session_snapshot()
+restored_view = st.session_state.restored_view
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
+def get_reference_index():
+    """Normalized village/ward lookups, rebuilt only when the reference list version changes"""
+    cached = st.session_state.get('reference_index')
+    if cached is None or cached[0] != st.session_state.reference_version:
+        if st.session_state.reference_villages is not None:
+            index = ReferenceIndex.from_dataframe(st.session_state.reference_villages)
+        elif village_data and 'treatment_villages' in village_data:
+            # Fallback to the coverage plan JSON
+            index = ReferenceIndex.from_village_strings(village_data['treatment_villages'])
+        else:
+            index = None
+        cached = (st.session_state.reference_version, index)
+        st.session_state.reference_index = cached
+    return cached[1]
+
 def filter_villages_for_ward(selected_ward):
-    """Filter villages for the selected ward - TREATMENT ONLY"""
+    """Treatment villages of the selected ward - a dictionary lookup in the reference index"""
     if selected_ward == 'All Treatment Wards':
         return []
+    index = get_reference_index()
+    return index.villages_in_ward(selected_ward) if index is not None else []
+
+@st.cache_resource
+def get_ward_geometries():
+    """Ward boundaries projected to metres - shared across sessions"""
+    return project_ward_geometries(ward_gdf, TARGET_CRS)
+
+def get_annotation_validator():
+    """Session validator with a spatial index over the current annotation set"""
+    if AnnotationValidator is None:
+        return None
+    if 'validator' not in st.session_state:
+        st.session_state.validator = AnnotationValidator(
+            get_ward_geometries(),
+            TARGET_CRS,
+            max_overlap_pct=QC_MAX_OVERLAP_PCT,
+            min_inside_ward_pct=QC_MIN_INSIDE_WARD_PCT,
+            min_area_km2=QC_MIN_AREA_KM2,
+            max_area_km2=QC_MAX_AREA_KM2,
+            min_compactness=QC_MIN_COMPACTNESS,
+        )
+    validator = st.session_state.validator
+    validator.reference_index = get_reference_index()
+    validator.index_annotations(st.session_state.annotations, st.session_state.annotations_version)
+    return validator
+
+def paginate(df, key, page_size=50):
+    """Render page controls when needed and return the rows of the current page"""
+    n_pages = max(1, -(-len(df) // page_size))
+    if n_pages == 1:
+        return df
+    col_page, col_info = st.columns([1, 3])
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"page_{key}")
+    with col_info:
+        st.caption(f"Page {page} of {n_pages} ({len(df)} rows)")
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+def get_progress():
+    """Progress rollups, recomputed only when the annotation set or reference list version changes"""
+    versions = (st.session_state.annotations_version, st.session_state.reference_version)
+    cached = st.session_state.get('progress')
+    if cached is None or cached[0] != versions:
+        progress = compute_progress(st.session_state.reference_villages, st.session_state.annotations, get_reference_index())
+        cached = (versions, progress)
+        st.session_state.progress = cached
+    return cached[1]
+
+def get_annotation_features():
+    """Combined annotation FeatureCollection, rebuilt only when the annotation set version changes"""
+    cached = st.session_state.get('annotation_features')
+    if cached is None or cached[0] != st.session_state.annotations_version:
+        features = build_annotation_feature_collection(st.session_state.annotations)
+        count('bytes.annotation_features', len(json.dumps(features)))
+        cached = (st.session_state.annotations_version, features)
+        st.session_state.annotation_features = cached
+    return cached[1]
+
+def get_map_view(selected_ward):
+    """Center and zoom for the selected ward, looked up in the precomputed ward contexts"""
+    ward_context = ward_contexts.get(selected_ward) or ward_contexts.get('All Treatment Wards')
+    if ward_context is None:
+        return DEFAULT_MAP_CENTER, DEFAULT_ZOOM
+    return ward_context['center'], ward_context['zoom']
+
+@timed('create_map')
+def create_base_map():
+    """Base map with tiles and drawing tools.
     
-    if st.session_state.reference_villages is not None:
-        # Use Google Sheet reference data
-        df = st.session_state.reference_villages
-        ward_villages = df[
-            df['ward_name'].str.strip().str.upper() == selected_ward.strip().upper()
-        ]
-        return ward_villages['village_name'].tolist()
-    elif village_data and 'treatment_villages' in village_data:
-        # Fallback to JSON method
-        ward_info = ward_gdf[ward_gdf['ward_name'] == selected_ward]
-        if ward_info.empty:
-            return []
-        
-        ward_district = ward_info.iloc[0]['dist_name']
-        treatment_villages = []
-        for village in village_data['treatment_villages']:
-            if selected_ward in village and ward_district in village:
-                village_name = village.split(' village in')[0]
-                treatment_villages.append(village_name)
-        return treatment_villages
-    
-    return []
-
-def create_map(selected_ward, annotations):
-    """Create the folium map with all layers"""
-    
-    # Determine map center and zoom
-    if ward_gdf is not None and selected_ward not in ['All Treatment Wards']:
-        ward_subset = ward_gdf[ward_gdf['ward_name'] == selected_ward]
-        if not ward_subset.empty:
-            bounds = ward_subset.total_bounds
-            center_lat = (bounds[1] + bounds[3]) / 2
-            center_lon = (bounds[0] + bounds[2]) / 2
-            zoom = 13
-        else:
-            bounds = ward_gdf.total_bounds
-            center_lat = (bounds[1] + bounds[3]) / 2
-            center_lon = (bounds[0] + bounds[2]) / 2
-            zoom = 9
-    elif ward_gdf is not None and selected_ward == 'All Treatment Wards':
-        bounds = ward_gdf.total_bounds
-        center_lat = (bounds[1] + bounds[3]) / 2
-        center_lon = (bounds[0] + bounds[2]) / 2
-        zoom = 10
-    else:
-        center_lat = -6.0
-        center_lon = 35.0
-        zoom = 6
-    
+    Kept identical on every rerun so st_folium keeps the component mounted;
+    ward and annotation layers are pushed separately as feature groups.
+    """
     m = folium.Map(
-        location=[center_lat, center_lon],
-        zoom_start=zoom,
+        location=DEFAULT_MAP_CENTER,
+        zoom_start=DEFAULT_ZOOM,
         tiles=None
     )
 
-    # Add tile layers
-    folium.TileLayer(tiles='OpenStreetMap', name='OpenStreetMap', control=True).add_to(m)
+    # Add tile layers - through the local tile cache when enabled, otherwise straight from the providers
+    tile_server = get_tile_server()
+    use_cache = tile_server is not None and 'basemap-osm' in tile_server.sources
+
+    def basemap_url(source):
+        if use_cache:
+            return tile_server.url_template(f"basemap-{source}", TILE_SERVER_PUBLIC_URL, extension='png')
+        return BASEMAP_SOURCES[source]
+
+    folium.TileLayer(
+        tiles=basemap_url('osm'),
+        attr='&copy; OpenStreetMap contributors', name='OpenStreetMap', control=True
+    ).add_to(m)
     folium.TileLayer(
-        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        tiles=basemap_url('esri'),
         attr='ESRI', name='ESRI Satellite', control=True
     ).add_to(m)
     folium.TileLayer(
-        tiles='https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}',
+        tiles=basemap_url('google'),
         attr='Google', name='Google Satellite', control=True, show=True
     ).add_to(m)
 
-    # Add ward boundaries
-    if ward_gdf is not None:
-        if selected_ward == 'All Treatment Wards':
-            target_ward_gdf = ward_gdf[ward_gdf['is_treatment'] == True]
-            if not target_ward_gdf.empty:
-                folium.GeoJson(
-                    target_ward_gdf,
-                    style_function=lambda x: {'color': 'red', 'weight': 2, 'fillOpacity': 0.1, 'opacity': 0.7, 'dashArray': '5,5'},
-                    tooltip=folium.GeoJsonTooltip(fields=['ward_name', 'dist_name', 'reg_name'], aliases=['Ward:', 'District:', 'Region:']),
-                    name='Ward Boundaries'
-                ).add_to(m)
-        else:
-            selected_ward_gdf = ward_gdf[ward_gdf['ward_name'] == selected_ward]
-            if not selected_ward_gdf.empty:
-                folium.GeoJson(
-                    selected_ward_gdf,
-                    style_function=lambda x: {'color': 'yellow', 'weight': 2, 'fillOpacity': 0, 'opacity': 0.7, 'dashArray': '5,5'},
-                    tooltip=folium.GeoJsonTooltip(fields=['ward_name', 'dist_name', 'reg_name'], aliases=['Ward:', 'District:', 'Region:']),
-                    name='Ward Boundary'
-                ).add_to(m)
-    
     # Add drawing tools
     draw = plugins.Draw(
         export=True,
@@ -317,35 +560,169 @@ def create_map(selected_ward, annotations):
         edit_options={'edit': False}
     )
     draw.add_to(m)
-
-    # Add existing annotations
-    for ann in annotations:
-        if 'geometry' in ann:
-            color = 'red' if ann.get('is_treatment', False) else 'blue'
-            folium.GeoJson(
-                ann['geometry'],
-                style_function=lambda x, color=color: {'fillColor': color, 'color': color, 'weight': 2, 'fillOpacity': 0.3},
-                popup=folium.Popup(f"<b>{ann.get('village_name', 'Unknown')}</b><br>Type: {ann.get('village_type', 'Unknown')}<br>Ward: {ann.get('ward_name', 'Unknown')}"),
-                tooltip=f"{ann.get('village_name', 'Unknown')} ({ann.get('village_type', 'Unknown')})"
-            ).add_to(m)
-
-    folium.LayerControl(position='topright', collapsed=False).add_to(m)
     return m
 
+def create_grid_features(selected_ward):
+    """Grid cells for the current map viewport, taken from the map state of the previous rerun"""
+    grid_overlay = get_grid_overlay()
+    if grid_overlay is None:
+        return None, None
+
+    map_state = st.session_state.get('labeling_map') or {}
+    viewport = map_state.get('bounds') or {}
+    south_west = viewport.get('_southWest') or {}
+    north_east = viewport.get('_northEast') or {}
+    if None not in (south_west.get('lng'), south_west.get('lat'), north_east.get('lng'), north_east.get('lat')):
+        bounds = (south_west['lng'], south_west['lat'], north_east['lng'], north_east['lat'])
+        zoom = map_state.get('zoom')
+    else:
+        # First render - no viewport reported yet, use the ward view
+        ward_context = ward_contexts.get(selected_ward) or ward_contexts.get('All Treatment Wards')
+        if ward_context is None:
+            return None, None
+        bounds = ward_context['bounds']
+        zoom = ward_context['zoom']
+    with timer('grid_cells_in_view'):
+        grid_features, grid_info = grid_overlay.cells_in_view(bounds, zoom)
+    if grid_features:
+        count('bytes.grid_features', len(json.dumps(grid_features)))
+    return grid_features, grid_info
+
+def get_annotation_tile_url(tile_server):
+    """Tile URL for the annotation layer, refreshing the shared tile source when the shared annotation set changes"""
+    source = tile_server.sources['annotations']
+    # The source is shared by all sessions, so it follows the shared cache rather than this
+    # session's copy; a session still on an older version gets the newer tiles
+    version, annotations = annotation_cache.snapshot()
+    if getattr(source, 'cache_version', None) != version:
+        # A refresh publishes a new version with the same content - only re-encode on real changes
+        fingerprint = hash(tuple((ann.get('annotation_id'), ann.get('revision')) for ann in annotations))
+        if getattr(source, 'fingerprint', None) != fingerprint:
+            from shapely.geometry import shape
+            annotations = [ann for ann in annotations if ann.get('geometry')]
+            source.add_layer(
+                'annotations',
+                [shape(ann['geometry']) for ann in annotations],
+                [{'village_name': ann.get('village_name'), 'ward_name': ann.get('ward_name'),
+                  'is_treatment': bool(ann.get('is_treatment', False))} for ann in annotations],
+            )
+            source.fingerprint = fingerprint
+        source.cache_version = version
+    # The version parameter makes the browser drop tiles of older annotation sets
+    return tile_server.url_template('annotations', TILE_SERVER_PUBLIC_URL) + f"?v={source.version}"
+
+@timed()
+def create_map_layers(selected_ward, annotation_features, grid_features=None, show_grid=False):
+    """Feature groups that change between reruns (grid, ward boundaries and annotations)"""
+    layers = []
+
+    # Vector tiles for all wards and the grid, fetched by the browser per visible tile
+    tile_server = get_tile_server()
+    if tile_server is not None and 'layers' in tile_server.sources:
+        tile_layer = folium.FeatureGroup(name='Wards & Grid (tiles)')
+        create_vector_tile_layer(
+            tile_server.url_template('layers', TILE_SERVER_PUBLIC_URL),
+            name='Wards & Grid (tiles)',
+            visible_layers=['wards', 'grid'] if show_grid else ['wards'],
+            all_layers=['wards', 'grid'],
+            max_native_zoom=VECTOR_TILE_MAXZOOM
+        ).add_to(tile_layer)
+        layers.append(tile_layer)
+
+    # Add grid cells below the ward and annotation layers
+    if grid_features and grid_features['features']:
+        grid_layer = folium.FeatureGroup(name='500m Grid')
+        create_grid_layer(grid_features).add_to(grid_layer)
+        layers.append(grid_layer)
+
+    # Add ward boundaries from the pre-serialized ward context
+    ward_context = ward_contexts.get(selected_ward)
+    if ward_context is not None and ward_context['geojson']:
+        if selected_ward == 'All Treatment Wards':
+            ward_layer = folium.FeatureGroup(name='Ward Boundaries')
+            ward_style = lambda x: {'color': 'red', 'weight': 2, 'fillOpacity': 0.1, 'opacity': 0.7, 'dashArray': '5,5'}
+        else:
+            ward_layer = folium.FeatureGroup(name='Ward Boundary')
+            ward_style = lambda x: {'color': 'yellow', 'weight': 2, 'fillOpacity': 0, 'opacity': 0.7, 'dashArray': '5,5'}
+        folium.GeoJson(
+            ward_context['geojson'],
+            style_function=ward_style,
+            tooltip=folium.GeoJsonTooltip(fields=WARD_TOOLTIP_FIELDS, aliases=['Ward:', 'District:', 'Region:'])
+        ).add_to(ward_layer)
+        layers.append(ward_layer)
+
+    # Large annotation sets come from the tile server, small ones keep GeoJSON popups
+    if (tile_server is not None and 'annotations' in tile_server.sources
+            and len(st.session_state.annotations) > VECTOR_TILE_ANNOTATION_THRESHOLD):
+        annotation_layer = folium.FeatureGroup(name='Mapped Villages')
+        create_vector_tile_layer(
+            get_annotation_tile_url(tile_server),
+            name='Mapped Villages',
+            visible_layers=['annotations'],
+            all_layers=['annotations'],
+            max_native_zoom=VECTOR_TILE_MAXZOOM
+        ).add_to(annotation_layer)
+        layers.append(annotation_layer)
+    # Add existing annotations as one combined layer
+    elif annotation_features and annotation_features['features']:
+        annotation_layer = folium.FeatureGroup(name='Mapped Villages')
+        create_annotation_layer(annotation_features).add_to(annotation_layer)
+        layers.append(annotation_layer)
+
+    return layers
+
+def render_debug_panel():
+    """Sidebar profiling panel - rerun breakdown, latency percentiles and API counters"""
+    metrics = st.session_state.metrics
+    with st.sidebar.expander("⏱️ Previous rerun", expanded=True):
+        steps = sorted(metrics.previous_rerun.items(), key=lambda item: -item[1])
+        st.dataframe(pd.DataFrame([{'step': name, 'ms': round(seconds * 1000, 1)} for name, seconds in steps]), hide_index=True)
+    with st.sidebar.expander("Latency - this session"):
+        st.dataframe(pd.DataFrame(metrics.summary()), hide_index=True)
+    with st.sidebar.expander("Latency - all sessions"):
+        st.dataframe(pd.DataFrame(PROCESS_METRICS.summary()), hide_index=True)
+    with st.sidebar.expander("API calls & bytes"):
+        counters = {f"session.{name}": value for name, value in metrics.counters.items()}
+        counters.update({f"process.{name}": value for name, value in PROCESS_METRICS.counters.items()})
+        sheets_client = getattr(store, 'client', None) if store_available else None
+        if sheets_client is not None:
+            counters.update({f"sheets.{name}": value for name, value in sheets_client.stats.items()})
+        counters.update({f"annotation_cache.{name}": value for name, value in annotation_cache.stats.items()})
+        if snapshots is not None:
+            counters.update({f"snapshots.{name}": value for name, value in snapshots.stats.items()})
+        st.dataframe(pd.DataFrame(list(counters.items()), columns=['counter', 'value']), hide_index=True)
+    if st.sidebar.button("💾 Write metrics to file"):
+        export_metrics(METRICS_FILE, {'session': metrics, 'process': PROCESS_METRICS})
+        st.sidebar.success(f"Appended to {METRICS_FILE.name}")
+
+    st.sidebar.write("Available files:")
+    for file in data_loader.get_available_files():
+        st.sidebar.write(f"- {file.name}")
+
+def drawing_key(geometry):
+    """Stable identifier for a drawn geometry"""
+    return json.dumps(geometry, sort_keys=True)
+
+def clear_pending_annotation():
+    """Drop the pending annotation and remember its drawing so it is not picked up again"""
+    pending = st.session_state.pop('pending_annotation', None)
+    if pending:
+        st.session_state['consumed_drawing_key'] = pending.get('drawing_key') or drawing_key(pending['geometry'])
+
 
 
 # ============================================================================
 # MAIN APP LAYOUT
 # ============================================================================
-st.title("🌳 Treatment area mapping tool")
-
-# Create tabs
-tab1, tab2 = st.tabs(["🗺️ Mapping Interface", "📊 Progress Tracker"])
+# Title and tabs are rendered in the app shell above
+loading_status.empty()
 
 # ============================================================================
 # TAB 1: MAPPING INTERFACE
 # ============================================================================
 with tab1:
+    tab_start = time.perf_counter()
+    
     # Handle navigation from Progress Tracker tab
     ward_from_params = None
     village_from_params = None
@@ -368,8 +745,7 @@ with tab1:
     # Sidebar navigation
     if ward_gdf is not None:
         st.sidebar.header("Navigation")
-        treatment_wards = ward_gdf[ward_gdf['is_treatment'] == True]['ward_name'].unique()
-        ward_options = ['All Treatment Wards'] + sorted(list(treatment_wards))
+        ward_options = ['All Treatment Wards'] + treatment_ward_names(ward_contexts)
         
         default_ward = 'All Treatment Wards'
         if ward_from_params and ward_from_params in ward_options:
@@ -377,6 +753,8 @@ with tab1:
             # Clear the ward param after using it
             if "ward" in st.query_params:
                 del st.query_params["ward"]
+        elif restored_view.get('ward') in ward_options:
+            default_ward = restored_view['ward']
         
         selected_ward = st.sidebar.selectbox(
             "Jump to ward:", 
@@ -412,6 +790,10 @@ with tab1:
                     # Clear the village param after using it
                     if "village" in st.query_params:
                         del st.query_params["village"]
+            elif restored_view.get('ward') == selected_ward:
+                matching_option = f"{restored_view.get('village')} (Treatment)"
+                if matching_option in village_options:
+                    default_village_index = village_options.index(matching_option)
             
             selected_village_option = st.sidebar.selectbox(
                 "Choose village:", 
@@ -433,11 +815,12 @@ with tab1:
                 st.sidebar.warning("No villages to map in this ward")
 
     
-    # Debug info
+    # Grid overlay
+    show_grid = st.sidebar.checkbox("Show 500m grid", value=restored_view.get('show_grid', False))
+    
+    # Debug info - profiling panel and data files
     if st.sidebar.checkbox("Show debug info"):
-        st.sidebar.write("Available files:")
-        for file in data_loader.get_available_files():
-            st.sidebar.write(f"- {file.name}")
+        render_debug_panel()
     
     # Main content area
     st.subheader("Click on the relevant ward to create village areas")
@@ -445,26 +828,47 @@ with tab1:
     col1, col2 = st.columns([4, 1])
     
     with col1:
-        m = create_map(selected_ward, st.session_state.annotations)
-        map_data = st_folium(
-            m, 
-            width=900,
-            height=900,
-            returned_objects=["all_drawings", "last_active_drawing"],
-            key=f"map_{selected_ward}_{len(st.session_state.annotations)}"
-        )
+        # The base map stays mounted under a fixed key; only the view and the
+        # changed feature groups are pushed to the client, so pan/zoom survive saves
+        m = create_base_map()
+        map_center, map_zoom = get_map_view(selected_ward)
+        # With vector tiles the browser culls the grid itself; otherwise cull on the server
+        tile_server = get_tile_server()
+        grid_from_tiles = tile_server is not None and 'layers' in tile_server.sources
+        grid_features, grid_info = create_grid_features(selected_ward) if show_grid and not grid_from_tiles else (None, None)
+        returned_objects = ["all_drawings", "last_active_drawing"]
+        if show_grid and not grid_from_tiles:
+            # Viewport changes rerun the app so the grid can be re-culled
+            returned_objects += ["bounds", "zoom"]
+        map_layers = create_map_layers(selected_ward, get_annotation_features(), grid_features, show_grid)
+        # Serializes the map and layers to the component and reads back the map state
+        with timer('st_folium'):
+            map_data = st_folium(
+                m, 
+                width=900,
+                height=900,
+                center=map_center,
+                zoom=map_zoom,
+                feature_group_to_add=map_layers,
+                layer_control=folium.LayerControl(position='topright', collapsed=False),
+                returned_objects=returned_objects,
+                key="labeling_map"
+            )
+        if grid_info:
+            level_text = "individual cells" if grid_info['factor'] == 1 else f"{grid_info['factor']}x{grid_info['factor']} cell aggregates"
+            truncated_text = " (thinned - zoom in for all cells)" if grid_info['truncated'] else ""
+            st.caption(f"Grid: {grid_info['n_features']} {level_text} in view{truncated_text}")
     
     with col2:
         st.subheader("Current Context")
         
         if ward_gdf is not None and selected_ward not in ['All Treatment Wards']:
             st.write(f"**Focus ward:** {selected_ward}")
-            ward_info = ward_gdf[ward_gdf['ward_name'] == selected_ward]
-            if not ward_info.empty:
-                ward_row = ward_info.iloc[0]
-                st.write(f"**District:** {ward_row['dist_name']}")
-                st.write(f"**Region:** {ward_row['reg_name']}")
-                if ward_row['is_treatment']:
+            ward_context = ward_contexts.get(selected_ward)
+            if ward_context is not None:
+                st.write(f"**District:** {ward_context['district']}")
+                st.write(f"**Region:** {ward_context['region']}")
+                if ward_context['is_treatment']:
                     st.success("Treatment Ward")
         
         if village_name:
@@ -473,18 +877,31 @@ with tab1:
         else:
             st.write("**Select a ward and village to start mapping**")
     
-    # Handle drawn polygons
+    # Handle drawn polygons - the map is no longer remounted after a save, so the
+    # last drawing stays on the client and must not be turned into a new pending annotation
     if map_data and map_data.get('last_active_drawing') and village_name:
         drawing = map_data['last_active_drawing']
-        st.session_state['pending_annotation'] = {
-            'village_name': village_name,
-            'village_type': village_type,
-            'is_treatment': is_treatment,
-            'ward_name': selected_ward,
-            'geometry': drawing['geometry'],
-            'timestamp': datetime.now().isoformat(),
-        }
-        st.info(f"✏️ Polygon drawn for **{village_name}** - Click 'Save to Database' below to confirm")
+        key = drawing_key(drawing['geometry'])
+        pending = st.session_state.get('pending_annotation')
+        if key != st.session_state.get('consumed_drawing_key'):
+            # The same drawing keeps its id and timestamp across reruns (including the
+            # one triggered by the save click), so a retried save never makes a second row
+            if not pending or pending.get('drawing_key') != key:
+                st.session_state['pending_annotation'] = {
+                    'annotation_id': new_annotation_id(),
+                    'revision': 0,
+                    'village_name': village_name,
+                    'village_type': village_type,
+                    'is_treatment': is_treatment,
+                    'ward_name': selected_ward,
+                    'geometry': drawing['geometry'],
+                    'timestamp': datetime.now().isoformat(),
+                    'drawing_key': key,
+                }
+            elif (pending['village_name'], pending['ward_name']) != (village_name, selected_ward):
+                pending.update(village_name=village_name, village_type=village_type,
+                               is_treatment=is_treatment, ward_name=selected_ward)
+            st.info(f"✏️ Polygon drawn for **{village_name}** - Click 'Save to Database' below to confirm")
     
     # Pending annotation save/discard
     if 'pending_annotation' in st.session_state and st.session_state['pending_annotation']:
@@ -498,6 +915,22 @@ with tab1:
             st.write(f"**Village:** {pending['village_name']}")
             st.write(f"**Ward:** {pending['ward_name']}")
             st.write(f"**Type:** {pending['village_type']}")
+            
+            # Spatial QC - runs live against the indexed annotations and ward boundaries
+            validator = get_annotation_validator()
+            if validator is not None:
+                try:
+                    with timer('qc.validate'):
+                        qc = validator.validate(pending['geometry'], pending['ward_name'], pending['village_name'])
+                    inside_text = f"{qc['inside_ward_pct']:.0f}% inside ward" if qc['inside_ward_pct'] is not None else "ward boundary unavailable"
+                    st.write(f"**Area:** {qc['area_km2']:.2f} km² ({inside_text})")
+                    if qc['flags']:
+                        for flag in qc['flags']:
+                            st.warning(f"⚠️ {flag}")
+                    else:
+                        st.success("✅ Spatial checks passed")
+                except Exception as e:
+                    st.warning(f"Spatial checks unavailable: {e}")
         
         with col_actions:
             already_mapped = any(
@@ -509,26 +942,36 @@ with tab1:
             if already_mapped:
                 st.warning("⚠️ Already mapped!")
                 if st.button("🗑️ Clear Pending", type="secondary", use_container_width=True):
-                    del st.session_state['pending_annotation']
+                    clear_pending_annotation()
                     st.rerun()
             else:
                 if st.button("💾 Save to Database", type="primary", use_container_width=True):
-                    if sheets_available:
-                        success, message = save_annotation_to_sheet(pending)
-                        if success:
-                            st.success(f"✅ {pending['village_name']} saved successfully!")
-                            del st.session_state['pending_annotation']
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Save failed: {message}")
+                    # Snap to the storage precision, drop redundant vertices and repair the drawing
+                    try:
+                        with timer('normalize_geometry'):
+                            annotation = normalize_annotation(
+                                {k: v for k, v in pending.items() if k != 'drawing_key'}, GEOMETRY_PRECISION_DEG
+                            )
+                    except ValueError as e:
+                        st.error(f"❌ Save failed: {e}")
                     else:
-                        st.session_state.annotations.append(pending)
-                        st.success("✅ Saved locally (offline mode)")
-                        del st.session_state['pending_annotation']
-                        st.rerun()
+                        if store_available:
+                            success, message = save_annotation_to_store(annotation)
+                            if success:
+                                st.success(f"✅ {pending['village_name']} saved successfully!")
+                                clear_pending_annotation()
+                                st.rerun()
+                            else:
+                                st.error(f"❌ Save failed: {message}")
+                        else:
+                            annotation_cache.add(annotation)
+                            mark_annotations_changed()
+                            st.success("✅ Saved locally (offline mode)")
+                            clear_pending_annotation()
+                            st.rerun()
                 
                 if st.button("🗑️ Discard", type="secondary", use_container_width=True):
-                    del st.session_state['pending_annotation']
+                    clear_pending_annotation()
                     st.rerun()
         
         st.markdown("---")
@@ -537,11 +980,61 @@ with tab1:
     col_refresh, col_spacer = st.columns([1, 3])
     with col_refresh:
         if st.button("🔄 Refresh from Database"):
-            if sheets_available:
-                st.session_state.annotations = load_annotations_from_sheet()
+            if store_available:
+                refresh_annotations()
                 st.success("✅ Refreshed from database")
                 st.rerun()
     
+    # Bulk import of existing boundary files - one storage write for the whole file
+    with st.expander("📥 Import village boundaries from file"):
+        uploaded = None if plan_import is None else st.file_uploader(
+            "GeoJSON, KML, GeoPackage or zipped Shapefile",
+            type=[ext.lstrip('.') for ext in SUPPORTED_EXTENSIONS if ext != '.shp'],
+            key="import_file"
+        )
+        if plan_import is None:
+            st.info("Import needs the geospatial utilities, which could not be loaded")
+        elif uploaded is None:
+            st.session_state.pop('import_plan', None)
+        elif st.session_state.reference_villages is None:
+            st.warning("Reference village list not loaded - imported polygons are matched against it")
+        else:
+            plan_key = (uploaded.file_id, st.session_state.annotations_version)
+            if st.session_state.get('import_plan', (None,))[0] != plan_key:
+                try:
+                    plan = plan_import(
+                        read_uploaded_file(uploaded.name, uploaded.getvalue()),
+                        st.session_state.reference_villages,
+                        annotations=st.session_state.annotations,
+                        validator=get_annotation_validator(),
+                        ward_gdf=ward_gdf,
+                        reference_index=get_reference_index(),
+                        precision=GEOMETRY_PRECISION_DEG
+                    )
+                    st.session_state.import_plan = (plan_key, plan)
+                except Exception as e:
+                    st.error(f"Could not read {uploaded.name}: {e}")
+                    st.session_state.pop('import_plan', None)
+            
+            if 'import_plan' in st.session_state:
+                plan = st.session_state.import_plan[1]
+                ready = int((plan['status'] == 'ready').sum())
+                st.write(f"**{ready}** of {len(plan)} features ready to import")
+                st.dataframe(
+                    plan.drop(columns='annotation'),
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={'feature': 'Feature', 'village_name': 'Village', 'ward_name': 'Ward', 'status': 'Status', 'flags': 'QC flags'}
+                )
+                if ready and store_available and st.button(f"💾 Import {ready} villages", type="primary"):
+                    saved, conflicts = commit_import(store, plan)
+                    annotation_cache.extend(saved)
+                    mark_annotations_changed()
+                    st.session_state.pop('import_plan', None)
+                    st.success(f"✅ Imported {len(saved)} villages")
+                    for ann in conflicts:
+                        st.warning(f"⚠️ Skipped {ann['village_name']} ({ann['ward_name']}) - already mapped by another labeler")
+    
     st.markdown("---")
     
     # Display annotations
@@ -564,8 +1057,8 @@ with tab1:
             
     #         with col_delete:
     #             if st.button("🗑️", key=f"delete_{idx}"):
-    #                 if sheets_available:
-    #                     if delete_annotation_from_sheet(ann['village_name'], ann['ward_name']):
+    #                 if store_available:
+    #                     if delete_annotation_from_store(ann):
     #                         st.rerun()
         
     #     st.write("---")
@@ -604,67 +1097,45 @@ with tab1:
         6. **Check the pending annotation** appears correctly
         7. **Click save to database** to confirm
         """)
+    
+    record('mapping_tab', time.perf_counter() - tab_start)
 
 
 # ============================================================================
 # TAB 2: PROGRESS TRACKER
 # ============================================================================
 with tab2:
+    tab_start = time.perf_counter()
     st.header("📊 Progress Tracker - Treatment Villages")
     
     # Refresh button
     col_refresh_top, col_spacer_top = st.columns([1, 3])
     with col_refresh_top:
         if st.button("🔄 Refresh from Database", key="refresh_progress"):
-            if sheets_available:
-                st.session_state.annotations = load_annotations_from_sheet()
-                st.session_state.reference_villages = load_reference_villages_from_sheet()
+            if store_available:
+                refresh_annotations()
+                st.session_state.reference_villages = load_reference_villages_from_store()
+                mark_reference_changed()
                 st.success("✅ Refreshed!")
                 st.rerun()
     
     if st.session_state.reference_villages is None:
-        st.error("Could not load reference village list from Google Sheets 'ReferenceVillages' tab.")
+        st.error(f"Could not load reference village list from {store.name if store_available else 'storage'}.")
         st.info("Make sure you have a 'ReferenceVillages' worksheet with columns: village_name, ward_name, district_name, region_name")
     else:
-        # Use the reference villages from Google Sheet
-        df_treatment = st.session_state.reference_villages.copy()
-        df_treatment = df_treatment.rename(columns={
-            'village_name': 'village',
-            'ward_name': 'ward',
-            'district_name': 'district',
-            'region_name': 'region'
-        })
-        
-        # Get mapped villages FROM DATABASE (Sheet1)
-        mapped_villages = []
-        for ann in st.session_state.annotations:
-            mapped_villages.append({
-                'village': str(ann.get('village_name', '')).strip().upper(),
-                'ward': str(ann.get('ward_name', '')).strip().upper()
-            })
-
-        
-        df_mapped = pd.DataFrame(mapped_villages) if mapped_villages else pd.DataFrame(columns=['village', 'ward'])
-        
-        # Mark mapped status with case-insensitive matching
-        def is_mapped(row):
-            if df_mapped.empty:
-                return False
-            village_upper = str(row['village']).strip().upper()
-            ward_upper = str(row['ward']).strip().upper()
-            return ((df_mapped['village'] == village_upper) & (df_mapped['ward'] == ward_upper)).any()
-        
-        df_treatment['mapped'] = df_treatment.apply(is_mapped, axis=1)
+        # Mapped status and rollups, cached until annotations or reference list change
+        progress = get_progress()
+        df_treatment = progress['villages']
         
         # Overall statistics
-        total_treatment = len(df_treatment)
-        total_mapped = df_treatment['mapped'].sum()
-        completion_pct = (total_mapped / total_treatment * 100) if total_treatment > 0 else 0
+        total_treatment = progress['total']
+        total_mapped = progress['mapped']
+        completion_pct = progress['completion_pct']
         
         st.subheader("Overall Progress")
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Total Treatment Villages", total_treatment)
-        col2.metric("In Database (Sheet1)", len(st.session_state.annotations))
+        col2.metric("In Database", len(st.session_state.annotations))
         col3.metric("Matched & Mapped", int(total_mapped))
         col4.metric("Completion", f"{completion_pct:.1f}%")
         st.progress(completion_pct / 100)
@@ -673,64 +1144,78 @@ with tab2:
         
         # Progress by ward
         st.subheader("Progress by Ward")
-        ward_progress = df_treatment.groupby('ward').agg({
-            'village': 'count',
-            'mapped': 'sum'
-        }).rename(columns={'village': 'total', 'mapped': 'mapped'})
-        ward_progress['remaining'] = ward_progress['total'] - ward_progress['mapped']
-        ward_progress['completion_pct'] = (ward_progress['mapped'] / ward_progress['total'] * 100).round(1)
-        ward_progress = ward_progress.sort_values('completion_pct', ascending=False)
-        
-        for ward, row in ward_progress.iterrows():
-            with st.expander(f"**{ward}** - {int(row['mapped'])}/{int(row['total'])} villages ({row['completion_pct']}%)", 
-               expanded=False):
-
-                col1, col2 = st.columns([4, 1])
-                
-                with col1:
-                    st.progress(row['completion_pct'] / 100)
-                    
-                    unmapped = df_treatment[(df_treatment['ward'] == ward) & (~df_treatment['mapped'])]
-                    if len(unmapped) > 0:
-                        st.write(f"**🔴 Unmapped villages ({len(unmapped)}):**")
-                        for idx, village_row in unmapped.iterrows():
-                            col_village, col_btn = st.columns([3, 1])
-                            with col_village:
-                                st.write(f"  • {village_row['village']}")
-                            with col_btn:
-                                if st.button("📍 Map", key=f"map_{ward}_{village_row['village']}", use_container_width=True):
-                                    st.query_params["ward"] = ward
-                                    st.query_params["village"] = village_row['village']
-                                    st.query_params["tab"] = "mapping"
-                                    st.rerun()
-                    else:
-                        st.success("✅ All villages mapped!")
-                    
-                    mapped = df_treatment[(df_treatment['ward'] == ward) & (df_treatment['mapped'])]
-                    if len(mapped) > 0:
-                        with st.expander(f"✅ Mapped villages ({len(mapped)})", expanded=False):
-                            for _, village_row in mapped.iterrows():
-                                st.write(f"  • {village_row['village']}")
-                
-                with col2:
-                    if row['remaining'] > 0:
-                        st.write("")
-                        st.write("")
-                        if st.button(f"Go to Ward", key=f"jump_ward_{ward}", use_container_width=True):
-                            st.query_params["ward"] = ward
-                            st.query_params["tab"] = "mapping"
-                            st.rerun()
+        ward_progress = progress['wards']
+        village_lists = progress['village_lists']
+        
+        # One virtualized table for all wards - select a row to work on its villages
+        ward_table = ward_progress[['ward', 'district', 'mapped', 'total', 'remaining', 'completion_pct']]
+        ward_event = st.dataframe(
+            ward_table,
+            hide_index=True,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="single-row",
+            key="ward_progress_table",
+            column_config={
+                'ward': 'Ward',
+                'district': 'District',
+                'mapped': 'Mapped',
+                'total': 'Total',
+                'remaining': 'Remaining',
+                'completion_pct': st.column_config.ProgressColumn("Completion", min_value=0, max_value=100, format="%.1f%%"),
+            }
+        )
+        
+        if ward_event.selection.rows:
+            ward_row = ward_table.iloc[ward_event.selection.rows[0]]
+            ward = ward_row['ward']
+            unmapped = village_lists.get((ward, False), [])
+            mapped = village_lists.get((ward, True), [])
+            
+            col_ward, col_jump = st.columns([4, 1])
+            with col_ward:
+                st.write(f"**{ward}** - {int(ward_row['mapped'])}/{int(ward_row['total'])} villages mapped")
+            with col_jump:
+                if ward_row['remaining'] > 0 and st.button("Go to Ward", key="jump_ward", use_container_width=True):
+                    st.query_params["ward"] = ward
+                    st.query_params["tab"] = "mapping"
+                    st.rerun()
+            
+            if unmapped:
+                st.write(f"**🔴 Unmapped villages ({len(unmapped)}):**")
+                unmapped_page = paginate(pd.DataFrame({'village': unmapped}), key=f"unmapped_{ward}", page_size=10)
+                village_event = st.dataframe(
+                    unmapped_page,
+                    hide_index=True,
+                    use_container_width=True,
+                    on_select="rerun",
+                    selection_mode="single-row",
+                    key=f"unmapped_table_{ward}",
+                    column_config={'village': 'Village'}
+                )
+                if village_event.selection.rows:
+                    village = unmapped_page.iloc[village_event.selection.rows[0]]['village']
+                    if st.button(f"📍 Map {village}", key="map_selected_village", type="primary"):
+                        st.query_params["ward"] = ward
+                        st.query_params["village"] = village
+                        st.query_params["tab"] = "mapping"
+                        st.rerun()
+                else:
+                    st.caption("Select a village to map it")
+            else:
+                st.success("✅ All villages mapped!")
+            
+            if mapped:
+                with st.expander(f"✅ Mapped villages ({len(mapped)})", expanded=False):
+                    st.dataframe(pd.DataFrame({'village': mapped}), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Select a ward to see its villages")
         
         st.markdown("---")
         
         # Progress by district
         st.subheader("Progress by District")
-        district_progress = df_treatment.groupby('district').agg({
-            'village': 'count',
-            'mapped': 'sum'
-        }).rename(columns={'village': 'total', 'mapped': 'mapped'})
-        district_progress['remaining'] = district_progress['total'] - district_progress['mapped']
-        district_progress['completion_pct'] = (district_progress['mapped'] / district_progress['total'] * 100).round(1)
+        district_progress = progress['districts']
         
         # Format the dataframe for display
         district_progress_display = district_progress.copy()
@@ -740,6 +1225,15 @@ with tab2:
             district_progress_display,
             use_container_width=True
         )
+        
+        # Progress by region
+        st.subheader("Progress by Region")
+        region_progress_display = progress['regions'].copy()
+        region_progress_display['completion_pct'] = region_progress_display['completion_pct'].apply(lambda x: f"{x:.1f}%")
+        st.dataframe(
+            region_progress_display,
+            use_container_width=True
+        )
         # Detailed village list
         st.subheader("Detailed Village List")
         
@@ -779,11 +1273,19 @@ with tab2:
         
         st.write(f"Showing {len(df_filtered)} of {len(df_treatment)} villages")
         
-        # # Display without action buttons
-        for idx, row in df_filtered.iterrows():
-            status_icon = '✅' if row['mapped'] else '🔴'
-            status_text = 'Mapped' if row['mapped'] else 'Unmapped'
-            st.write(f"{status_icon} **{row['village']}** - {row['ward']} ward, {row['district']} district ({status_text})")
+        # Paginated table instead of one element per village
+        village_table = pd.DataFrame({
+            'status': df_filtered['mapped'].map({True: '✅ Mapped', False: '🔴 Unmapped'}),
+            'village': df_filtered['village'],
+            'ward': df_filtered['ward'],
+            'district': df_filtered['district'],
+        })
+        st.dataframe(
+            paginate(village_table, key="village_list"),
+            hide_index=True,
+            use_container_width=True,
+            column_config={'status': 'Status', 'village': 'Village', 'ward': 'Ward', 'district': 'District'}
+        )
                 
         st.markdown("---")
                 
@@ -814,4 +1316,68 @@ with tab2:
                 data=csv_summary,
                 file_name=f"mapping_progress_summary_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv"
-            )
\ No newline at end of file
+            )
+    
+    record('progress_tab', time.perf_counter() - tab_start)
+    
+    # Export labeled polygons - streamed from the store to files in data/processed
+    st.markdown("---")
+    st.subheader("Export Labeled Treatment Areas")
+    export_files = {
+        'GeoJSON': (DATA_DIR / "processed" / EXPORT_GEOJSON_FILE, "application/geo+json"),
+        'GeoParquet': (DATA_DIR / "processed" / EXPORT_PARQUET_FILE, "application/vnd.apache.parquet"),
+    }
+    if store_available and st.button("🗂️ Export treatment areas"):
+        with st.spinner("Exporting..."):
+            try:
+                # pyarrow is only needed here, not at startup
+                from utils.export import export_annotations
+                exported = export_annotations(
+                    store,
+                    geojson_path=export_files['GeoJSON'][0],
+                    parquet_path=export_files['GeoParquet'][0],
+                    reference_df=st.session_state.reference_villages,
+                    ward_gdf=ward_gdf,
+                    chunk_size=EXPORT_CHUNK_SIZE
+                )
+                st.success(f"✅ Exported {exported} treatment areas to data/processed")
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+    
+    col1, col2 = st.columns(2)
+    for col, (label, (path, mime)) in zip([col1, col2], export_files.items()):
+        if path.exists():
+            with col:
+                # The export is only read into the session after "Prepare", and dropped
+                # again once it was downloaded - not on every rerun of the page
+                exported_at = path.stat().st_mtime
+                ready_key = f"download_ready_{label}"
+                if st.session_state.get(ready_key) == exported_at:
+                    with open(path, 'rb') as f:
+                        st.download_button(
+                            label=f"⬇️ Download {label}",
+                            data=f,
+                            file_name=path.name,
+                            mime=mime,
+                            key=f"download_{label}",
+                            on_click=st.session_state.pop,
+                            args=(ready_key, None)
+                        )
+                elif st.button(f"📦 Prepare {label} download", key=f"prepare_{label}"):
+                    st.session_state[ready_key] = exported_at
+                    st.rerun()
+                st.caption(f"Exported {datetime.fromtimestamp(path.stat().st_mtime).strftime('%Y-%m-%d %H:%M')}")
+
+# ============================================================================
+# SESSION SNAPSHOT - END OF RERUN
+# ============================================================================
+if snapshots is not None:
+    with timer('snapshots'):
+        save_snapshots({'ward': selected_ward, 'village': village_name, 'show_grid': show_grid})
+
+# ============================================================================
+# PROFILING - END OF RERUN
+# ============================================================================
+record('rerun', time.perf_counter() - rerun_start)
+if PROFILING_LOG_RERUNS:
+    export_rerun(METRICS_FILE, st.session_state.metrics.current_rerun, {'annotations': len(st.session_state.annotations)})
@@ -0,0 +1,177 @@
+"""Headless rerun-latency benchmarks for the labeling app.
+
+Drives app.py with Streamlit's AppTest against synthetic wards, reference
+villages and annotations, served from local worksheets through the fake
+Sheets connection (or from a local database backend), and times the main
+interactions: first paint, cold start, ward switch, draw-and-save, refresh
+and the progress tab. Median timings are checked against BENCHMARK_BUDGETS_MS
+in config/settings.py and the run exits with status 1 when a budget is exceeded.
+
+Examples (run from the repository root):
+    python labeling_app/benchmark_app.py
+    python labeling_app/benchmark_app.py --sizes 50 1000 --repeat 5 --output benchmark.json
+    python labeling_app/benchmark_app.py --backend sqlite --latency 0.2
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+sys.path.append(str(APP_DIR))
+sys.path.append(str(APP_DIR.parent))
+
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from config.settings import STORAGE_FILES, BENCHMARK_SIZES, BENCHMARK_BUDGETS_MS
+from utils.storage import STORAGE_BACKENDS
+from utils.synthetic_data import make_dataset, write_app_data
+
+APP_FILE = APP_DIR / "app.py"
+INTERACTIONS = ['first_paint', 'cold_start', 'ward_switch', 'draw_and_save', 'refresh', 'progress_tab']
+
+
+def timed_run(element_or_app):
+    """Run the app (after an interaction) and return the wall time in seconds"""
+    start = time.perf_counter()
+    at = element_or_app.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"App raised: {at.exception[0].value}")
+    return at, elapsed
+
+
+def find(elements, label):
+    matches = [element for element in elements if element.label == label]
+    if not matches:
+        raise RuntimeError(f"No widget labeled {label!r} - did the app layout change?")
+    return matches[0]
+
+
+def unmapped_village(at, reference_df, ward):
+    """A village of the ward that the session does not see as mapped yet"""
+    mapped = {(ann['village_name'], ann['ward_name']) for ann in at.session_state['annotations']}
+    for village in reference_df.loc[reference_df['ward_name'] == ward, 'village_name']:
+        if (village, ward) not in mapped:
+            return village
+    raise RuntimeError(f"All villages of {ward} are mapped - use a larger --unmapped-fraction")
+
+
+def run_once(round_index, ward_gdf, reference_df, timeout):
+    """One pass over all interactions with a fresh process cache; returns {interaction: seconds}"""
+    timings = {}
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+    at, timings['cold_start'] = timed_run(AppTest.from_file(str(APP_FILE), default_timeout=timeout))
+    # Time until the title and tabs are on screen, from the app's own timer
+    timings['first_paint'] = at.session_state['metrics'].current_rerun['first_paint']
+
+    ward = ward_gdf['ward_name'].iloc[round_index % len(ward_gdf)]
+    at, timings['ward_switch'] = timed_run(find(at.sidebar.selectbox, "Jump to ward:").select(ward))
+
+    # st_folium does not draw in AppTest - a drawn polygon becomes the pending annotation
+    village = unmapped_village(at, reference_df, ward)
+    ward_geometry = ward_gdf.set_index('ward_name').geometry[ward]
+    minx, miny, maxx, maxy = ward_geometry.bounds
+    cx, cy, size = (minx + maxx) / 2, (miny + maxy) / 2, (maxx - minx) / 100
+    n_before = len(at.session_state['annotations'])
+    at.session_state['pending_annotation'] = {
+        'annotation_id': f"benchmark-{round_index}-{time.time_ns()}",
+        'revision': 0,
+        'village_name': village,
+        'village_type': 'Treatment',
+        'is_treatment': True,
+        'ward_name': ward,
+        'geometry': {'type': 'Polygon', 'coordinates': [[
+            [cx, cy], [cx + size, cy], [cx + size, cy + size], [cx, cy + size], [cx, cy]
+        ]]},
+        'timestamp': datetime.now().isoformat(),
+    }
+    at, draw_seconds = timed_run(at)
+    at, save_seconds = timed_run(find(at.button, "💾 Save to Database").click())
+    if len(at.session_state['annotations']) != n_before + 1:
+        raise RuntimeError(f"Save of {village} did not reach the annotation set")
+    timings['draw_and_save'] = draw_seconds + save_seconds
+
+    at, timings['refresh'] = timed_run(at.button(key="refresh_progress").click())
+    # Rollups are recomputed after the refresh - taken from the app's own timer for the tab
+    timings['progress_tab'] = at.session_state['metrics'].current_rerun['progress_tab']
+    return timings
+
+
+def summarize(results):
+    """Median/max per size and interaction, checked against the budgets"""
+    rows = []
+    for size, rounds in results.items():
+        budgets = BENCHMARK_BUDGETS_MS.get(size, {})
+        for interaction in INTERACTIONS:
+            values = [timings[interaction] * 1000 for timings in rounds]
+            median = statistics.median(values)
+            budget = budgets.get(interaction)
+            rows.append({
+                'annotations': size,
+                'interaction': interaction,
+                'median_ms': round(median, 1),
+                'max_ms': round(max(values), 1),
+                'budget_ms': budget,
+                'status': 'n/a' if budget is None else 'ok' if median <= budget else 'OVER BUDGET',
+            })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rerun latency of the labeling app")
+    parser.add_argument('--sizes', nargs='+', type=int, default=BENCHMARK_SIZES, help="annotation counts")
+    parser.add_argument('--repeat', type=int, default=3, help="rounds per size (each starts cold)")
+    parser.add_argument('--backend', default='sheets', choices=STORAGE_BACKENDS)
+    parser.add_argument('--latency', type=float, default=0.0, help="emulated Sheets request latency in seconds")
+    parser.add_argument('--wards', type=int, default=20)
+    parser.add_argument('--unmapped-fraction', type=float, default=0.1)
+    parser.add_argument('--timeout', type=float, default=600, help="seconds allowed per app run")
+    parser.add_argument('--output', help="write timings and the budget check to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        ward_gdf, reference_df, annotations = make_dataset(size, n_wards=args.wards, unmapped_fraction=args.unmapped_fraction)
+        with tempfile.TemporaryDirectory() as data_dir:
+            env = write_app_data(data_dir, ward_gdf, reference_df, annotations, args.backend, STORAGE_FILES.get(args.backend))
+            env['LABELING_APP_FAKE_SHEETS_LATENCY'] = str(args.latency)
+            os.environ.update(env)
+            print(f"{size} annotations, {len(reference_df)} reference villages, {args.wards} wards ({args.backend})")
+            results[size] = []
+            for round_index in range(args.repeat):
+                timings = run_once(round_index, ward_gdf, reference_df, args.timeout)
+                print("  " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+                results[size].append(timings)
+        st.cache_resource.clear()
+
+    summary = summarize(results)
+    print()
+    print(summary.to_string(index=False))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'time': datetime.now().isoformat(),
+                'backend': args.backend,
+                'latency': args.latency,
+                'rounds': {str(size): rounds for size, rounds in results.items()},
+                'summary': summary.to_dict(orient='records'),
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    over_budget = summary[summary['status'] == 'OVER BUDGET']
+    if len(over_budget):
+        sys.exit(f"{len(over_budget)} interactions over budget")
+
+
+if __name__ == "__main__":
+    main()
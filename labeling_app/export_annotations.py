@@ -0,0 +1,62 @@
+"""Export labeled treatment areas from the annotation store to GeoJSON and GeoParquet.
+
+Annotations are streamed from the store in chunks and appended to the output
+files, with district and region attributes from the reference village list
+(falling back to the ward boundaries).
+
+Examples (run from the repository root):
+    python labeling_app/export_annotations.py
+    python labeling_app/export_annotations.py --backend sqlite --format parquet
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+sys.path.append(str(APP_DIR))
+sys.path.append(str(APP_DIR.parent))
+
+from config.settings import STORAGE_BACKEND, EXPORT_GEOJSON_FILE, EXPORT_PARQUET_FILE, EXPORT_CHUNK_SIZE
+from migrate_storage import open_store
+from utils.export import export_annotations
+from utils.map_utils import DataLoader
+from utils.storage import STORAGE_BACKENDS
+
+DATA_DIR = APP_DIR.parent / "data"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export labeled treatment areas")
+    parser.add_argument('--backend', default=STORAGE_BACKEND, choices=STORAGE_BACKENDS)
+    parser.add_argument('--path', help="file of a local backend")
+    parser.add_argument('--format', choices=['all', 'geojson', 'parquet'], default='all')
+    parser.add_argument('--geojson', default=DATA_DIR / "processed" / EXPORT_GEOJSON_FILE, type=Path)
+    parser.add_argument('--parquet', default=DATA_DIR / "processed" / EXPORT_PARQUET_FILE, type=Path)
+    parser.add_argument('--chunk-size', default=EXPORT_CHUNK_SIZE, type=int)
+    args = parser.parse_args()
+
+    store = open_store(args.backend, args.path)
+    try:
+        ward_gdf = DataLoader(DATA_DIR).load_ward_data()
+    except Exception as e:
+        print(f"Ward data not available, district/region come from the reference list only: {e}")
+        ward_gdf = None
+
+    start = time.perf_counter()
+    count = export_annotations(
+        store,
+        geojson_path=args.geojson if args.format in ('all', 'geojson') else None,
+        parquet_path=args.parquet if args.format in ('all', 'parquet') else None,
+        reference_df=store.load_reference_villages(),
+        ward_gdf=ward_gdf,
+        chunk_size=args.chunk_size,
+    )
+    print(f"Exported {count} treatment areas from {store.name} in {time.perf_counter() - start:.1f}s")
+    for fmt, path in [('geojson', args.geojson), ('parquet', args.parquet)]:
+        if args.format in ('all', fmt):
+            print(f"  {path} ({path.stat().st_size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Import village boundary polygons from a GeoJSON, KML, GeoPackage or zipped Shapefile.
+
+Features are matched to the reference village list by village and ward name
+(the ward is looked up from the ward boundaries if the file has no ward
+column), checked with the same spatial QC as drawn polygons, and all matched
+features are saved in one storage write.
+
+Examples (run from the repository root):
+    python labeling_app/import_annotations.py field_team_boundaries.zip --dry-run
+    python labeling_app/import_annotations.py villages.kml --village-field Name --report import_report.csv
+"""
+import argparse
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+sys.path.append(str(APP_DIR))
+sys.path.append(str(APP_DIR.parent))
+
+from config.settings import (
+    STORAGE_BACKEND, TARGET_CRS, QC_MAX_OVERLAP_PCT, QC_MIN_INSIDE_WARD_PCT,
+    QC_MIN_AREA_KM2, QC_MAX_AREA_KM2, QC_MIN_COMPACTNESS, GEOMETRY_PRECISION_DEG
+)
+from migrate_storage import open_store
+from utils.importer import read_boundary_file, plan_import, commit_import
+from utils.map_utils import DataLoader
+from utils.reference_index import ReferenceIndex
+from utils.storage import STORAGE_BACKENDS
+from utils.validation import AnnotationValidator, project_ward_geometries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import village boundaries into the annotation store")
+    parser.add_argument('file', help="GeoJSON, KML, GeoPackage or zipped Shapefile")
+    parser.add_argument('--backend', default=STORAGE_BACKEND, choices=STORAGE_BACKENDS)
+    parser.add_argument('--path', help="file of a local backend")
+    parser.add_argument('--village-field', help="column with village names (default: detected)")
+    parser.add_argument('--ward-field', help="column with ward names (default: detected, else spatial lookup)")
+    parser.add_argument('--dry-run', action='store_true', help="match and check only, do not save")
+    parser.add_argument('--report', help="write the per-feature report to this CSV")
+    args = parser.parse_args()
+
+    store = open_store(args.backend, args.path)
+    reference = store.load_reference_villages()
+    if reference is None:
+        sys.exit(f"No reference villages in {store.name}")
+    annotations, _ = store.load_annotations()
+    reference_index = ReferenceIndex.from_dataframe(reference)
+
+    ward_gdf = DataLoader(APP_DIR.parent / "data").load_ward_data()
+    validator = AnnotationValidator(
+        project_ward_geometries(ward_gdf, TARGET_CRS),
+        TARGET_CRS,
+        max_overlap_pct=QC_MAX_OVERLAP_PCT,
+        min_inside_ward_pct=QC_MIN_INSIDE_WARD_PCT,
+        min_area_km2=QC_MIN_AREA_KM2,
+        max_area_km2=QC_MAX_AREA_KM2,
+        min_compactness=QC_MIN_COMPACTNESS,
+        reference_index=reference_index,
+    )
+    validator.index_annotations(annotations)
+
+    gdf = read_boundary_file(args.file)
+    print(f"Read {len(gdf)} features from {args.file}")
+    plan = plan_import(
+        gdf, reference, annotations=annotations, validator=validator, ward_gdf=ward_gdf,
+        village_field=args.village_field, ward_field=args.ward_field, reference_index=reference_index,
+        precision=GEOMETRY_PRECISION_DEG
+    )
+    print(plan['status'].value_counts().to_string())
+    flagged = plan[plan['flags'] != '']
+    if len(flagged):
+        print(f"{len(flagged)} features have QC flags:")
+        for _, row in flagged.iterrows():
+            print(f"  {row['village_name']} ({row['ward_name']}): {row['flags']}")
+    if args.report:
+        plan.drop(columns='annotation').to_csv(args.report, index=False)
+        print(f"Report written to {args.report}")
+
+    if args.dry_run:
+        return
+    saved, conflicts = commit_import(store, plan)
+    print(f"Imported {len(saved)} annotations into {store.name}")
+    for ann in conflicts:
+        print(f"  Skipped {ann['village_name']} ({ann['ward_name']}) - already mapped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Load test: many concurrent labelers sharing one server process and one Google Sheet.
+
+Each simulated session runs in its own thread and does what the app does for
+a labeler - every interaction starts with the shared annotation cache lookup
+of a rerun, then browses a ward (with the progress rollups), saves or deletes
+an annotation, or refreshes from the store. Sessions share one store and one
+SharedAnnotationCache, as all sessions of a Streamlit server do. The Sheets
+backend is the in-memory fake with request latency and a per-minute quota,
+behind the same rate-limited SheetsClient the app uses.
+
+At the end the store is read back to count lost writes: saves that were
+acknowledged but are missing, and deletes that were acknowledged but are
+still live.
+
+Examples (run from the repository root):
+    python labeling_app/load_test.py --sessions 20 --duration 60
+    python labeling_app/load_test.py --sessions 50 --quota 300 --latency 0.5 --output load_test.json
+    python labeling_app/load_test.py --backend sqlite --sessions 50 --think-time 0.5
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+sys.path.append(str(APP_DIR))
+sys.path.append(str(APP_DIR.parent))
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import mapping
+
+from config.settings import (
+    STORAGE_FILES, ANNOTATION_CACHE_MAX_AGE_SECONDS, SHEETS_RATE_PER_MINUTE, SHEETS_BURST,
+    SHEETS_MAX_RETRIES, SHEETS_BACKOFF_MAX_SECONDS
+)
+from utils.annotation_cache import SharedAnnotationCache
+from utils.fake_sheets import FakeSheetsConnection
+from utils.progress import compute_progress
+from utils.sheets_client import SheetsClient
+from utils.storage import STORAGE_BACKENDS, ConflictError, create_store
+from utils.synthetic_data import make_dataset, village_polygon
+
+ACTIONS = ['browse', 'save', 'delete', 'refresh']
+
+
+class SimulatedLabeler:
+    """One browser session, replaying the app's storage and cache calls"""
+
+    def __init__(self, index, store, cache, reference_df, ward_gdf, rng, think_time, weights):
+        self.index = index
+        self.store = store
+        self.cache = cache
+        self.reference_df = reference_df
+        self.ward_geometries = ward_gdf.set_index('ward_name').geometry
+        self.ward = rng.choice(list(self.ward_geometries.index))
+        self.rng = rng
+        self.think_time = think_time
+        self.weights = weights
+        self.annotations = []
+        self.progress = (None, None)
+        self.timings = {action: [] for action in ACTIONS}
+        self.outcomes = {'errors': 0, 'conflicts': 0, 'skipped': 0}
+        self.saved = set()
+        self.deleted = set()
+
+    def load(self):
+        # Same contract as the app's loader: None keeps the current snapshot
+        try:
+            return self.store.load_annotations()[0]
+        except Exception:
+            return None
+
+    def rerun(self):
+        """Start of every app rerun - point the session at the shared snapshot"""
+        self.version, self.annotations = self.cache.get(self.load)
+
+    def browse(self):
+        self.ward = self.rng.choice(list(self.ward_geometries.index))
+        if self.progress[0] != self.version:
+            self.progress = (self.version, compute_progress(self.reference_df, self.annotations))
+
+    def save(self):
+        mapped = {ann['village_name'] for ann in self.annotations if ann.get('ward_name') == self.ward}
+        villages = self.reference_df.loc[self.reference_df['ward_name'] == self.ward, 'village_name']
+        unmapped = [village for village in villages if village not in mapped]
+        if not unmapped:
+            self.outcomes['skipped'] += 1
+            return
+        village = self.rng.choice(unmapped)
+        position = int(village.rsplit(' ', 1)[-1])
+        annotation = {
+            'annotation_id': f"load-{self.index}-{time.time_ns()}",
+            'revision': 0,
+            'village_name': village,
+            'village_type': 'Treatment',
+            'is_treatment': True,
+            'ward_name': self.ward,
+            'geometry': mapping(village_polygon(self.ward_geometries[self.ward], position)),
+            'timestamp': datetime.now().isoformat(),
+        }
+        try:
+            self.store.add_annotation(annotation)
+        except ConflictError:
+            self.outcomes['conflicts'] += 1
+            self.cache.refresh(self.load)
+            return
+        self.saved.add(annotation['annotation_id'])
+        self.cache.add(annotation)
+
+    def delete(self):
+        own = [ann for ann in self.annotations if ann['annotation_id'] in self.saved - self.deleted]
+        if not own:
+            self.outcomes['skipped'] += 1
+            return
+        annotation = self.rng.choice(own)
+        try:
+            self.store.delete_annotation(annotation)
+        except ConflictError:
+            self.outcomes['conflicts'] += 1
+            self.cache.refresh(self.load)
+            return
+        self.deleted.add(annotation['annotation_id'])
+        self.cache.remove(annotation['annotation_id'])
+
+    def refresh(self):
+        self.version, self.annotations = self.cache.refresh(self.load)
+
+    def run(self, stop_at):
+        while time.monotonic() < stop_at:
+            action = self.rng.choices(ACTIONS, weights=self.weights)[0]
+            start = time.perf_counter()
+            try:
+                self.rerun()
+                getattr(self, action)()
+            except Exception:
+                self.outcomes['errors'] += 1
+            self.timings[action].append(time.perf_counter() - start)
+            time.sleep(self.rng.expovariate(1 / self.think_time) if self.think_time else 0)
+
+
+def open_load_test_store(backend, tmp_dir, ward_gdf, reference_df, annotations, latency, quota):
+    """Store seeded with the synthetic dataset; for sheets also the fake connection and the sessions' client"""
+    if backend != 'sheets':
+        store = create_store(backend, path=Path(tmp_dir) / Path(STORAGE_FILES[backend]).name)
+        store.replace_annotations(annotations)
+        store.replace_reference_villages(reference_df)
+        return store, None, None
+
+    # Seeded through a separate client, so latency, quota and call counts only cover the sessions
+    conn = FakeSheetsConnection()
+    seed = create_store('sheets', sheets_client=SheetsClient(conn))
+    seed.replace_annotations(annotations)
+    seed.replace_reference_villages(reference_df)
+    conn.latency, conn.quota_per_minute = latency, quota
+    conn.calls = {key: 0 for key in conn.calls}
+    client = SheetsClient(
+        conn,
+        rate_per_minute=SHEETS_RATE_PER_MINUTE,
+        burst=SHEETS_BURST,
+        max_retries=SHEETS_MAX_RETRIES,
+        backoff_max=SHEETS_BACKOFF_MAX_SECONDS
+    )
+    return create_store('sheets', sheets_client=client), conn, client
+
+
+def percentiles(values):
+    values = np.array(values) * 1000 if values else np.array([np.nan])
+    return {'p50_ms': round(float(np.percentile(values, 50)), 1),
+            'p95_ms': round(float(np.percentile(values, 95)), 1),
+            'p99_ms': round(float(np.percentile(values, 99)), 1),
+            'max_ms': round(float(np.max(values)), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent labelers against one store")
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60, help="seconds of load")
+    parser.add_argument('--think-time', type=float, default=2.0, help="mean pause between interactions (s)")
+    parser.add_argument('--weights', type=float, nargs=4, default=[0.6, 0.2, 0.05, 0.15],
+                        metavar=('BROWSE', 'SAVE', 'DELETE', 'REFRESH'))
+    parser.add_argument('--backend', default='sheets', choices=STORAGE_BACKENDS)
+    parser.add_argument('--latency', type=float, default=0.3, help="fake Sheets latency per request (s)")
+    parser.add_argument('--quota', type=int, default=60, help="fake Sheets requests per minute (0 = unlimited)")
+    parser.add_argument('--annotations', type=int, default=1000, help="annotations in the store at the start")
+    parser.add_argument('--wards', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    ward_gdf, reference_df, annotations = make_dataset(args.annotations, n_wards=args.wards)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store, conn, client = open_load_test_store(
+            args.backend, tmp_dir, ward_gdf, reference_df, annotations, args.latency, args.quota or None
+        )
+        cache = SharedAnnotationCache(max_age_seconds=ANNOTATION_CACHE_MAX_AGE_SECONDS)
+        reference = store.load_reference_villages()
+        labelers = [
+            SimulatedLabeler(i, store, cache, reference, ward_gdf, random.Random(args.seed + i), args.think_time, args.weights)
+            for i in range(args.sessions)
+        ]
+        print(f"{args.sessions} sessions for {args.duration:.0f}s against {store.name} "
+              f"({len(annotations)} annotations, latency {args.latency}s, quota {args.quota or 'unlimited'}/min)")
+
+        start = time.perf_counter()
+        stop_at = time.monotonic() + args.duration
+        threads = [threading.Thread(target=labeler.run, args=(stop_at,), daemon=True) for labeler in labelers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        # Read back without quota or latency to check every acknowledged write
+        if conn is not None:
+            upstream_calls = dict(conn.calls)
+            final, problems = create_store('sheets', sheets_client=SheetsClient(FakeSheetsConnection(conn.worksheets))).load_annotations()
+        else:
+            final, problems = store.load_annotations()
+
+    live = {ann['annotation_id'] for ann in final}
+    saved = set().union(*(labeler.saved for labeler in labelers))
+    deleted = set().union(*(labeler.deleted for labeler in labelers))
+    lost_saves = saved - deleted - live
+    lost_deletes = deleted & live
+
+    rows = []
+    for action in ACTIONS:
+        values = [value for labeler in labelers for value in labeler.timings[action]]
+        rows.append({'action': action, 'count': len(values), **percentiles(values)})
+    latency = pd.DataFrame(rows)
+    totals = {key: sum(labeler.outcomes[key] for labeler in labelers) for key in ['errors', 'conflicts', 'skipped']}
+    report = {
+        'time': datetime.now().isoformat(),
+        'settings': vars(args),
+        'elapsed_seconds': round(elapsed, 1),
+        'throughput_per_second': round(int(latency['count'].sum()) / elapsed, 2),
+        'saves_per_minute': round(len(saved) / elapsed * 60, 1),
+        'acknowledged_saves': len(saved),
+        'acknowledged_deletes': len(deleted),
+        'lost_saves': len(lost_saves),
+        'lost_deletes': len(lost_deletes),
+        'double_mapped': sum('mapped' in problem for problem in problems),
+        **totals,
+        'cache': dict(cache.stats),
+        'sheets_client': dict(client.stats) if client is not None else None,
+        'upstream_calls': upstream_calls if conn is not None else None,
+        'latency': latency.to_dict(orient='records'),
+    }
+
+    print()
+    print(latency.to_string(index=False))
+    print()
+    for key in ['throughput_per_second', 'saves_per_minute', 'acknowledged_saves', 'acknowledged_deletes',
+                'lost_saves', 'lost_deletes', 'double_mapped', 'errors', 'conflicts', 'skipped']:
+        print(f"{key:>22}: {report[key]}")
+    print(f"{'cache':>22}: {report['cache']}")
+    if conn is not None:
+        print(f"{'upstream calls':>22}: {report['upstream_calls']}")
+        print(f"{'sheets client':>22}: {report['sheets_client']}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Report written to {args.output}")
+
+    if lost_saves or lost_deletes:
+        sys.exit(f"{len(lost_saves)} saves and {len(lost_deletes)} deletes were acknowledged but lost")
+
+
+if __name__ == "__main__":
+    main()
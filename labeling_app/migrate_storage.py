@@ -0,0 +1,72 @@
+"""Copy annotations and the reference village list between storage backends.
+
+Examples (run from the repository root):
+    python labeling_app/migrate_storage.py --source sheets --target sqlite
+    python labeling_app/migrate_storage.py --source sqlite --target geopackage --target-path exports/annotations.gpkg
+
+The sheets backend uses the same .streamlit/secrets.toml as the app.
+File backends default to the STORAGE_FILES paths in config/settings.py.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent
+sys.path.append(str(APP_DIR))
+sys.path.append(str(APP_DIR.parent))
+
+from config.settings import STORAGE_FILES
+from utils.storage import STORAGE_BACKENDS, create_store
+
+DATA_DIR = APP_DIR.parent / "data" / "processed"
+
+
+def open_store(backend, path=None):
+    """Store for a backend, with the default file location for local databases"""
+    if backend == 'sheets':
+        import streamlit as st
+        from streamlit_gsheets import GSheetsConnection
+        from utils.sheets_client import SheetsClient, GSheetsAppendAdapter
+        client = SheetsClient(GSheetsAppendAdapter(st.connection("gsheets", type=GSheetsConnection)))
+        return create_store('sheets', sheets_client=client)
+    return create_store(backend, path=Path(path) if path else DATA_DIR / STORAGE_FILES[backend])
+
+
+def migrate(source, target, include_reference=True):
+    """Copy everything from source to target, replacing the target's contents"""
+    annotations, problems = source.load_annotations()
+    for problem in problems:
+        # Conflicts were resolved and the winning rows are copied; other problems are rows left out
+        print(f"  {problem}" if problem.startswith("Conflict:") else f"  Skipped: {problem}")
+    target.replace_annotations(annotations)
+    print(f"Copied {len(annotations)} annotations from {source.name} to {target.name}")
+
+    if include_reference:
+        reference = source.load_reference_villages()
+        if reference is None:
+            print("No reference villages in source")
+        else:
+            target.replace_reference_villages(reference)
+            print(f"Copied {len(reference)} reference villages")
+    return len(annotations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy labeling data between storage backends")
+    parser.add_argument('--source', required=True, choices=STORAGE_BACKENDS)
+    parser.add_argument('--target', required=True, choices=STORAGE_BACKENDS)
+    parser.add_argument('--source-path', help="file of a local source backend")
+    parser.add_argument('--target-path', help="file of a local target backend")
+    parser.add_argument('--skip-reference', action='store_true', help="only copy annotations")
+    args = parser.parse_args()
+
+    if args.source == args.target and args.source_path == args.target_path:
+        parser.error("source and target are the same store")
+
+    source = open_store(args.source, args.source_path)
+    target = open_store(args.target, args.target_path)
+    migrate(source, target, include_reference=not args.skip_reference)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import threading
+import time
+
+
+class SharedAnnotationCache:
+    """Process-wide copy of the annotation set with a monotonically increasing version.
+
+    Every browser session reads the same snapshot instead of reading the sheet
+    itself. Snapshots are never mutated: saves and deletes publish a new list
+    under a new version (copy-on-write), so a session can keep using the list
+    it got while another session writes. Upstream reads go through a single
+    refresher - sessions that ask for a refresh while one is running wait for
+    it and reuse its result instead of issuing their own read. Adds and
+    removes made while a read is running are journaled and replayed onto its
+    result, so the read cannot undo them.
+    """
+
+    def __init__(self, max_age_seconds=60):
+        self.max_age_seconds = max_age_seconds
+        self.annotations = []
+        self.version = 0
+        self.loaded_at = None
+        self.stats = {'upstream_reads': 0, 'coalesced': 0, 'failed': 0, 'replayed': 0}
+        self._journal = None  # (op, payload) of writes made during an upstream read
+        self._lock = threading.Lock()          # guards publishing a new snapshot
+        self._refresh_lock = threading.Lock()  # only one upstream read at a time
+
+    def snapshot(self):
+        """Current (version, annotations); treat the list as read-only"""
+        with self._lock:
+            return self.version, self.annotations
+
+    def is_stale(self):
+        return self.loaded_at is None or time.time() - self.loaded_at > self.max_age_seconds
+
+    def _publish(self, annotations, loaded=False):
+        # Caller holds self._lock
+        self.annotations = annotations
+        self.version += 1
+        if loaded:
+            self.loaded_at = time.time()
+        return self.version, self.annotations
+
+    def _record(self, op, payload):
+        # Caller holds self._lock
+        if self._journal is not None:
+            self._journal.append((op, payload))
+
+    def _load(self, loader):
+        # Caller holds self._refresh_lock
+        with self._lock:
+            self._journal = []
+        self.stats['upstream_reads'] += 1
+        try:
+            annotations = loader()
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            if annotations is None:
+                # Keep serving the previous set; retry on the next request
+                self.stats['failed'] += 1
+                return self.version, self.annotations
+            annotations = list(annotations)
+            for op, payload in journal:
+                if op == 'add':
+                    if all(ann.get('annotation_id') != payload.get('annotation_id') for ann in annotations):
+                        annotations.append(payload)
+                else:
+                    annotations = [ann for ann in annotations if ann.get('annotation_id') != payload]
+            self.stats['replayed'] += len(journal)
+            return self._publish(annotations, loaded=True)
+
+    def refresh(self, loader):
+        """Reload from upstream with loader(), which returns a list or None on failure.
+
+        If another refresh finished while this call waited for the lock, its
+        result is returned and no second upstream read is made.
+        """
+        seen_loaded_at = self.loaded_at
+        with self._refresh_lock:
+            if self.loaded_at != seen_loaded_at:
+                self.stats['coalesced'] += 1
+                return self.snapshot()
+            return self._load(loader)
+
+    def refresh_in_background(self, loader):
+        """Reload from upstream in a daemon thread; False if a reload is already running.
+
+        Sessions keep getting the current snapshot until the reload publishes,
+        since get() never waits for a refresh another caller is running.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._load(loader)
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, name='annotation-cache-refresh', daemon=True).start()
+        return True
+
+    def seed(self, annotations, loaded_at=None):
+        """Start from a persisted annotation set instead of an upstream read.
+
+        Only applies before the first load. loaded_at is when the set was
+        read from upstream (default now), so a set persisted a while ago is
+        reloaded as soon as it is older than max_age_seconds.
+        """
+        with self._lock:
+            if self.loaded_at is not None:
+                return False
+            self._publish(list(annotations), loaded=True)
+            if loaded_at is not None:
+                self.loaded_at = loaded_at
+            return True
+
+    def get(self, loader):
+        """Snapshot, loading it on first use and reloading it once it is stale.
+
+        The first load blocks every session until it completes. A stale
+        snapshot is reloaded only by the session that wins the refresh lock;
+        the others keep serving the current snapshot meanwhile.
+        """
+        if self.loaded_at is None:
+            return self.refresh(loader)
+        if self.is_stale() and self._refresh_lock.acquire(blocking=False):
+            try:
+                return self._load(loader)
+            finally:
+                self._refresh_lock.release()
+        return self.snapshot()
+
+    def add(self, annotation):
+        """Publish a new snapshot with one annotation appended"""
+        with self._lock:
+            self._record('add', annotation)
+            return self._publish(self.annotations + [annotation])
+
+    def extend(self, annotations):
+        """Publish a new snapshot with a batch of annotations appended"""
+        annotations = list(annotations)
+        with self._lock:
+            for annotation in annotations:
+                self._record('add', annotation)
+            return self._publish(self.annotations + annotations)
+
+    def remove(self, annotation_id):
+        """Publish a new snapshot without one annotation"""
+        with self._lock:
+            self._record('remove', annotation_id)
+            return self._publish([ann for ann in self.annotations if ann.get('annotation_id') != annotation_id])
@@ -0,0 +1,129 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shapely
+from shapely.geometry import shape
+
+from .progress import normalize_key
+
+
+EXPORT_COLUMNS = [
+    'annotation_id', 'village_name', 'ward_name', 'district_name', 'region_name',
+    'village_type', 'is_treatment', 'timestamp', 'revision',
+]
+EXPORT_SCHEMA = pa.schema(
+    [(col, pa.bool_() if col == 'is_treatment' else pa.int64() if col == 'revision' else pa.string())
+     for col in EXPORT_COLUMNS]
+    + [('geometry', pa.binary())]
+)
+GEO_METADATA = {
+    'version': '1.0.0',
+    'primary_column': 'geometry',
+    'columns': {'geometry': {'encoding': 'WKB', 'geometry_types': []}},  # no crs = OGC:CRS84 (lon/lat)
+}
+
+
+def ward_attributes(reference_df=None, ward_gdf=None):
+    """(district, region) per normalized ward name, from the reference list, else the ward boundaries"""
+    lookup = {}
+    if ward_gdf is not None and {'ward_name', 'dist_name', 'reg_name'} <= set(ward_gdf.columns):
+        keys = normalize_key(ward_gdf['ward_name'])
+        lookup.update(zip(keys, zip(ward_gdf['dist_name'], ward_gdf['reg_name'])))
+    if reference_df is not None and {'ward_name', 'district_name', 'region_name'} <= set(reference_df.columns):
+        keys = normalize_key(reference_df['ward_name'])
+        lookup.update(zip(keys, zip(reference_df['district_name'], reference_df['region_name'])))
+    return lookup
+
+
+def _value(value):
+    """None for missing values (NaN/NA from pandas-backed stores), else the value itself"""
+    return None if pd.api.types.is_scalar(value) and pd.isna(value) else value
+
+
+def export_records(annotations, attributes):
+    """Flat export rows for a chunk of annotations, geometry kept as a GeoJSON dict"""
+    wards = normalize_key([ann.get('ward_name', '') for ann in annotations])
+    records = []
+    for ann, ward_key in zip(annotations, wards):
+        district, region = attributes.get(ward_key, (None, None))
+        record = {col: _value(ann.get(col)) for col in EXPORT_COLUMNS}
+        record['district_name'], record['region_name'] = _value(district), _value(region)
+        record['is_treatment'] = bool(record['is_treatment']) if record['is_treatment'] is not None else None
+        record['revision'] = int(record['revision'] or 0)
+        record['geometry'] = ann['geometry']
+        records.append(record)
+    return records
+
+
+class GeoJSONStreamWriter:
+    """Writes a FeatureCollection one chunk of features at a time"""
+
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write('{"type": "FeatureCollection", "features": [\n')
+        self.count = 0
+
+    def write(self, records):
+        for record in records:
+            properties = {col: record[col] for col in EXPORT_COLUMNS}
+            feature = {'type': 'Feature', 'properties': properties, 'geometry': record['geometry']}
+            self.file.write((',\n' if self.count else '') + json.dumps(feature, default=str))
+            self.count += 1
+
+    def close(self):
+        self.file.write('\n]}\n')
+        self.file.close()
+
+
+class GeoParquetStreamWriter:
+    """Writes GeoParquet (WKB geometry, EPSG:4326) one row group per chunk.
+
+    The geo metadata is part of the schema written up front, so geometry
+    types are left unspecified (an empty list) rather than collected first.
+    """
+
+    def __init__(self, path):
+        self.writer = pq.ParquetWriter(path, EXPORT_SCHEMA.with_metadata({b'geo': json.dumps(GEO_METADATA).encode('utf-8')}))
+
+    def write(self, records):
+        if not records:
+            return
+        columns = {col: [record[col] for record in records] for col in EXPORT_COLUMNS}
+        columns['geometry'] = list(shapely.to_wkb([shape(record['geometry']) for record in records]))
+        self.writer.write_table(pa.table(columns, schema=EXPORT_SCHEMA))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_annotations(store, geojson_path=None, parquet_path=None, reference_df=None, ward_gdf=None, chunk_size=500):
+    """Stream all annotations from a store to GeoJSON and/or GeoParquet, chunk by chunk.
+
+    Only one chunk of annotations is held in memory at a time. Returns the
+    number of features written.
+    """
+    attributes = ward_attributes(reference_df, ward_gdf)
+    outputs = [(Path(path), writer_class) for path, writer_class in
+               [(geojson_path, GeoJSONStreamWriter), (parquet_path, GeoParquetStreamWriter)] if path is not None]
+    writers = []
+    for path, writer_class in outputs:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        writers.append(writer_class(path.with_name(path.name + '.partial')))
+
+    # Written to .partial files and moved into place at the end, so readers never see half a file
+    count = 0
+    try:
+        for chunk in store.iter_annotations(chunk_size):
+            records = export_records(chunk, attributes)
+            for writer in writers:
+                writer.write(records)
+            count += len(records)
+    finally:
+        for writer in writers:
+            writer.close()
+    for path, _ in outputs:
+        path.with_name(path.name + '.partial').replace(path)
+    return count
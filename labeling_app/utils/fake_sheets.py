@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeQuotaError(Exception):
+    """Raised like gspread's APIError when the emulated quota is exhausted"""
+
+    def __init__(self, message='429 Quota exceeded for quota metric "Read requests"'):
+        super().__init__(message)
+        self.response = FakeResponse(429)
+
+
+class FakeSheetsConnection:
+    """In-memory stand-in for GSheetsConnection (whole-worksheet read/update plus row appends).
+
+    Optionally emulates request latency and a per-minute request quota, so
+    SheetsClient and the app can be exercised locally without Google APIs.
+    """
+
+    def __init__(self, worksheets=None, latency=0.0, quota_per_minute=None, clock=time.monotonic):
+        self.worksheets = {name: df.copy() for name, df in (worksheets or {}).items()}
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.clock = clock
+        self.calls = {'read': 0, 'update': 0, 'append': 0, 'rejected': 0}
+        self._requests = deque()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_directory(cls, path, **kwargs):
+        """Connection with one worksheet per CSV file in a directory (file name = worksheet name)"""
+        return cls({csv.stem: pd.read_csv(csv) for csv in sorted(Path(path).glob('*.csv'))}, **kwargs)
+
+    def to_directory(self, path):
+        """Write every worksheet to <path>/<worksheet>.csv"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for name, df in self.worksheets.items():
+                df.to_csv(path / f"{name}.csv", index=False)
+
+    def _admit(self):
+        with self._lock:
+            if self.quota_per_minute is not None:
+                now = self.clock()
+                while self._requests and now - self._requests[0] > 60:
+                    self._requests.popleft()
+                if len(self._requests) >= self.quota_per_minute:
+                    self.calls['rejected'] += 1
+                    raise FakeQuotaError()
+                self._requests.append(now)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def read(self, worksheet='Sheet1', ttl=None, **kwargs):
+        self._admit()
+        with self._lock:
+            self.calls['read'] += 1
+            return self.worksheets.get(worksheet, pd.DataFrame()).copy()
+
+    def update(self, worksheet='Sheet1', data=None, **kwargs):
+        self._admit()
+        with self._lock:
+            self.calls['update'] += 1
+            self.worksheets[worksheet] = data.copy()
+            return data
+
+    def append(self, worksheet='Sheet1', rows=None, **kwargs):
+        self._admit()
+        with self._lock:
+            self.calls['append'] += 1
+            current = self.worksheets.get(worksheet)
+            new_rows = pd.DataFrame(rows)
+            self.worksheets[worksheet] = new_rows if current is None or current.empty else pd.concat([current, new_rows], ignore_index=True)
@@ -0,0 +1,44 @@
+import json
+
+import shapely
+from shapely.geometry import shape
+
+
+def polygon_parts(geom):
+    """Polygon or MultiPolygon of the polygonal parts of a geometry (make_valid can return collections)"""
+    if geom.geom_type in ('Polygon', 'MultiPolygon'):
+        return geom
+    parts = [part for part in shapely.get_parts(geom) if part.geom_type in ('Polygon', 'MultiPolygon')]
+    return shapely.union_all(parts) if parts else shapely.Polygon()
+
+
+def normalize_geometry(geometry, precision=1e-6):
+    """Compact, valid version of a drawn or imported polygon; returns (GeoJSON geometry, original vertex count).
+
+    Coordinates are snapped to a grid of `precision` degrees (1e-6 is about
+    10 cm), which also drops duplicate vertices. Vertices that lie on the line
+    between their neighbours within that precision are removed, invalid rings
+    are repaired, and rings are oriented as GeoJSON expects (exterior
+    counter-clockwise, holes clockwise).
+    """
+    geom = shapely.force_2d(shape(geometry))
+    original_vertex_count = int(shapely.get_num_coordinates(geom))
+    # Snapping needs valid input; the snapped result is valid again
+    if not geom.is_valid:
+        geom = polygon_parts(shapely.make_valid(geom))
+    geom = shapely.set_precision(geom, precision)
+    geom = shapely.remove_repeated_points(geom)
+    geom = shapely.simplify(geom, precision, preserve_topology=True)
+    if not geom.is_valid:
+        geom = shapely.make_valid(geom)
+    geom = polygon_parts(geom)
+    if geom.is_empty:
+        raise ValueError("Geometry has no area left after normalization")
+    geom = shapely.orient_polygons(geom, exterior_cw=False)
+    return json.loads(shapely.to_geojson(geom)), original_vertex_count
+
+
+def normalize_annotation(annotation, precision=1e-6):
+    """Copy of an annotation with its geometry normalized and the original vertex count recorded"""
+    geometry, original_vertex_count = normalize_geometry(annotation['geometry'], precision)
+    return {**annotation, 'geometry': geometry, 'original_vertex_count': original_vertex_count}
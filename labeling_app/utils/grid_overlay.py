@@ -0,0 +1,138 @@
+import json
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.strtree import STRtree
+
+from .map_layers import round_coordinates
+
+
+GRID_FLAG_COLUMNS = ['is_treatment_ward', 'is_program_region', 'is_adjacent_region']
+GRID_CATEGORY_COLORS = {
+    'treatment': '#d7301f',
+    'program': '#fc8d59',
+    'adjacent': '#4575b4',
+    'other': '#969696',
+}
+
+
+def grid_category(treatment_share, program_share, adjacent_share):
+    """Colour category for a cell or aggregate from its flag shares"""
+    if treatment_share > 0:
+        return 'treatment'
+    if program_share > 0:
+        return 'program'
+    if adjacent_share > 0:
+        return 'adjacent'
+    return 'other'
+
+
+class GridOverlay:
+    """Viewport-culled grid layer with coarser aggregates when zoomed out.
+
+    Level 0 holds the individual grid cells; each further level merges
+    factor x factor blocks of the regular (col, row) lattice into one cell.
+    Every level has its own STRtree, so a viewport query only touches the
+    cells it returns.
+    """
+
+    def __init__(self, grid_gdf, max_cells=2500, min_detail_zoom=13, aggregate_factors=(4, 16)):
+        self.max_cells = max_cells
+        self.min_detail_zoom = min_detail_zoom
+
+        cells = pd.DataFrame({
+            col: grid_gdf[col].fillna(False).astype(bool) if col in grid_gdf else False
+            for col in GRID_FLAG_COLUMNS
+        }, index=grid_gdf.index)
+        cells['grid_id'] = grid_gdf['grid_id'].astype(str).values if 'grid_id' in grid_gdf else grid_gdf.index.astype(str)
+        cells['n_cells'] = 1
+        geometries = np.asarray(grid_gdf.geometry.values)
+        self.levels = [self._build_level(1, geometries, cells)]
+
+        # Aggregates need the lattice position of each cell
+        if {'col', 'row'}.issubset(grid_gdf.columns):
+            bounds = shapely.bounds(geometries)
+            lattice = pd.DataFrame({
+                'col': grid_gdf['col'].values,
+                'row': grid_gdf['row'].values,
+                'minx': bounds[:, 0], 'miny': bounds[:, 1],
+                'maxx': bounds[:, 2], 'maxy': bounds[:, 3],
+            })
+            for col in GRID_FLAG_COLUMNS:
+                lattice[col] = cells[col].values
+            for factor in aggregate_factors:
+                self.levels.append(self._aggregate(lattice, factor))
+
+    @staticmethod
+    def _build_level(factor, geometries, properties):
+        """Geometries, properties and spatial index for one level"""
+        properties = properties.reset_index(drop=True)
+        properties['category'] = [
+            grid_category(t, p, a) for t, p, a in zip(
+                properties['is_treatment_ward'], properties['is_program_region'], properties['is_adjacent_region']
+            )
+        ]
+        return {
+            'factor': factor,
+            'geometries': geometries,
+            'properties': properties,
+            'tree': STRtree(geometries),
+        }
+
+    def _aggregate(self, lattice, factor):
+        """Merge factor x factor blocks of the lattice into coarser cells"""
+        grouped = lattice.groupby([lattice['col'] // factor, lattice['row'] // factor]).agg(
+            minx=('minx', 'min'), miny=('miny', 'min'),
+            maxx=('maxx', 'max'), maxy=('maxy', 'max'),
+            n_cells=('minx', 'size'),
+            is_treatment_ward=('is_treatment_ward', 'mean'),
+            is_program_region=('is_program_region', 'mean'),
+            is_adjacent_region=('is_adjacent_region', 'mean'),
+        )
+        geometries = shapely.box(grouped['minx'], grouped['miny'], grouped['maxx'], grouped['maxy'])
+        properties = grouped[['n_cells'] + GRID_FLAG_COLUMNS].reset_index(drop=True)
+        properties['grid_id'] = [f"A{factor}_{c:04d}_{r:04d}" for c, r in grouped.index]
+        return self._build_level(factor, np.asarray(geometries), properties)
+
+    def cells_in_view(self, bounds, zoom):
+        """Return (FeatureCollection, info) for the cells intersecting a lon/lat bbox.
+
+        Starts at full detail when zoomed in far enough and moves to coarser
+        levels until the result fits the cell budget; the coarsest level is
+        thinned evenly if it still does not fit.
+        """
+        viewport = shapely.box(*bounds)
+        start_level = 0 if zoom is None or zoom >= self.min_detail_zoom else min(1, len(self.levels) - 1)
+
+        for level in self.levels[start_level:]:
+            indices = level['tree'].query(viewport)
+            if len(indices) <= self.max_cells:
+                break
+
+        truncated = len(indices) > self.max_cells
+        if truncated:
+            step = int(np.ceil(len(indices) / self.max_cells))
+            indices = np.sort(indices)[::step]
+        else:
+            indices = np.sort(indices)
+
+        properties = level['properties'].iloc[indices]
+        features = []
+        for geojson, row in zip(shapely.to_geojson(level['geometries'][indices]), properties.itertuples(index=False)):
+            geometry = json.loads(geojson)
+            geometry['coordinates'] = round_coordinates(geometry['coordinates'], 5)
+            features.append({
+                'type': 'Feature',
+                'geometry': geometry,
+                'properties': {
+                    'grid_id': row.grid_id,
+                    'n_cells': int(row.n_cells),
+                    'treatment_pct': round(float(row.is_treatment_ward) * 100, 1),
+                    'category': row.category,
+                    'color': GRID_CATEGORY_COLORS[row.category],
+                },
+            })
+
+        info = {'factor': level['factor'], 'n_features': len(features), 'truncated': truncated}
+        return {'type': 'FeatureCollection', 'features': features}, info
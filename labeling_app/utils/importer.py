@@ -0,0 +1,159 @@
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+from shapely.geometry import mapping
+
+from .geometry import normalize_geometry
+from .progress import normalize_key
+from .reference_index import ReferenceIndex, normalize_name
+from .storage import new_annotation_id
+
+
+VILLAGE_NAME_FIELDS = ['village_name', 'village', 'vil_name', 'kijiji', 'name']
+WARD_NAME_FIELDS = ['ward_name', 'ward', 'kata']
+SUPPORTED_EXTENSIONS = ['.geojson', '.json', '.kml', '.zip', '.shp', '.gpkg']
+
+
+def read_boundary_file(path):
+    """Polygons from a GeoJSON, KML, GeoPackage or (zipped) Shapefile, in EPSG:4326"""
+    path = Path(path)
+    if path.suffix.lower() == '.zip':
+        gdf = gpd.read_file(f"zip://{path}")
+    elif path.suffix.lower() == '.kml':
+        gdf = gpd.read_file(path, driver='KML')
+    else:
+        gdf = gpd.read_file(path)
+
+    if gdf.crs is None:
+        # GeoJSON and KML are lon/lat by definition
+        gdf = gdf.set_crs('EPSG:4326')
+    elif gdf.crs != 'EPSG:4326':
+        gdf = gdf.to_crs('EPSG:4326')
+    return gdf
+
+
+def read_uploaded_file(name, data):
+    """read_boundary_file for uploaded bytes (e.g. from st.file_uploader)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / Path(name).name
+        path.write_bytes(data)
+        return read_boundary_file(path)
+
+
+def find_field(columns, candidates):
+    """First column whose lower-cased name is one of the candidates"""
+    lookup = {str(col).strip().lower(): col for col in columns}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def assign_wards(gdf, ward_gdf):
+    """Ward name of the ward containing each feature's representative point"""
+    points = gpd.GeoDataFrame(geometry=gdf.geometry.representative_point(), crs=gdf.crs, index=gdf.index)
+    joined = gpd.sjoin(points, ward_gdf[['ward_name', 'geometry']], how='left', predicate='within')
+    return joined[~joined.index.duplicated()]['ward_name'].reindex(gdf.index)
+
+
+def plan_import(gdf, reference_df, annotations=(), validator=None, ward_gdf=None,
+                village_field=None, ward_field=None, reference_index=None, precision=1e-6):
+    """Match features to reference villages and check them, without writing anything.
+
+    Features are matched on the normalized (village, ward) name. The ward
+    comes from ward_field, or from the ward polygon containing the feature
+    when the file has no ward column. Returns one row per feature with a
+    status - only 'ready' rows carry an annotation to commit. Pass the
+    ReferenceIndex of reference_df when there is one, to skip building it.
+    Geometries are normalized as drawn polygons are (see normalize_geometry).
+    """
+    village_field = village_field or find_field(gdf.columns, VILLAGE_NAME_FIELDS)
+    ward_field = ward_field or find_field(gdf.columns, WARD_NAME_FIELDS)
+    if village_field is None:
+        raise ValueError(f"No village name column found - expected one of {VILLAGE_NAME_FIELDS}")
+
+    if ward_field is not None:
+        wards = gdf[ward_field]
+    elif ward_gdf is not None:
+        wards = assign_wards(gdf, ward_gdf)
+    else:
+        raise ValueError(f"No ward column found (expected one of {WARD_NAME_FIELDS}) and no ward boundaries to look it up")
+
+    reference = reference_index if reference_index is not None else ReferenceIndex.from_dataframe(reference_df)
+
+    mapped = {
+        (village, ward) for village, ward in zip(
+            normalize_key([ann.get('village_name', '') for ann in annotations]),
+            normalize_key([ann.get('ward_name', '') for ann in annotations])
+        )
+    }
+
+    timestamp = datetime.now().isoformat()
+    rows = []
+    seen = set()
+    for (idx, feature), ward in zip(gdf.iterrows(), wards):
+        village = feature[village_field]
+        row = {'feature': idx, 'village_name': village, 'ward_name': ward, 'status': 'ready', 'flags': '', 'annotation': None}
+        geom = feature.geometry
+        key = (normalize_name(village), normalize_name(ward))
+
+        if geom is None or geom.is_empty:
+            row['status'] = 'no geometry'
+        elif geom.geom_type not in ('Polygon', 'MultiPolygon'):
+            row['status'] = f"not a polygon ({geom.geom_type})"
+        elif pd.isna(ward):
+            row['status'] = 'outside all wards'
+        elif key not in reference.village_info:
+            row['status'] = 'no matching reference village'
+        elif key in mapped:
+            row['status'] = 'already mapped'
+        elif key in seen:
+            row['status'] = 'duplicate in file'
+        rows.append(row)
+        if row['status'] != 'ready':
+            continue
+
+        # Use the reference spelling so progress matching is exact
+        match = reference.village_info[key]
+        row['village_name'], row['ward_name'] = match['village'], match['ward']
+        geom = shapely.force_2d(geom)
+        if not geom.is_valid:
+            row['flags'] = 'geometry repaired'
+        try:
+            geometry, original_vertex_count = normalize_geometry(mapping(geom), precision)
+        except ValueError:
+            row['status'] = 'no area at storage precision'
+            continue
+        seen.add(key)
+
+        if validator is not None:
+            qc = validator.validate(geometry, row['ward_name'], row['village_name'])
+            row['flags'] = '; '.join(filter(None, [row['flags']] + qc['flags']))
+
+        row['annotation'] = {
+            'annotation_id': new_annotation_id(),
+            'revision': 0,
+            'village_name': row['village_name'],
+            'village_type': 'Treatment',
+            'is_treatment': True,
+            'ward_name': row['ward_name'],
+            'geometry': geometry,
+            'timestamp': timestamp,
+            'original_vertex_count': original_vertex_count,
+        }
+    return pd.DataFrame(rows)
+
+
+def commit_import(store, plan):
+    """Write all ready annotations of a plan in one storage write; returns (saved, conflicts)"""
+    annotations = [ann for ann in plan['annotation'] if ann is not None] if len(plan) else []
+    if not annotations:
+        return [], []
+    conflicts = store.add_annotations(annotations)
+    conflict_ids = {ann['annotation_id'] for ann in conflicts}
+    saved = [ann for ann in annotations if ann['annotation_id'] not in conflict_ids]
+    return saved, conflicts
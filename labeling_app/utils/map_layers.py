@@ -0,0 +1,108 @@
+import folium
+from folium import plugins
+
+from .profiling import timed
+
+
+ANNOTATION_POPUP_FIELDS = ['village_name', 'village_type', 'ward_name']
+ANNOTATION_POPUP_ALIASES = ['Village:', 'Type:', 'Ward:']
+
+
+def round_coordinates(coords, precision):
+    """Recursively round nested GeoJSON coordinate arrays"""
+    if isinstance(coords, (int, float)):
+        return round(coords, precision)
+    return [round_coordinates(c, precision) for c in coords]
+
+
+@timed('build_annotation_features')
+def build_annotation_feature_collection(annotations, precision=6):
+    """Combine all annotations into one precision-reduced GeoJSON FeatureCollection"""
+    features = []
+    for ann in annotations:
+        geometry = ann.get('geometry')
+        if not geometry or 'coordinates' not in geometry:
+            continue
+        is_treatment = bool(ann.get('is_treatment', False))
+        features.append({
+            'type': 'Feature',
+            'geometry': {
+                'type': geometry['type'],
+                'coordinates': round_coordinates(geometry['coordinates'], precision),
+            },
+            'properties': {
+                'village_name': str(ann.get('village_name', 'Unknown')),
+                'village_type': str(ann.get('village_type', 'Unknown')),
+                'ward_name': str(ann.get('ward_name', 'Unknown')),
+                'color': 'red' if is_treatment else 'blue',
+            },
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def annotation_style(feature):
+    """Data-driven style: colour comes from the feature properties"""
+    color = feature['properties'].get('color', 'blue')
+    return {'fillColor': color, 'color': color, 'weight': 2, 'fillOpacity': 0.3}
+
+
+def create_annotation_layer(feature_collection, name='Mapped Villages'):
+    """Single folium layer for all annotations with properties-based popups and tooltips"""
+    return folium.GeoJson(
+        feature_collection,
+        name=name,
+        style_function=annotation_style,
+        popup=folium.GeoJsonPopup(fields=ANNOTATION_POPUP_FIELDS, aliases=ANNOTATION_POPUP_ALIASES),
+        tooltip=folium.GeoJsonTooltip(fields=['village_name', 'village_type'], aliases=['Village:', 'Type:']),
+    )
+
+
+def grid_style(feature):
+    """Grid cells coloured by treatment/program category"""
+    color = feature['properties'].get('color', '#969696')
+    return {'color': color, 'weight': 1, 'fillColor': color, 'fillOpacity': 0.15, 'opacity': 0.6}
+
+
+def create_grid_layer(feature_collection, name='500m Grid'):
+    """Folium layer for the viewport-culled grid cells"""
+    return folium.GeoJson(
+        feature_collection,
+        name=name,
+        style_function=grid_style,
+        tooltip=folium.GeoJsonTooltip(
+            fields=['grid_id', 'category', 'n_cells', 'treatment_pct'],
+            aliases=['Cell:', 'Category:', 'Cells:', 'Treatment %:']
+        ),
+    )
+
+
+# Leaflet.VectorGrid style functions, keyed by vector tile layer name
+VECTOR_TILE_STYLES = {
+    'wards': """function(properties, zoom) {
+        var color = properties.is_treatment ? 'red' : '#555555';
+        return {color: color, weight: 1, opacity: 0.6, fill: true, fillColor: color, fillOpacity: 0.03};
+    }""",
+    'grid': """function(properties, zoom) {
+        var color = properties.is_treatment_ward ? '#d7301f' : (properties.is_program_region ? '#fc8d59' : (properties.is_adjacent_region ? '#4575b4' : '#969696'));
+        return {color: color, weight: 0.5, opacity: 0.6, fill: true, fillColor: color, fillOpacity: 0.15};
+    }""",
+    'annotations': """function(properties, zoom) {
+        var color = properties.is_treatment ? 'red' : 'blue';
+        return {color: color, weight: 2, fill: true, fillColor: color, fillOpacity: 0.3};
+    }""",
+}
+HIDDEN_VECTOR_TILE_STYLE = "function(properties, zoom) { return {stroke: false, fill: false}; }"
+
+
+def create_vector_tile_layer(url, name, visible_layers, all_layers, max_native_zoom=14):
+    """VectorGrid layer for a tile URL, styling only the listed layers and hiding the rest"""
+    styles = ',\n'.join(
+        f"{layer}: {VECTOR_TILE_STYLES[layer] if layer in visible_layers else HIDDEN_VECTOR_TILE_STYLE}"
+        for layer in all_layers
+    )
+    options = f"""{{
+        vectorTileLayerStyles: {{ {styles} }},
+        interactive: false,
+        maxNativeZoom: {max_native_zoom}
+    }}"""
+    return plugins.VectorGridProtobuf(url, name=name, options=options)
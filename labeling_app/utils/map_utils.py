@@ -37,7 +37,11 @@ class DataLoader:
                     continue
         
         raise FileNotFoundError(f"Could not find grid data in any supported format in {self.data_dir / 'processed'}")
-    
+
+    def _load_parquet_grid(self, grid_file):
+        """Load a GeoParquet grid file"""
+        return gpd.read_parquet(grid_file)
+
     def load_ward_data(self):
         """Load ward boundaries with flags"""
         ward_file = self.data_dir / "processed" / "relevant_wards_with_flags.geojson"
@@ -0,0 +1,134 @@
+import functools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+class MetricsRecorder:
+    """Latency samples and counters for one scope - a browser session or the whole process.
+
+    Keeps the last max_samples timings per name for percentiles, plus the
+    timings of the current and previous rerun for a per-rerun breakdown.
+    """
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(float)
+        self.current_rerun = {}
+        self.previous_rerun = {}
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+
+    def start_rerun(self):
+        with self._lock:
+            self.previous_rerun = self.current_rerun
+            self.current_rerun = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples[name].append(seconds)
+            self.calls[name] += 1
+            self.current_rerun[name] = self.current_rerun.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def summary(self):
+        """One row per timer: calls, p50/p95/max in milliseconds"""
+        import numpy as np  # not at module level - the app imports this before its first paint
+        with self._lock:
+            samples = {name: np.array(values) * 1000 for name, values in self._samples.items()}
+            calls = dict(self.calls)
+        return [
+            {
+                'name': name,
+                'calls': calls[name],
+                'p50_ms': round(float(np.percentile(values, 50)), 1),
+                'p95_ms': round(float(np.percentile(values, 95)), 1),
+                'max_ms': round(float(values.max()), 1),
+            }
+            for name, values in sorted(samples.items())
+        ]
+
+
+# Process-wide metrics; session recorders are attached to the thread running their script
+PROCESS_METRICS = MetricsRecorder()
+_local = threading.local()
+
+
+def activate(recorder):
+    """Send timings from this thread to a session recorder as well as the process recorder"""
+    _local.recorder = recorder
+
+
+def current_recorder():
+    return getattr(_local, 'recorder', None)
+
+
+def _recorders():
+    session = current_recorder()
+    return [PROCESS_METRICS] if session is None else [PROCESS_METRICS, session]
+
+
+def record(name, seconds):
+    """Record a timing measured elsewhere"""
+    for recorder in _recorders():
+        recorder.record(name, seconds)
+
+
+@contextmanager
+def timer(name):
+    """Time a block under a metric name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name=None):
+    """Decorator timing every call of a function"""
+    def decorator(fn):
+        metric = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(metric):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    """Add to a counter (bytes serialized, API calls, cache hits, ...)"""
+    for recorder in _recorders():
+        recorder.count(name, amount)
+
+
+def export_metrics(path, scopes, extra=None):
+    """Append one JSON line per timer and counter of each scope ({scope name: recorder})"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().isoformat()
+    with open(path, 'a', encoding='utf-8') as f:
+        for scope, recorder in scopes.items():
+            for row in recorder.summary():
+                f.write(json.dumps({'time': timestamp, 'scope': scope, 'kind': 'timer', **row, **(extra or {})}) + '\n')
+            for name, value in sorted(recorder.counters.items()):
+                f.write(json.dumps({'time': timestamp, 'scope': scope, 'kind': 'counter', 'name': name, 'value': value, **(extra or {})}) + '\n')
+
+
+def export_rerun(path, timings, extra=None):
+    """Append the timings of one rerun as a single JSON line"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    record = {'time': datetime.now().isoformat(), 'kind': 'rerun', **(extra or {}),
+              'timings_ms': {name: round(seconds * 1000, 2) for name, seconds in timings.items()}}
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from .profiling import timed
+
+
+REFERENCE_COLUMNS = {
+    'village_name': 'village',
+    'ward_name': 'ward',
+    'district_name': 'district',
+    'region_name': 'region',
+}
+
+
+def normalize_key(values):
+    """Case/whitespace-insensitive matching key for names"""
+    return pd.Series(values, dtype='object').astype(str).str.strip().str.upper()
+
+
+def _rollup(grouped):
+    """Add remaining and completion columns to a total/mapped rollup"""
+    grouped = grouped.copy()
+    grouped['mapped'] = grouped['mapped'].astype(int)
+    grouped['remaining'] = grouped['total'] - grouped['mapped']
+    grouped['completion_pct'] = (grouped['mapped'] / grouped['total'] * 100).round(1)
+    return grouped
+
+
+@timed()
+def compute_progress(reference_df, annotations, reference_index=None):
+    """Mapped status of every reference village plus ward/district/region rollups.
+
+    Mapped status comes from a single merge on normalized (village, ward)
+    keys, and the district and region rollups are summed from the one
+    ward-level groupby, so the cost does not depend on per-row Python loops.
+    With a ReferenceIndex the reference keys are taken from it instead of
+    being normalized again.
+    """
+    if reference_index is not None:
+        villages = reference_index.table.copy()
+    else:
+        villages = reference_df.rename(columns=REFERENCE_COLUMNS).copy()
+        for col in REFERENCE_COLUMNS.values():
+            if col not in villages.columns:
+                villages[col] = ''
+        villages['village_key'] = normalize_key(villages['village']).values
+        villages['ward_key'] = normalize_key(villages['ward']).values
+
+    mapped_keys = pd.DataFrame({
+        'village_key': normalize_key([ann.get('village_name', '') for ann in annotations]).values,
+        'ward_key': normalize_key([ann.get('ward_name', '') for ann in annotations]).values,
+    }).drop_duplicates()
+    mapped_keys['mapped'] = True
+
+    villages = villages.merge(mapped_keys, on=['village_key', 'ward_key'], how='left')
+    villages['mapped'] = villages['mapped'].notna()
+    villages = villages.drop(columns=['village_key', 'ward_key'])
+
+    ward_rollup = villages.groupby(['region', 'district', 'ward'], dropna=False).agg(
+        total=('village', 'count'),
+        mapped=('mapped', 'sum'),
+    )
+    district_rollup = ward_rollup.groupby(level='district').sum()
+    region_rollup = ward_rollup.groupby(level='region').sum()
+
+    # Village names per ward, split by status, for the tracker lists
+    village_lists = villages.groupby(['ward', 'mapped'])['village'].agg(list).to_dict()
+
+    total = len(villages)
+    total_mapped = int(villages['mapped'].sum())
+    return {
+        'villages': villages,
+        'wards': _rollup(ward_rollup).reset_index().sort_values('completion_pct', ascending=False),
+        'districts': _rollup(district_rollup),
+        'regions': _rollup(region_rollup),
+        'village_lists': village_lists,
+        'total': total,
+        'mapped': total_mapped,
+        'completion_pct': (total_mapped / total * 100) if total > 0 else 0,
+    }
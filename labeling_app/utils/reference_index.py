@@ -0,0 +1,85 @@
+import re
+
+import pandas as pd
+
+from .progress import REFERENCE_COLUMNS, normalize_key
+
+
+# Entries of treatment_villages in region_coverage_plan.json
+VILLAGE_STRING = re.compile(r"^(?P<village>.+?) village in (?P<ward>.+?) ward, (?P<district>.+?) district$")
+
+
+def normalize_name(name):
+    """Scalar version of normalize_key"""
+    return str(name).strip().upper()
+
+
+class ReferenceIndex:
+    """Reference villages keyed by normalized names, built once per reference data version.
+
+    - table: the reference list with village/ward/district/region columns plus
+      precomputed village_key and ward_key (input to compute_progress)
+    - villages_by_ward: ward key -> village names in reference order
+    - village_info: (village key, ward key) -> village, ward, district and region
+      in the reference spelling (the first row wins for duplicates)
+    - ward_info: ward key -> ward, district, region and number of villages
+    """
+
+    def __init__(self, table):
+        table = table.copy()
+        for col in REFERENCE_COLUMNS.values():
+            if col not in table.columns:
+                table[col] = ''
+        table['village_key'] = normalize_key(table['village']).values
+        table['ward_key'] = normalize_key(table['ward']).values
+        self.table = table.reset_index(drop=True)
+
+        self.villages_by_ward = {}
+        self.village_info = {}
+        self.ward_info = {}
+        columns = ['village', 'ward', 'district', 'region', 'village_key', 'ward_key']
+        for village, ward, district, region, village_key, ward_key in self.table[columns].itertuples(index=False):
+            key = (village_key, ward_key)
+            if key in self.village_info:
+                continue
+            self.village_info[key] = {'village': village, 'ward': ward, 'district': district, 'region': region}
+            self.villages_by_ward.setdefault(ward_key, []).append(village)
+            info = self.ward_info.setdefault(ward_key, {'ward': ward, 'district': district, 'region': region, 'count': 0})
+            info['count'] += 1
+
+    @classmethod
+    def from_dataframe(cls, reference_df):
+        """Index of a reference village table (village_name, ward_name, district_name, region_name)"""
+        return cls(reference_df.rename(columns=REFERENCE_COLUMNS))
+
+    @classmethod
+    def from_village_strings(cls, village_strings):
+        """Index of '<village> village in <ward> ward, <district> district' strings; others are skipped"""
+        matches = (VILLAGE_STRING.match(text.strip()) for text in village_strings)
+        return cls(pd.DataFrame(
+            [match.groupdict() for match in matches if match],
+            columns=['village', 'ward', 'district']
+        ))
+
+    def __len__(self):
+        return len(self.village_info)
+
+    def __contains__(self, village_ward):
+        village, ward = village_ward
+        return (normalize_name(village), normalize_name(ward)) in self.village_info
+
+    @property
+    def n_wards(self):
+        return len(self.ward_info)
+
+    def villages_in_ward(self, ward):
+        """Village names of a ward in reference order"""
+        return self.villages_by_ward.get(normalize_name(ward), [])
+
+    def lookup(self, village, ward):
+        """Reference entry for a village in a ward, or None"""
+        return self.village_info.get((normalize_name(village), normalize_name(ward)))
+
+    def ward(self, ward):
+        """District, region and village count of a ward, or None"""
+        return self.ward_info.get(normalize_name(ward))
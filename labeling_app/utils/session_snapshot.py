@@ -0,0 +1,150 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+SNAPSHOT_FORMAT = 1
+SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def valid_session_id(sid):
+    """Session ids come from the URL and name files - only accept what new_session_id makes"""
+    return isinstance(sid, str) and bool(SESSION_ID.match(sid))
+
+
+def _json_default(value):
+    # numpy scalars and timestamps from pandas
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def digest(data):
+    """Content token of snapshot data"""
+    return hashlib.sha1(json.dumps(data, default=_json_default, sort_keys=True).encode()).hexdigest()
+
+
+class SnapshotStore:
+    """Versioned, gzip-compressed JSON snapshots in a local directory.
+
+    Each snapshot is one file <name>.json.gz holding the format version, the
+    time it was saved and the data. JSON instead of pickle: a snapshot can be
+    read by any version of the app and never executes code, and a file from
+    another format version is ignored rather than misread. Files are written
+    to a temporary name and renamed, so a crash leaves the previous snapshot.
+
+    save() skips the write when the token (by default a digest of the data)
+    matches the last one written under that name. Large snapshots can be
+    written from a background thread; only the latest queued token is written.
+    """
+
+    def __init__(self, directory, max_age_seconds=86400):
+        self.directory = Path(directory)
+        self.max_age_seconds = max_age_seconds
+        self.stats = {'written': 0, 'unchanged': 0, 'restored': 0, 'expired': 0, 'invalid': 0}
+        self._tokens = {}  # name -> token of the last snapshot written or queued
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name):
+        return self.directory / f"{name}.json.gz"
+
+    def load(self, name, max_age_seconds=None):
+        """(data, saved_at) of a snapshot, or (None, None) if missing, expired or unreadable"""
+        max_age_seconds = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        path = self.path(name)
+        if not path.exists():
+            return None, None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            self.stats['invalid'] += 1
+            return None, None
+        if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+            self.stats['invalid'] += 1
+            return None, None
+        if time.time() - snapshot['saved_at'] > max_age_seconds:
+            self.stats['expired'] += 1
+            return None, None
+        self.stats['restored'] += 1
+        return snapshot['data'], snapshot['saved_at']
+
+    def _write(self, name, text):
+        path = self.path(name)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self.stats['written'] += 1
+
+    def _serialize(self, data):
+        return json.dumps({'format': SNAPSHOT_FORMAT, 'saved_at': time.time(), 'data': data},
+                          default=_json_default, separators=(',', ':'))
+
+    def save(self, name, data, token=None):
+        """Write a snapshot if it changed; returns True when it was written"""
+        if token is None:
+            token = digest(data)
+        with self._lock:
+            if self._tokens.get(name) == token:
+                self.stats['unchanged'] += 1
+                return False
+            self._tokens[name] = token
+        with self._write_lock:
+            self._write(name, self._serialize(data))
+        return True
+
+    def save_in_background(self, name, data, token):
+        """Queue a write of data (which must not be mutated afterwards) under a new token"""
+        with self._lock:
+            if self._tokens.get(name) == token:
+                self.stats['unchanged'] += 1
+                return False
+            self._tokens[name] = token
+
+        def write():
+            with self._write_lock:
+                # A newer snapshot was queued meanwhile - it will be written by its own thread
+                if self._tokens.get(name) != token:
+                    return
+                self._write(name, self._serialize(data))
+
+        threading.Thread(target=write, name=f"snapshot-{name}", daemon=True).start()
+        return True
+
+    def remember(self, name, token):
+        """Treat token as already written, e.g. for data that was just restored from the snapshot"""
+        with self._lock:
+            self._tokens[name] = token
+
+    def delete(self, name):
+        with self._lock:
+            self._tokens.pop(name, None)
+        self.path(name).unlink(missing_ok=True)
+
+    def prune(self, prefix=''):
+        """Remove snapshots (starting with prefix) older than max_age_seconds; returns the number removed"""
+        cutoff = time.time() - self.max_age_seconds
+        removed = 0
+        for path in self.directory.glob(f"{prefix}*.json.gz"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
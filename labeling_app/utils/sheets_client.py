@@ -0,0 +1,327 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+from .profiling import timer
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+QUOTA_MESSAGES = ('429', 'quota', 'rate limit', 'rate_limit', 'resource_exhausted', 'too many requests')
+
+
+def is_retryable_error(error):
+    """True for Sheets quota/rate-limit errors and transient server errors"""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) in RETRY_STATUS_CODES:
+        return True
+    message = str(error).lower()
+    return any(text in message for text in QUOTA_MESSAGES)
+
+
+def payload_bytes(df):
+    """Approximate wire size of a sheet as CSV"""
+    if df is None or len(df) == 0:
+        return 0
+    return len(df.to_csv(index=False).encode('utf-8'))
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate_per_minute` sustained requests with bursts up to `capacity`"""
+
+    def __init__(self, rate_per_minute=60, capacity=10, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting if the bucket is empty. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+
+class _Mutation:
+    def __init__(self, fn):
+        self.fn = fn
+        self.future = Future()
+
+
+class _Append:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.future = Future()
+
+
+class SheetsClient:
+    """Quota-aware wrapper around a connection with read(worksheet, ttl) and update(worksheet, data).
+
+    - Identical concurrent reads of a worksheet share one upstream request.
+    - Writes are queued as mutations (functions DataFrame -> DataFrame). The
+      first caller to find the queue idle becomes the leader and flushes every
+      queued mutation with one read and one update of the worksheet. Appends
+      are queued the same way and flushed with one append call.
+    - Every upstream call takes a token from a shared bucket, and quota or
+      transient server errors are retried with exponential backoff and jitter.
+
+    Works with GSheetsConnection or any object with the same two methods,
+    such as a local fake backend.
+    """
+
+    def __init__(self, conn, rate_per_minute=60, burst=10, max_retries=5,
+                 backoff_base=1.0, backoff_max=32.0, sleep=time.sleep, clock=time.monotonic):
+        self.conn = conn
+        self.bucket = TokenBucket(rate_per_minute, burst, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.stats = {
+            'reads': 0, 'writes': 0, 'upstream_calls': 0, 'retries': 0, 'failures': 0,
+            'coalesced_reads': 0, 'mutations': 0, 'appends': 0, 'batches': 0,
+            'bytes_read': 0, 'bytes_written': 0, 'throttled_seconds': 0.0,
+        }
+        self._stats_lock = threading.Lock()
+        self._inflight = {}  # worksheet -> Future of the running read
+        self._inflight_lock = threading.Lock()
+        self._queues = {}  # worksheet -> list of pending _Mutation
+        self._flushing = set()
+        self._queue_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _call(self, method, **kwargs):
+        """One upstream call with rate limiting and retries"""
+        with timer(f"sheets.{method}"):
+            return self._call_with_retries(method, **kwargs)
+
+    def _call_with_retries(self, method, **kwargs):
+        attempt = 0
+        while True:
+            self._count('throttled_seconds', self.bucket.acquire())
+            self._count('upstream_calls')
+            try:
+                return getattr(self.conn, method)(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    self._count('failures')
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                self.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                self._count('retries')
+
+    def _read_upstream(self, worksheet):
+        df = self._call('read', worksheet=worksheet, ttl=0)
+        self._count('bytes_read', payload_bytes(df))
+        return df
+
+    def read(self, worksheet):
+        """Current contents of a worksheet; concurrent callers share one request"""
+        self._count('reads')
+        with self._inflight_lock:
+            future = self._inflight.get(worksheet)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[worksheet] = future
+            else:
+                self._count('coalesced_reads')
+
+        if owner:
+            try:
+                future.set_result(self._read_upstream(worksheet))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(worksheet, None)
+        return future.result().copy()
+
+    def update(self, worksheet, data):
+        """Overwrite a worksheet"""
+        self._count('writes')
+        self._count('bytes_written', payload_bytes(data))
+        return self._call('update', worksheet=worksheet, data=data)
+
+    def append(self, worksheet, rows):
+        """Append row dicts without reading the worksheet.
+
+        Appends are applied server-side, so concurrent appends from any number
+        of sessions or processes never overwrite each other. Appends queued
+        while another one is written go out together in the next call.
+        Connections without append() fall back to a batched mutation.
+        """
+        if not hasattr(self.conn, 'append'):
+            return self.mutate(worksheet, append_rows(rows))
+        self._count('appends')
+        entry = _Append(rows)
+        key = ('append', worksheet)
+        with self._queue_lock:
+            self._queues.setdefault(key, []).append(entry)
+            leader = key not in self._flushing
+            if leader:
+                self._flushing.add(key)
+        if leader:
+            self._flush_appends(worksheet)
+        return entry.future.result()
+
+    def mutate(self, worksheet, fn):
+        """Apply fn(df) -> df to a worksheet, batched with other queued mutations.
+
+        Blocks until the batch is written and returns the worksheet as written.
+        Raises the error of fn, or of the upstream read/write, if it failed.
+        """
+        self._count('mutations')
+        mutation = _Mutation(fn)
+        with self._queue_lock:
+            self._queues.setdefault(worksheet, []).append(mutation)
+            leader = worksheet not in self._flushing
+            if leader:
+                self._flushing.add(worksheet)
+        if leader:
+            self._flush(worksheet)
+        return mutation.future.result()
+
+    def _flush(self, worksheet):
+        # Drain until no mutations are left; callers arriving meanwhile join the next batch
+        while True:
+            with self._queue_lock:
+                batch = self._queues.pop(worksheet, [])
+                if not batch:
+                    self._flushing.discard(worksheet)
+                    return
+            self._count('batches')
+            try:
+                df = self._read_upstream(worksheet)
+                applied = []
+                for mutation in batch:
+                    try:
+                        df = mutation.fn(df)
+                        applied.append(mutation)
+                    except Exception as e:
+                        mutation.future.set_exception(e)
+                if applied:
+                    self.update(worksheet, df)
+                for mutation in applied:
+                    mutation.future.set_result(df)
+            except Exception as e:
+                for mutation in batch:
+                    if not mutation.future.done():
+                        mutation.future.set_exception(e)
+
+    def _flush_appends(self, worksheet):
+        key = ('append', worksheet)
+        while True:
+            with self._queue_lock:
+                batch = self._queues.pop(key, [])
+                if not batch:
+                    self._flushing.discard(key)
+                    return
+            self._count('batches')
+            rows = [row for entry in batch for row in entry.rows]
+            try:
+                self._count('writes')
+                self._count('bytes_written', payload_bytes(pd.DataFrame(rows)))
+                result = self._call('append', worksheet=worksheet, rows=rows)
+            except Exception as e:
+                for entry in batch:
+                    entry.future.set_exception(e)
+            else:
+                for entry in batch:
+                    entry.future.set_result(result)
+
+
+def _cell(value):
+    """Sheets cell value for a Python value"""
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return ''
+    if hasattr(value, 'item'):
+        return value.item()  # numpy scalar
+    return value
+
+
+class GSheetsAppendAdapter:
+    """GSheetsConnection plus append(worksheet, rows) through the Sheets values.append API.
+
+    Values are written in the order of the worksheet's header row; columns
+    the header does not have yet are added to it first. The header is
+    re-read before it is extended and only the missing names are written
+    after it, so columns another process added are kept. Worksheets are
+    opened through the client of st-gsheets-connection 0.1.0 (pinned in
+    requirements.txt), which has no public accessor for them.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._headers = {}
+
+    def read(self, worksheet, ttl=None, **kwargs):
+        return self.conn.read(worksheet=worksheet, ttl=ttl, **kwargs)
+
+    def update(self, worksheet, data, **kwargs):
+        self._headers.pop(worksheet, None)
+        return self.conn.update(worksheet=worksheet, data=data, **kwargs)
+
+    def append(self, worksheet, rows):
+        sheet = self.conn.client._select_worksheet(worksheet=worksheet)
+        columns = list(dict.fromkeys(col for row in rows for col in row))
+        header = self._headers.get(worksheet)
+        if header is None or any(col not in header for col in columns):
+            header = self._extend_header(sheet, columns)
+        self._headers[worksheet] = header
+        sheet.append_rows([[_cell(row.get(col)) for col in header] for row in rows], value_input_option='RAW')
+
+    @staticmethod
+    def _extend_header(sheet, columns, attempts=3):
+        """Current header row with the missing columns appended to it"""
+        from gspread.utils import rowcol_to_a1
+        for _ in range(attempts):
+            header = sheet.row_values(1)
+            missing = [col for col in columns if col not in header]
+            if not missing:
+                return header
+            # Write only the new names, right after the header as it is now
+            start = rowcol_to_a1(1, len(header) + 1)
+            sheet.update(range_name=start, values=[missing], value_input_option='RAW')
+            # Another process may have extended the header at the same time - check the result
+            header = sheet.row_values(1)
+            if all(col in header for col in columns):
+                return header
+        raise RuntimeError(f"Could not add columns {missing} to the header of {sheet.title}")
+
+
+def append_rows(rows):
+    """Mutation appending a list of row dicts"""
+    def apply(df):
+        new_rows = pd.DataFrame(rows)
+        if df is None or df.empty:
+            return new_rows
+        return pd.concat([df, new_rows], ignore_index=True)
+    return apply
+
+
+def delete_rows(match):
+    """Mutation dropping rows where match(df) is True"""
+    def apply(df):
+        if df is None or df.empty:
+            return df
+        return df[~match(df)]
+    return apply
@@ -0,0 +1,32 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiling import activate, current_recorder, record, timer
+
+
+def load_concurrently(loaders, thread_setup=None, max_workers=None):
+    """Run independent loaders at the same time and return {name: result}.
+
+    Startup is mostly waiting on Sheets and disk, so the sources are fetched
+    in a thread pool and the wall time approaches the slowest loader instead
+    of the sum. thread_setup() runs in each worker before its loader, e.g. to
+    attach the Streamlit script context. Each loader is timed as
+    'startup.<name>' for the calling session; an exception from a loader is
+    raised here after the others have finished.
+    """
+    if not loaders:
+        return {}
+    recorder = current_recorder()
+
+    def run(name, loader):
+        if thread_setup is not None:
+            thread_setup()
+        activate(recorder)
+        with timer(f"startup.{name}"):
+            return loader()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or len(loaders), thread_name_prefix='startup') as pool:
+        futures = {name: pool.submit(run, name, loader) for name, loader in loaders.items()}
+    record('startup', time.perf_counter() - start)
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,565 @@
+import ast
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+
+ANNOTATION_COLUMNS = [
+    'annotation_id', 'revision', 'village_name', 'village_type', 'is_treatment',
+    'ward_name', 'geometry', 'timestamp', 'original_vertex_count', 'deleted',
+]
+REFERENCE_VILLAGE_COLUMNS = ['village_name', 'ward_name', 'district_name', 'region_name']
+STORAGE_BACKENDS = ['sheets', 'sqlite', 'geopackage', 'duckdb']
+
+LEGACY_ID_NAMESPACE = uuid.UUID('6f1c3f0e-6d0b-4c55-9a5e-2b1f4b0c7a11')
+
+
+class ConflictError(Exception):
+    """A save or delete lost against a concurrent change by another labeler"""
+
+
+def new_annotation_id():
+    return uuid.uuid4().hex
+
+
+def legacy_annotation_id(village_name, ward_name, timestamp):
+    """Stable id for rows saved before annotations had ids"""
+    return uuid.uuid5(LEGACY_ID_NAMESPACE, f"{village_name}|{ward_name}|{timestamp}").hex
+
+
+def _is_missing(value):
+    return value is None or (not isinstance(value, (dict, list)) and pd.isna(value)) or str(value).strip() in ['', 'nan', 'None']
+
+
+def _db_value(value):
+    """Python value for a database parameter (no NaN or numpy scalars)"""
+    if not isinstance(value, (dict, list)) and pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _is_true(value):
+    return str(value).strip().upper() in ['TRUE', 'YES', '1', 'T', '1.0']
+
+
+# ============================================================================
+# ROW <-> ANNOTATION CONVERSION
+# ============================================================================
+def parse_geometry(value):
+    """GeoJSON geometry dict from a dict, JSON string or Python dict string"""
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Unexpected geometry type: {type(value)}")
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        # Older rows were written as Python dict strings
+        return ast.literal_eval(value)
+
+
+def resolve_revisions(df):
+    """Latest revision of every annotation, without deleted ones, plus conflict messages.
+
+    Rows are append-only: an edit or delete is a new row with the same
+    annotation_id and a higher revision. Two rows with the same id and
+    revision are concurrent changes of the same base revision - a delete
+    wins over an edit, otherwise the row written last wins. Live annotations
+    of the same village under different ids (two labelers mapping it at
+    once) are kept and reported.
+    """
+    df = df.reset_index(drop=True).copy()
+    for col in ['annotation_id', 'revision', 'deleted']:
+        if col not in df.columns:
+            df[col] = None
+    missing_id = df['annotation_id'].map(_is_missing)
+    df.loc[missing_id, 'annotation_id'] = [
+        legacy_annotation_id(row.get('village_name'), row.get('ward_name'), row.get('timestamp'))
+        for _, row in df[missing_id].iterrows()
+    ]
+    df['revision'] = pd.to_numeric(df['revision'], errors='coerce').fillna(0).astype(int)
+    df['deleted'] = df['deleted'].map(_is_true)
+    df['_row'] = range(len(df))
+
+    problems = []
+    clashes = df[df.duplicated(['annotation_id', 'revision'], keep=False)]
+    for (annotation_id, revision), group in clashes.groupby(['annotation_id', 'revision']):
+        if group.drop(columns=['_row', 'timestamp'], errors='ignore').astype(str).drop_duplicates().shape[0] > 1:
+            problems.append(
+                f"Conflict: {len(group)} concurrent changes to {group['village_name'].iloc[0]} "
+                f"({group['ward_name'].iloc[0]}) revision {revision} - kept {'the delete' if group['deleted'].any() else 'the last one'}"
+            )
+
+    latest = df.sort_values(['annotation_id', 'revision', 'deleted', '_row']).drop_duplicates('annotation_id', keep='last')
+    live = latest[~latest['deleted']].sort_values('_row')
+
+    village_keys = live[['village_name', 'ward_name']].astype(str)
+    for (village, ward), group in live[village_keys.duplicated(keep=False)].groupby(['village_name', 'ward_name']):
+        problems.append(f"Conflict: {village} ({ward}) was mapped {len(group)} times by different labelers")
+
+    return live.drop(columns='_row'), problems
+
+
+def rows_to_annotations(df):
+    """Annotation dicts from stored rows, plus messages for rows that were skipped or conflicted"""
+    annotations, problems = [], []
+    if df is None or df.empty:
+        return annotations, problems
+    if 'geometry' not in df.columns:
+        return annotations, ["No geometry column found"]
+
+    df, problems = resolve_revisions(df)
+    for idx, row in df.iterrows():
+        ann = row.to_dict()
+        if _is_missing(ann['geometry']):
+            problems.append(f"Row {idx}: Skipping - empty geometry")
+            continue
+        try:
+            ann['geometry'] = parse_geometry(ann['geometry'])
+        except (ValueError, SyntaxError) as e:
+            problems.append(f"Row {idx} ({ann.get('village_name', 'Unknown')}): Could not parse geometry - {str(e)[:100]}")
+            continue
+
+        if 'is_treatment' in ann:
+            ann['is_treatment'] = _is_true(ann['is_treatment'])
+        ann['revision'] = int(ann['revision'])
+        # Only set for annotations saved since geometries are normalized
+        if 'original_vertex_count' in ann:
+            ann['original_vertex_count'] = None if _is_missing(ann['original_vertex_count']) else int(float(ann['original_vertex_count']))
+        del ann['deleted']
+        annotations.append(ann)
+    return annotations, problems
+
+
+def annotations_to_rows(annotations, columns=None):
+    """DataFrame of annotations with geometry serialized as GeoJSON text"""
+    rows = []
+    for ann in annotations:
+        row = dict(ann)
+        row['geometry'] = json.dumps(row['geometry']) if row.get('geometry') is not None else None
+        row.setdefault('annotation_id', new_annotation_id())
+        row.setdefault('revision', 0)
+        row.setdefault('deleted', False)
+        rows.append(row)
+    df = pd.DataFrame(rows, columns=None if rows else ANNOTATION_COLUMNS)
+    if columns is not None:
+        df = df.reindex(columns=columns)
+    return df
+
+
+def tombstone(annotation):
+    """Row marking an annotation as deleted at the next revision"""
+    return {
+        'annotation_id': annotation['annotation_id'],
+        'revision': int(annotation.get('revision', 0)) + 1,
+        'village_name': annotation.get('village_name'),
+        'ward_name': annotation.get('ward_name'),
+        'deleted': True,
+    }
+
+
+def normalize_reference_villages(df):
+    """Lower-case column names and strip whitespace from text values"""
+    if df is None or df.empty:
+        return None
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            df[col] = df[col].str.strip()
+    return df
+
+
+# ============================================================================
+# STORES
+# ============================================================================
+class AnnotationStore:
+    """Persistence for annotations and the reference village list.
+
+    Every annotation carries an annotation_id and a revision. add_annotation
+    and delete_annotation never overwrite rows written by other labelers;
+    they raise ConflictError when a concurrent change wins, and
+    load_annotations() reports conflicts it resolved among its problems.
+    load_annotations() returns (annotations, problems) and raises if the
+    store cannot be read, so callers can keep their current copy.
+    """
+
+    name = 'store'
+
+    def load_annotations(self):
+        raise NotImplementedError
+
+    def iter_annotations(self, chunk_size=500):
+        """Annotations in lists of up to chunk_size, for exports that should not hold everything at once"""
+        annotations, _ = self.load_annotations()
+        for start in range(0, len(annotations), chunk_size):
+            yield annotations[start:start + chunk_size]
+
+    def load_reference_villages(self):
+        raise NotImplementedError
+
+    def add_annotations(self, annotations):
+        """Save a batch in one write; returns the annotations rejected as conflicts"""
+        raise NotImplementedError
+
+    def add_annotation(self, annotation):
+        if self.add_annotations([annotation]):
+            raise ConflictError(f"{annotation.get('village_name')} ({annotation.get('ward_name')}) was already mapped by another labeler")
+
+    def delete_annotation(self, annotation):
+        """Delete the revision of an annotation the caller has seen"""
+        raise NotImplementedError
+
+    def replace_annotations(self, annotations):
+        """Overwrite all annotations (bulk import/migration)"""
+        raise NotImplementedError
+
+    def replace_reference_villages(self, df):
+        """Overwrite the reference village list (bulk import/migration)"""
+        raise NotImplementedError
+
+
+class SheetsStore(AnnotationStore):
+    """Google Sheets through a SheetsClient - annotations in Sheet1, reference list in ReferenceVillages.
+
+    Saves and deletes are appended rows (deletes as tombstones), so no save
+    rewrites the worksheet and concurrent labelers cannot drop each other's
+    rows. Conflicting changes are resolved and reported on load.
+    """
+
+    name = 'Google Sheets'
+
+    def __init__(self, client, annotation_worksheet='Sheet1', reference_worksheet='ReferenceVillages'):
+        self.client = client
+        self.annotation_worksheet = annotation_worksheet
+        self.reference_worksheet = reference_worksheet
+
+    def load_annotations(self):
+        return rows_to_annotations(self.client.read(self.annotation_worksheet))
+
+    def load_reference_villages(self):
+        return normalize_reference_villages(self.client.read(self.reference_worksheet))
+
+    def add_annotations(self, annotations):
+        rows = annotations_to_rows(annotations, ANNOTATION_COLUMNS).to_dict('records')
+        self.client.append(self.annotation_worksheet, rows)
+        return []  # duplicates are resolved and reported on load
+
+    def delete_annotation(self, annotation):
+        self.client.append(self.annotation_worksheet, [tombstone(annotation)])
+
+    def replace_annotations(self, annotations):
+        self.client.update(self.annotation_worksheet, annotations_to_rows(annotations, ANNOTATION_COLUMNS))
+
+    def replace_reference_villages(self, df):
+        self.client.update(self.reference_worksheet, df)
+
+
+def _upgrade_annotation_table(db, rowid_column):
+    """Add id/revision/vertex count columns to tables created before they existed and give old rows ids"""
+    existing = {row[1] for row in db.execute("PRAGMA table_info('annotations')").fetchall()}
+    if 'annotation_id' not in existing:
+        db.execute("ALTER TABLE annotations ADD COLUMN annotation_id TEXT")
+    if 'revision' not in existing:
+        db.execute("ALTER TABLE annotations ADD COLUMN revision INTEGER DEFAULT 0")
+    if 'original_vertex_count' not in existing:
+        db.execute("ALTER TABLE annotations ADD COLUMN original_vertex_count INTEGER")
+    rows = db.execute(
+        f"SELECT {rowid_column}, village_name, ward_name, timestamp FROM annotations WHERE annotation_id IS NULL"
+    ).fetchall()
+    for rowid, village_name, ward_name, timestamp in rows:
+        db.execute(
+            f"UPDATE annotations SET annotation_id = ?, revision = 0 WHERE {rowid_column} = ?",
+            (legacy_annotation_id(village_name, ward_name, timestamp), rowid)
+        )
+
+
+class SQLStore(AnnotationStore):
+    """Annotations and reference villages as tables in a local SQL database.
+
+    Geometries are stored as GeoJSON text. A save only inserts if the village
+    has not been mapped yet and a delete only applies to the revision the
+    labeler saw, both checked in the same statement, so concurrent labelers
+    never need a lock. Subclasses provide the connection.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connection() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS annotations (
+                    annotation_id TEXT, revision INTEGER DEFAULT 0,
+                    village_name TEXT, village_type TEXT, is_treatment BOOLEAN,
+                    ward_name TEXT, geometry TEXT, timestamp TEXT, original_vertex_count INTEGER
+                )
+            """)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS reference_villages (
+                    village_name TEXT, ward_name TEXT, district_name TEXT, region_name TEXT
+                )
+            """)
+            _upgrade_annotation_table(db, 'rowid')
+            db.execute("CREATE UNIQUE INDEX IF NOT EXISTS annotations_id ON annotations (annotation_id)")
+
+    @contextmanager
+    def _connection(self):
+        raise NotImplementedError
+
+    def _query(self, db, sql):
+        raise NotImplementedError
+
+    def _insert(self, db, table, df):
+        columns = ', '.join(df.columns)
+        placeholders = ', '.join('?' for _ in df.columns)
+        rows = [tuple(_db_value(v) for v in row) for row in df.itertuples(index=False)]
+        if rows:
+            db.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
+
+    def load_annotations(self):
+        with self._connection() as db:
+            return rows_to_annotations(self._query(db, "SELECT * FROM annotations"))
+
+    def iter_annotations(self, chunk_size=500):
+        # Rows have unique ids here, so each chunk resolves on its own
+        with self._connection() as db:
+            cursor = db.execute("SELECT * FROM annotations")
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows_to_annotations(pd.DataFrame(rows, columns=columns))[0]
+
+    def load_reference_villages(self):
+        with self._connection() as db:
+            return normalize_reference_villages(self._query(db, "SELECT * FROM reference_villages"))
+
+    def add_annotations(self, annotations):
+        columns = [col for col in ANNOTATION_COLUMNS if col != 'deleted']
+        rows = annotations_to_rows(annotations, columns)
+        insert = (
+            f"INSERT INTO annotations ({', '.join(columns)}) "
+            f"SELECT {', '.join('?' for _ in columns)} "
+            "WHERE NOT EXISTS (SELECT 1 FROM annotations WHERE village_name = ? AND ward_name = ?) "
+            "RETURNING annotation_id"
+        )
+        conflicts = []
+        with self._connection() as db:
+            for ann, row in zip(annotations, rows.itertuples(index=False)):
+                values = tuple(_db_value(v) for v in row)
+                if not db.execute(insert, values + (row.village_name, row.ward_name)).fetchall():
+                    conflicts.append(ann)
+        return conflicts
+
+    def delete_annotation(self, annotation):
+        with self._connection() as db:
+            deleted = db.execute(
+                "DELETE FROM annotations WHERE annotation_id = ? AND revision = ? RETURNING annotation_id",
+                (annotation['annotation_id'], int(annotation.get('revision', 0)))
+            ).fetchall()
+        if not deleted:
+            raise ConflictError(f"{annotation.get('village_name')} was changed or deleted by another labeler")
+
+    def replace_annotations(self, annotations):
+        columns = [col for col in ANNOTATION_COLUMNS if col != 'deleted']
+        with self._connection() as db:
+            db.execute("DELETE FROM annotations")
+            self._insert(db, 'annotations', annotations_to_rows(annotations, columns))
+
+    def replace_reference_villages(self, df):
+        with self._connection() as db:
+            db.execute("DELETE FROM reference_villages")
+            self._insert(db, 'reference_villages', df.reindex(columns=REFERENCE_VILLAGE_COLUMNS))
+
+
+class SQLiteStore(SQLStore):
+    """Local SQLite file"""
+
+    name = 'SQLite'
+
+    @contextmanager
+    def _connection(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _query(self, db, sql):
+        return pd.read_sql_query(sql, db)
+
+
+class DuckDBStore(SQLStore):
+    """Local DuckDB database - one connection per process, serialized by a lock"""
+
+    name = 'DuckDB'
+
+    def __init__(self, path):
+        import duckdb
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = duckdb.connect(str(path))
+        super().__init__(path)
+
+    @contextmanager
+    def _connection(self):
+        with self._lock:
+            db = self._db.cursor()
+            db.begin()
+            try:
+                yield db
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    def _query(self, db, sql):
+        return db.execute(sql).df()
+
+
+class GeoPackageStore(AnnotationStore):
+    """GeoPackage file with an `annotations` polygon layer, readable directly in QGIS/ArcGIS.
+
+    Writes are serialized by a lock within the app process; the mapped and
+    revision checks match those of SQLStore.
+    """
+
+    name = 'GeoPackage'
+
+    def __init__(self, path, crs='EPSG:4326'):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.crs = crs
+        self._lock = threading.Lock()
+        if 'annotations' in self._layers():
+            with self._sqlite() as db:
+                _upgrade_annotation_table(db, 'fid')
+
+    @contextmanager
+    def _sqlite(self):
+        # GeoPackage is SQLite; updates and deletes of non-geometry columns need no spatial functions
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _layers(self):
+        import pyogrio
+        if not self.path.exists():
+            return set()
+        return {name for name, _ in pyogrio.list_layers(self.path)}
+
+    def _to_geodataframe(self, annotations):
+        import geopandas as gpd
+        from shapely.geometry import shape
+        df = annotations_to_rows(annotations, [col for col in ANNOTATION_COLUMNS if col != 'deleted'])
+        return gpd.GeoDataFrame(
+            df.drop(columns='geometry'),
+            geometry=[shape(ann['geometry']) for ann in annotations],
+            crs=self.crs
+        )
+
+    def _write(self, annotations, append):
+        import pyogrio
+        if not annotations and append:
+            return
+        pyogrio.write_dataframe(
+            self._to_geodataframe(annotations), self.path, layer='annotations',
+            driver='GPKG', geometry_type='Unknown', append=append and 'annotations' in self._layers()
+        )
+
+    def _read(self, skip_features=0, max_features=None):
+        import pyogrio
+        gdf = pyogrio.read_dataframe(self.path, layer='annotations', skip_features=skip_features, max_features=max_features)
+        df = pd.DataFrame(gdf.drop(columns='geometry'))
+        df['geometry'] = [geom.__geo_interface__ if geom is not None else None for geom in gdf.geometry]
+        return rows_to_annotations(df)
+
+    def load_annotations(self):
+        if 'annotations' not in self._layers():
+            return [], []
+        return self._read()
+
+    def iter_annotations(self, chunk_size=500):
+        import pyogrio
+        if 'annotations' not in self._layers():
+            return
+        n_features = pyogrio.read_info(self.path, layer='annotations')['features']
+        for start in range(0, n_features, chunk_size):
+            yield self._read(skip_features=start, max_features=chunk_size)[0]
+
+    def load_reference_villages(self):
+        import pyogrio
+        if 'reference_villages' not in self._layers():
+            return None
+        return normalize_reference_villages(pyogrio.read_dataframe(self.path, layer='reference_villages'))
+
+    def add_annotations(self, annotations):
+        with self._lock:
+            mapped = set()
+            if 'annotations' in self._layers():
+                with self._sqlite() as db:
+                    mapped = set(db.execute("SELECT village_name, ward_name FROM annotations").fetchall())
+            new, conflicts = [], []
+            for ann in annotations:
+                key = (ann.get('village_name'), ann.get('ward_name'))
+                if key in mapped:
+                    conflicts.append(ann)
+                else:
+                    mapped.add(key)
+                    new.append({**ann, 'annotation_id': ann.get('annotation_id') or new_annotation_id()})
+            self._write(new, append=True)
+        return conflicts
+
+    def delete_annotation(self, annotation):
+        with self._lock:
+            deleted = []
+            if 'annotations' in self._layers():
+                with self._sqlite() as db:
+                    deleted = db.execute(
+                        "DELETE FROM annotations WHERE annotation_id = ? AND revision = ? RETURNING annotation_id",
+                        (annotation['annotation_id'], int(annotation.get('revision', 0)))
+                    ).fetchall()
+        if not deleted:
+            raise ConflictError(f"{annotation.get('village_name')} was changed or deleted by another labeler")
+
+    def replace_annotations(self, annotations):
+        with self._lock:
+            self._write(annotations, append=False)
+
+    def replace_reference_villages(self, df):
+        import pyogrio
+        with self._lock:
+            pyogrio.write_dataframe(
+                pd.DataFrame(df).reindex(columns=REFERENCE_VILLAGE_COLUMNS), self.path,
+                layer='reference_villages', driver='GPKG'
+            )
+
+
+def create_store(backend, path=None, sheets_client=None):
+    """Store for a backend name from STORAGE_BACKENDS"""
+    if backend == 'sheets':
+        if sheets_client is None:
+            raise ValueError("The sheets backend needs a SheetsClient")
+        return SheetsStore(sheets_client)
+    if path is None:
+        raise ValueError(f"The {backend} backend needs a file path")
+    if backend == 'sqlite':
+        return SQLiteStore(path)
+    if backend == 'geopackage':
+        return GeoPackageStore(path)
+    if backend == 'duckdb':
+        return DuckDBStore(path)
+    raise ValueError(f"Unknown storage backend '{backend}', expected one of {STORAGE_BACKENDS}")
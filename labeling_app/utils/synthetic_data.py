@@ -0,0 +1,123 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import box, mapping
+
+from .fake_sheets import FakeSheetsConnection
+from .sheets_client import SheetsClient
+from .storage import create_store, new_annotation_id
+
+
+ORIGIN = (36.5, -7.5)        # south-west corner of the synthetic wards (Morogoro)
+WARD_SIZE_DEG = 0.1          # about 11 km
+DISTRICTS = ['Mvomero', 'Kilosa', 'Morogoro Rural']
+
+
+def make_wards(n_wards, columns=5):
+    """Square treatment wards on a grid, with the columns of relevant_wards_with_flags.geojson"""
+    rows = []
+    for i in range(n_wards):
+        x0 = ORIGIN[0] + (i % columns) * WARD_SIZE_DEG
+        y0 = ORIGIN[1] + (i // columns) * WARD_SIZE_DEG
+        rows.append({
+            'ward_name': f"Ward{i:03d}",
+            'dist_name': DISTRICTS[i % len(DISTRICTS)],
+            'reg_name': 'Morogoro',
+            'is_treatment': True,
+            'is_program_control': False,
+            'is_program_region': True,
+            'is_adjacent_region': False,
+            'geometry': box(x0, y0, x0 + WARD_SIZE_DEG, y0 + WARD_SIZE_DEG),
+        })
+    return gpd.GeoDataFrame(rows, crs='EPSG:4326')
+
+
+def make_reference_villages(ward_gdf, villages_per_ward):
+    """Reference village list with villages_per_ward villages in every ward"""
+    return pd.DataFrame([
+        {'village_name': f"{ward['ward_name']} Village {j:04d}", 'ward_name': ward['ward_name'],
+         'district_name': ward['dist_name'], 'region_name': ward['reg_name']}
+        for _, ward in ward_gdf.iterrows()
+        for j in range(villages_per_ward)
+    ])
+
+
+def village_polygon(ward_geometry, index, per_row=25):
+    """Small square for the index-th village, laid out on a grid inside its ward"""
+    minx, miny, maxx, maxy = ward_geometry.bounds
+    step = (maxx - minx) / per_row
+    x0 = minx + (index % per_row) * step
+    y0 = miny + (index // per_row % per_row) * step
+    return box(x0 + step * 0.2, y0 + step * 0.2, x0 + step * 0.8, y0 + step * 0.8)
+
+
+def make_annotations(ward_gdf, reference_df, n_annotations):
+    """Treatment-area annotations for the first n_annotations reference villages"""
+    geometries = ward_gdf.set_index('ward_name').geometry
+    timestamp = datetime.now().isoformat()
+    annotations = []
+    for _, village in reference_df.head(n_annotations).iterrows():
+        position = int(village['village_name'].rsplit(' ', 1)[-1])
+        polygon = village_polygon(geometries[village['ward_name']], position)
+        annotations.append({
+            'annotation_id': new_annotation_id(),
+            'revision': 0,
+            'village_name': village['village_name'],
+            'village_type': 'Treatment',
+            'is_treatment': True,
+            'ward_name': village['ward_name'],
+            'geometry': mapping(polygon),
+            'timestamp': timestamp,
+        })
+    return annotations
+
+
+def make_dataset(n_annotations, n_wards=20, unmapped_fraction=0.1):
+    """Wards, reference villages and annotations - every ward keeps some villages unmapped"""
+    ward_gdf = make_wards(n_wards)
+    mapped_per_ward = -(-n_annotations // n_wards)
+    villages_per_ward = mapped_per_ward + max(1, int(mapped_per_ward * unmapped_fraction))
+    reference_df = make_reference_villages(ward_gdf, villages_per_ward)
+    # Interleave wards so the mapped villages are spread over all of them
+    reference_df = reference_df.assign(_order=reference_df.groupby('ward_name').cumcount())
+    reference_df = reference_df.sort_values(['_order', 'ward_name'], kind='stable').drop(columns='_order').reset_index(drop=True)
+    annotations = make_annotations(ward_gdf, reference_df, n_annotations)
+    return ward_gdf, reference_df, annotations
+
+
+def write_data_dir(data_dir, ward_gdf, reference_df):
+    """Files the DataLoader reads from data/processed (wards and the village list fallback)"""
+    processed = Path(data_dir) / "processed"
+    processed.mkdir(parents=True, exist_ok=True)
+    ward_gdf.to_file(processed / "relevant_wards_with_flags.geojson", driver='GeoJSON')
+    treatment_villages = [
+        f"{row['village_name']} village in {row['ward_name']} ward, {row['district_name']} district"
+        for _, row in reference_df.iterrows()
+    ]
+    with open(processed / "region_coverage_plan.json", 'w') as f:
+        json.dump({'program_locations': {'treatment_villages': treatment_villages}}, f)
+    return processed
+
+
+def write_app_data(data_dir, ward_gdf, reference_df, annotations, backend='sheets', store_file=None):
+    """Lay a dataset out the way the app reads it; returns the LABELING_APP_* environment overrides.
+
+    The sheets backend is written as one CSV per worksheet for FakeSheetsConnection,
+    other backends as a database at data_dir/processed/store_file.
+    """
+    processed = write_data_dir(data_dir, ward_gdf, reference_df)
+    env = {'LABELING_APP_DATA_DIR': str(data_dir), 'LABELING_APP_STORAGE_BACKEND': backend}
+    if backend == 'sheets':
+        conn = FakeSheetsConnection()
+        store = create_store('sheets', sheets_client=SheetsClient(conn))
+    else:
+        store = create_store(backend, path=processed / store_file)
+    store.replace_annotations(annotations)
+    store.replace_reference_villages(reference_df)
+    if backend == 'sheets':
+        conn.to_directory(Path(data_dir) / "sheets")
+        env['LABELING_APP_FAKE_SHEETS'] = str(Path(data_dir) / "sheets")
+    return env
@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import mercantile
+
+
+class TileCache:
+    """Cache-first store for raster basemap tiles in a local SQLite (MBTiles-style) file.
+
+    Tiles are served from the file when present. Missing tiles, and tiles
+    older than max_age_days, are fetched from the upstream URL template of
+    their source; if the upstream is unreachable a stale tile is still
+    served, so the map keeps working offline.
+    """
+
+    def __init__(self, path, sources, max_age_days=90, timeout=10, user_agent='rubeho-mapper-tile-cache'):
+        self.path = path
+        self.sources = sources  # source name -> URL template with {z}, {x}, {y}
+        self.max_age_seconds = max_age_days * 86400
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._connection()
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS tiles (
+                source TEXT, zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                tile_data BLOB, fetched_at REAL,
+                PRIMARY KEY (source, zoom_level, tile_column, tile_row)
+            )
+        """)
+        db.commit()
+
+    def _connection(self):
+        # One connection per thread; WAL lets readers continue while a prefetch writes
+        if not hasattr(self._local, 'db'):
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return self._local.db
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def read(self, source, z, x, y):
+        """Cached (tile_data, fetched_at), or (None, None)"""
+        tms_row = (2 ** z) - 1 - y
+        row = self._connection().execute(
+            "SELECT tile_data, fetched_at FROM tiles WHERE source = ? AND zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (source, z, x, tms_row)
+        ).fetchone()
+        return row if row else (None, None)
+
+    def write(self, source, z, x, y, data):
+        """Store a tile"""
+        tms_row = (2 ** z) - 1 - y
+        db = self._connection()
+        db.execute(
+            "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?)",
+            (source, z, x, tms_row, data, time.time())
+        )
+        db.commit()
+
+    def fetch_upstream(self, source, z, x, y):
+        """Download a tile from the source's upstream URL"""
+        url = self.sources[source].format(z=z, x=x, y=y)
+        request = urllib.request.Request(url, headers={'User-Agent': self.user_agent})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.read()
+
+    def get_tile(self, source, z, x, y):
+        """Tile bytes, cache first, or None if neither cache nor upstream has it"""
+        data, fetched_at = self.read(source, z, x, y)
+        if data is not None and time.time() - fetched_at < self.max_age_seconds:
+            self._count('hits')
+            return data
+
+        try:
+            fresh = self.fetch_upstream(source, z, x, y)
+        except Exception:
+            self._count('errors')
+            if data is not None:
+                self._count('stale')
+            return data
+
+        self._count('misses')
+        self.write(source, z, x, y, fresh)
+        return fresh
+
+    def has_tile(self, source, z, x, y):
+        """True if a fresh copy of the tile is cached"""
+        data, fetched_at = self.read(source, z, x, y)
+        return data is not None and time.time() - fetched_at < self.max_age_seconds
+
+    def provider(self, source):
+        """Adapter exposing one source through the get_tile(z, x, y) interface of TileServer"""
+        return CachedTileSource(self, source)
+
+
+class CachedTileSource:
+    """One basemap source of a TileCache"""
+
+    def __init__(self, cache, source):
+        self.cache = cache
+        self.source = source
+
+    def get_tile(self, z, x, y):
+        return self.cache.get_tile(self.source, z, x, y)
+
+
+def prefetch_tiles(cache, bboxes, zooms, sources=None, workers=8):
+    """Seed the cache for lon/lat bboxes at the given zoom levels.
+
+    Tiles already cached are skipped, so the job can be re-run to resume.
+    Only prefetch from providers whose terms allow offline caching.
+    Returns counts of fetched, skipped and failed tiles.
+    """
+    sources = sources or list(cache.sources)
+    tiles = set()
+    for west, south, east, north in bboxes:
+        tiles.update(mercantile.tiles(west, south, east, north, zooms=list(zooms)))
+    tiles = sorted(tiles, key=lambda t: (t.z, t.x, t.y))
+
+    jobs = [
+        (source, tile) for source in sources for tile in tiles
+        if not cache.has_tile(source, tile.z, tile.x, tile.y)
+    ]
+    counts = {'requested': len(tiles) * len(sources), 'skipped': len(tiles) * len(sources) - len(jobs), 'fetched': 0, 'failed': 0}
+    print(f"Prefetching {len(jobs)} tiles ({counts['skipped']} already cached)")
+
+    def _fetch(job):
+        source, tile = job
+        return cache.get_tile(source, tile.z, tile.x, tile.y) is not None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, ok in enumerate(executor.map(_fetch, jobs), start=1):
+            counts['fetched' if ok else 'failed'] += 1
+            if i % 1000 == 0:
+                print(f"  {i}/{len(jobs)} tiles processed")
+
+    print(f"Prefetch done: {counts['fetched']} fetched, {counts['failed']} failed, {counts['skipped']} skipped")
+    return counts
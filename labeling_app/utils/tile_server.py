@@ -0,0 +1,81 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def guess_content_type(data):
+    """Content type of a tile from its leading bytes"""
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:3] == b'\xff\xd8\xff':
+        return 'image/jpeg'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/x-protobuf'
+
+
+class TileServer:
+    """Small local HTTP endpoint serving /<source>/<z>/<x>/<y>.<ext> from registered tile providers"""
+
+    def __init__(self, host='127.0.0.1', port=8765):
+        self.host = host
+        self.port = port
+        self.sources = {}
+        self._server = None
+
+    def add_source(self, name, provider):
+        """Register anything with a get_tile(z, x, y) method under a URL prefix"""
+        self.sources[name] = provider
+
+    def url_template(self, name, public_url=None, extension='pbf'):
+        """Leaflet URL template for a registered source"""
+        base = public_url or f"http://{self.host}:{self.port}"
+        return f"{base}/{name}/{{z}}/{{x}}/{{y}}.{extension}"
+
+    def start(self):
+        """Start serving in a daemon thread"""
+        if self._server is not None:
+            return self
+        sources = self.sources
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.split('?')[0].strip('/').split('/')
+                if len(parts) != 4 or parts[0] not in sources:
+                    self.send_error(404)
+                    return
+                try:
+                    z, x, y = int(parts[1]), int(parts[2]), int(parts[3].split('.')[0])
+                    data = sources[parts[0]].get_tile(z, x, y)
+                except ValueError:
+                    self.send_error(404)
+                    return
+                except Exception as e:
+                    self.send_error(500, str(e))
+                    return
+                if data is None:
+                    self.send_response(204)
+                    self.send_header('Access-Control-Allow-Origin', '*')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', guess_content_type(data))
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_header('Cache-Control', 'public, max-age=3600')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
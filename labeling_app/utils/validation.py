@@ -0,0 +1,153 @@
+import time
+
+import numpy as np
+import pyproj
+import shapely
+from shapely.geometry import shape
+from shapely.strtree import STRtree
+
+
+def _metric_transformer(metric_crs):
+    """Vectorised lon/lat -> metric coordinate function for shapely.transform"""
+    transformer = pyproj.Transformer.from_crs('EPSG:4326', metric_crs, always_xy=True)
+
+    def _transform(coords):
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+
+    return _transform
+
+
+def project_ward_geometries(ward_gdf, metric_crs):
+    """Project ward boundaries to a metric CRS, keyed by ward name and prepared for fast predicates"""
+    if ward_gdf is None or ward_gdf.empty:
+        return {}
+
+    ward_metric = ward_gdf.to_crs(metric_crs)
+    ward_geometries = {}
+    for ward_name, group in ward_metric.groupby('ward_name'):
+        geom = shapely.union_all(group.geometry.values)
+        shapely.prepare(geom)
+        ward_geometries[ward_name] = geom
+    return ward_geometries
+
+
+class AnnotationValidator:
+    """Spatial QC for newly drawn polygons against saved annotations and ward boundaries"""
+
+    def __init__(self, ward_geometries, metric_crs, max_overlap_pct=10, min_inside_ward_pct=90,
+                 min_area_km2=0.01, max_area_km2=50, min_compactness=0.05, reference_index=None):
+        self.ward_geometries = ward_geometries
+        self.reference_index = reference_index  # ReferenceIndex - flags villages not on the reference list
+        self.max_overlap_pct = max_overlap_pct
+        self.min_inside_ward_pct = min_inside_ward_pct
+        self.min_area_km2 = min_area_km2
+        self.max_area_km2 = max_area_km2
+        self.min_compactness = min_compactness
+        self._to_metric = _metric_transformer(metric_crs)
+
+        # Annotation index - rebuilt only when the annotation set version changes
+        self.version = None
+        self._tree = None
+        self._geometries = []
+        self._records = []
+
+    def to_metric(self, geometry):
+        """Convert a GeoJSON-like geometry dict (EPSG:4326) to a metric shapely geometry"""
+        return shapely.transform(shape(geometry), self._to_metric)
+
+    def index_annotations(self, annotations, version=None):
+        """Build the STRtree over saved annotations, skipping the rebuild if the version is unchanged"""
+        if version is not None and version == self.version and self._tree is not None:
+            return
+
+        geometries = []
+        records = []
+        for ann in annotations:
+            if not ann.get('geometry'):
+                continue
+            try:
+                geom = shapely.make_valid(self.to_metric(ann['geometry']))
+            except Exception as e:
+                print(f"Skipping annotation {ann.get('village_name', 'Unknown')} in QC index: {e}")
+                continue
+            shapely.prepare(geom)
+            geometries.append(geom)
+            records.append({
+                'village_name': ann.get('village_name', 'Unknown'),
+                'ward_name': ann.get('ward_name', 'Unknown'),
+            })
+
+        self._geometries = geometries
+        self._records = records
+        self._tree = STRtree(geometries) if geometries else None
+        self.version = version
+
+    def validate(self, geometry, ward_name=None, village_name=None):
+        """Run all spatial checks for a drawn polygon and return metrics plus human-readable flags"""
+        start = time.perf_counter()
+        flags = []
+
+        raw = self.to_metric(geometry)
+        is_valid = bool(shapely.is_valid(raw))
+        validity_reason = shapely.is_valid_reason(raw)
+        if not is_valid:
+            flags.append(f"Polygon is not valid ({validity_reason}) - redraw without crossing edges")
+        geom = raw if is_valid else shapely.make_valid(raw)
+
+        area_km2 = geom.area / 1e6
+        perimeter = geom.length
+        compactness = (4 * np.pi * geom.area / perimeter ** 2) if perimeter > 0 else 0.0
+        vertex_count = int(shapely.get_num_coordinates(raw))
+
+        if area_km2 < self.min_area_km2:
+            flags.append(f"Area is very small ({area_km2:.3f} km²)")
+        elif area_km2 > self.max_area_km2:
+            flags.append(f"Area is very large ({area_km2:.1f} km²)")
+        if compactness < self.min_compactness:
+            flags.append(f"Shape is unusually elongated (compactness {compactness:.2f})")
+
+        if (self.reference_index is not None and village_name and ward_name
+                and (village_name, ward_name) not in self.reference_index):
+            flags.append(f"{village_name} is not on the reference village list for {ward_name} ward")
+
+        # Fraction of the polygon inside the selected ward
+        inside_ward_pct = None
+        ward_geom = self.ward_geometries.get(ward_name) if ward_name else None
+        if ward_geom is not None and geom.area > 0:
+            if ward_geom.contains(geom):
+                inside_ward_pct = 100.0
+            else:
+                inside_ward_pct = geom.intersection(ward_geom).area / geom.area * 100
+            if inside_ward_pct < self.min_inside_ward_pct:
+                flags.append(f"Only {inside_ward_pct:.0f}% of the polygon lies inside {ward_name} ward")
+
+        # Overlap with other villages' polygons
+        overlaps = []
+        if self._tree is not None and geom.area > 0:
+            for idx in self._tree.query(geom, predicate='intersects'):
+                record = self._records[idx]
+                if record['village_name'] == village_name and record['ward_name'] == ward_name:
+                    continue
+                overlap_pct = geom.intersection(self._geometries[idx]).area / geom.area * 100
+                if overlap_pct <= 0:
+                    continue
+                overlaps.append({**record, 'overlap_pct': round(overlap_pct, 1)})
+            overlaps.sort(key=lambda o: o['overlap_pct'], reverse=True)
+            for overlap in overlaps:
+                if overlap['overlap_pct'] > self.max_overlap_pct:
+                    flags.append(
+                        f"Overlaps {overlap['overlap_pct']:.0f}% with {overlap['village_name']} ({overlap['ward_name']})"
+                    )
+
+        return {
+            'is_valid': is_valid,
+            'validity_reason': validity_reason,
+            'area_km2': area_km2,
+            'compactness': compactness,
+            'vertex_count': vertex_count,
+            'inside_ward_pct': inside_ward_pct,
+            'overlaps': overlaps,
+            'flags': flags,
+            'elapsed_ms': (time.perf_counter() - start) * 1000,
+        }
@@ -0,0 +1,235 @@
+import gzip
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import mapbox_vector_tile
+import mercantile
+import numpy as np
+import pyproj
+import shapely
+from shapely.strtree import STRtree
+
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64  # in tile units, avoids seams at tile edges
+
+
+def _to_web_mercator():
+    """Vectorised lon/lat -> EPSG:3857 coordinate function for shapely.transform"""
+    transformer = pyproj.Transformer.from_crs('EPSG:4326', 'EPSG:3857', always_xy=True)
+
+    def _transform(coords):
+        x, y = transformer.transform(coords[:, 0], coords[:, 1])
+        return np.column_stack([x, y])
+
+    return _transform
+
+
+def _clean_properties(properties):
+    """Keep only property values MVT can encode"""
+    cleaned = {}
+    for key, value in properties.items():
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            continue
+        if isinstance(value, (bool, np.bool_)):
+            cleaned[key] = bool(value)
+        elif isinstance(value, (int, np.integer)):
+            cleaned[key] = int(value)
+        elif isinstance(value, (float, np.floating)):
+            cleaned[key] = float(value)
+        else:
+            cleaned[key] = str(value)
+    return cleaned
+
+
+class VectorTileSource:
+    """Encodes Mapbox Vector Tiles on demand from in-memory layers.
+
+    Layers are projected to web mercator once and indexed with an STRtree,
+    so encoding a tile only clips the features that touch it. The last
+    max_cached_tiles encoded tiles are kept (least recently used dropped
+    first) until a layer changes.
+    """
+
+    def __init__(self, max_cached_tiles=2048):
+        self.layers = {}
+        self.version = 0
+        self.max_cached_tiles = max_cached_tiles
+        self._to_mercator = _to_web_mercator()
+        self._tile_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add_layer(self, name, geometries, properties, minzoom=0, maxzoom=16):
+        """Add or replace a layer from EPSG:4326 shapely geometries and matching property dicts"""
+        geometries = shapely.transform(np.asarray(geometries), self._to_mercator)
+        valid = ~shapely.is_missing(geometries) & ~shapely.is_empty(geometries)
+        geometries = geometries[valid]
+        properties = [_clean_properties(p) for p, keep in zip(properties, valid) if keep]
+        with self._lock:
+            self.layers[name] = {
+                'geometries': geometries,
+                'properties': properties,
+                'tree': STRtree(geometries),
+                'minzoom': minzoom,
+                'maxzoom': maxzoom,
+            }
+            self.version += 1
+            self._tile_cache = OrderedDict()
+
+    def add_geodataframe_layer(self, name, gdf, columns, minzoom=0, maxzoom=16):
+        """Add a layer from a GeoDataFrame, keeping only the given attribute columns"""
+        gdf = gdf.to_crs('EPSG:4326')
+        properties = gdf[columns].to_dict('records')
+        self.add_layer(name, gdf.geometry.values, properties, minzoom=minzoom, maxzoom=maxzoom)
+
+    def clear_cache(self):
+        """Drop all encoded tiles"""
+        with self._lock:
+            self._tile_cache = OrderedDict()
+
+    def bounds(self):
+        """Lon/lat bbox covering all layers"""
+        all_bounds = [shapely.total_bounds(layer['geometries']) for layer in self.layers.values() if len(layer['geometries'])]
+        if not all_bounds:
+            return None
+        all_bounds = np.array(all_bounds)
+        transformer = pyproj.Transformer.from_crs('EPSG:3857', 'EPSG:4326', always_xy=True)
+        west, south = transformer.transform(all_bounds[:, 0].min(), all_bounds[:, 1].min())
+        east, north = transformer.transform(all_bounds[:, 2].max(), all_bounds[:, 3].max())
+        return west, south, east, north
+
+    def get_tile(self, z, x, y):
+        """Encoded MVT bytes for a tile, or None if no layer has features in it"""
+        key = (z, x, y)
+        with self._lock:
+            if key in self._tile_cache:
+                self._tile_cache.move_to_end(key)
+                return self._tile_cache[key]
+            layers = dict(self.layers)
+            version = self.version
+
+        tile_bounds = mercantile.xy_bounds(x, y, z)
+        tile_size = tile_bounds.right - tile_bounds.left
+        buffer = tile_size * TILE_BUFFER / TILE_EXTENT
+        clip_box = shapely.box(
+            tile_bounds.left - buffer, tile_bounds.bottom - buffer,
+            tile_bounds.right + buffer, tile_bounds.top + buffer
+        )
+        # Drop detail that is below one tile unit at this zoom
+        tolerance = tile_size / TILE_EXTENT
+
+        encoded_layers = []
+        for name, layer in layers.items():
+            if not (layer['minzoom'] <= z <= layer['maxzoom']):
+                continue
+            indices = layer['tree'].query(clip_box, predicate='intersects')
+            if len(indices) == 0:
+                continue
+            clipped = shapely.intersection(layer['geometries'][indices], clip_box)
+            clipped = shapely.simplify(clipped, tolerance, preserve_topology=True)
+            features = [
+                {'geometry': geom, 'properties': layer['properties'][idx]}
+                for geom, idx in zip(clipped, indices)
+                if not geom.is_empty
+            ]
+            if features:
+                encoded_layers.append({'name': name, 'features': features})
+
+        data = None
+        if encoded_layers:
+            data = mapbox_vector_tile.encode(
+                encoded_layers,
+                default_options={
+                    'quantize_bounds': (tile_bounds.left, tile_bounds.bottom, tile_bounds.right, tile_bounds.top),
+                    'extents': TILE_EXTENT,
+                },
+            )
+        with self._lock:
+            # A layer replaced while encoding makes this tile stale - serve it but don't keep it
+            if self.version == version:
+                self._tile_cache[key] = data
+                while len(self._tile_cache) > self.max_cached_tiles:
+                    self._tile_cache.popitem(last=False)
+        return data
+
+
+def build_mbtiles(source, path, minzoom, maxzoom, name='rubeho', bounds=None):
+    """Pre-generate all non-empty tiles of a source into a single MBTiles file.
+
+    Tiles are gzip-compressed as the MBTiles spec expects for pbf tiles and
+    written in batches, so memory stays flat regardless of the tile count.
+    Returns the number of tiles written.
+    """
+    bounds = bounds or source.bounds()
+    if bounds is None:
+        raise ValueError("Vector tile source has no features")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+    db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    db.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+    db.executemany("INSERT INTO metadata VALUES (?, ?)", [
+        ('name', name),
+        ('format', 'pbf'),
+        ('minzoom', str(minzoom)),
+        ('maxzoom', str(maxzoom)),
+        ('bounds', ','.join(f"{b:.6f}" for b in bounds)),
+    ])
+
+    written = 0
+    batch = []
+    for tile in mercantile.tiles(*bounds, zooms=range(minzoom, maxzoom + 1)):
+        data = source.get_tile(tile.z, tile.x, tile.y)
+        if data is None:
+            continue
+        # MBTiles uses TMS row numbering
+        tms_row = (2 ** tile.z) - 1 - tile.y
+        batch.append((tile.z, tile.x, tms_row, gzip.compress(data)))
+        if len(batch) >= 500:
+            db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", batch)
+            db.commit()
+            written += len(batch)
+            batch = []
+        # Encoded tiles are not needed again while building the archive
+        source.clear_cache()
+    if batch:
+        db.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", batch)
+        written += len(batch)
+    db.commit()
+    db.close()
+    print(f"Wrote {written} tiles (z{minzoom}-{maxzoom}) to {path}")
+    return written
+
+
+class MBTilesReader:
+    """Serves tiles from an MBTiles archive"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite connections cannot be shared across server threads
+        if not hasattr(self._local, 'db'):
+            self._local.db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return self._local.db
+
+    def get_tile(self, z, x, y):
+        """Uncompressed tile bytes, or None if the tile is not in the archive"""
+        tms_row = (2 ** z) - 1 - y
+        row = self._connection().execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, tms_row)
+        ).fetchone()
+        if row is None:
+            return None
+        data = row[0]
+        if data[:2] == b'\x1f\x8b':
+            data = gzip.decompress(data)
+        return data
+
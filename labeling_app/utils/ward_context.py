@@ -0,0 +1,77 @@
+import json
+import math
+
+
+ALL_TREATMENT_WARDS = 'All Treatment Wards'
+WARD_TOOLTIP_FIELDS = ['ward_name', 'dist_name', 'reg_name']
+
+
+def zoom_for_bounds(bounds, map_size_px=800, min_zoom=6, max_zoom=15):
+    """Web-mercator zoom level at which a lon/lat bbox fits in the map"""
+    minx, miny, maxx, maxy = bounds
+    span = max(maxx - minx, maxy - miny)
+    if span <= 0:
+        return max_zoom
+    zoom = math.floor(math.log2(map_size_px * 360 / (256 * span)))
+    return int(min(max(zoom, min_zoom), max_zoom))
+
+
+def _bounds_context(bounds):
+    """Bbox, center and zoom for a set of bounds"""
+    bounds = [float(b) for b in bounds]
+    return {
+        'bounds': bounds,
+        'center': [(bounds[1] + bounds[3]) / 2, (bounds[0] + bounds[2]) / 2],
+        'zoom': zoom_for_bounds(bounds),
+    }
+
+
+def _serialize_wards(gdf, simplify_tolerance):
+    """Simplified GeoJSON dict with only the tooltip attributes"""
+    subset = gdf[WARD_TOOLTIP_FIELDS + ['geometry']].copy()
+    if simplify_tolerance:
+        subset['geometry'] = subset.geometry.simplify(simplify_tolerance, preserve_topology=True)
+    return json.loads(subset.to_json(drop_id=True))
+
+
+def build_ward_contexts(ward_gdf, simplify_tolerance=0.0001):
+    """Precompute map context for every ward, keyed by ward name.
+
+    Each entry holds bbox, center, zoom, district/region, the treatment flag
+    and pre-serialized simplified GeoJSON, so switching wards is a dict lookup.
+    An extra entry under ALL_TREATMENT_WARDS covers all treatment wards.
+    """
+    contexts = {}
+    if ward_gdf is None or ward_gdf.empty:
+        return contexts
+
+    for ward_name, group in ward_gdf.groupby('ward_name', sort=True):
+        first = group.iloc[0]
+        contexts[ward_name] = {
+            **_bounds_context(group.total_bounds),
+            'ward_name': ward_name,
+            'district': first['dist_name'],
+            'region': first['reg_name'],
+            'is_treatment': bool(group['is_treatment'].any()),
+            'geojson': _serialize_wards(group, simplify_tolerance),
+        }
+
+    treatment_gdf = ward_gdf[ward_gdf['is_treatment'] == True]
+    overview_gdf = treatment_gdf if not treatment_gdf.empty else ward_gdf
+    contexts[ALL_TREATMENT_WARDS] = {
+        **_bounds_context(overview_gdf.total_bounds),
+        'ward_name': ALL_TREATMENT_WARDS,
+        'district': None,
+        'region': None,
+        'is_treatment': False,
+        'geojson': _serialize_wards(treatment_gdf, simplify_tolerance) if not treatment_gdf.empty else None,
+    }
+    return contexts
+
+
+def treatment_ward_names(contexts):
+    """Sorted names of all treatment wards in the context table"""
+    return sorted(
+        name for name, context in contexts.items()
+        if name != ALL_TREATMENT_WARDS and context['is_treatment']
+    )
@@ -0,0 +1,57 @@
+# %%
+# # Vector Tiles for the Labeling App
+# Pre-generate Mapbox Vector Tiles for the relevant wards and the 500m grid into one MBTiles archive.
+# The labeling app serves this file from a local tile endpoint when USE_VECTOR_TILES is enabled.
+
+# %%
+# Setup and imports
+import geopandas as gpd
+from pathlib import Path
+import sys
+import time
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import *
+from labeling_app.utils.vector_tiles import VectorTileSource, build_mbtiles
+
+# Define data paths
+DATA_DIR = project_root / "data"
+PROCESSED_DATA_DIR = DATA_DIR / "processed"
+TILE_FILE = PROCESSED_DATA_DIR / VECTOR_TILE_FILE
+
+print(f"Zoom levels: {VECTOR_TILE_MINZOOM}-{VECTOR_TILE_MAXZOOM} (grid from {VECTOR_TILE_GRID_MINZOOM})")
+print(f"Output: {TILE_FILE}")
+
+# %%
+# Load wards and grid
+gdf_wards = gpd.read_file(PROCESSED_DATA_DIR / "relevant_wards_with_flags.geojson").to_crs(WEB_CRS)
+print(f"Loaded {len(gdf_wards)} wards")
+
+grid_file = PROCESSED_DATA_DIR / "grid_500m_parent.geojson"
+if not grid_file.exists():
+    grid_file = PROCESSED_DATA_DIR / "grid_program_regions_only.geojson"
+gdf_grid = gpd.read_file(grid_file).to_crs(WEB_CRS)
+print(f"Loaded {len(gdf_grid)} grid cells from {grid_file.name}")
+
+# %%
+# Build the tile source
+source = VectorTileSource()
+source.add_geodataframe_layer(
+    'wards', gdf_wards,
+    ['ward_name', 'dist_name', 'reg_name', 'is_treatment', 'is_program_control'],
+    minzoom=VECTOR_TILE_MINZOOM, maxzoom=VECTOR_TILE_MAXZOOM
+)
+source.add_geodataframe_layer(
+    'grid', gdf_grid,
+    ['grid_id', 'is_treatment_ward', 'is_program_region', 'is_adjacent_region'],
+    minzoom=VECTOR_TILE_GRID_MINZOOM, maxzoom=VECTOR_TILE_MAXZOOM
+)
+
+# %%
+# Write the MBTiles archive
+start = time.perf_counter()
+n_tiles = build_mbtiles(source, TILE_FILE, VECTOR_TILE_MINZOOM, VECTOR_TILE_MAXZOOM, name='rubeho_layers')
+print(f"Built {n_tiles} tiles in {time.perf_counter() - start:.1f}s ({TILE_FILE.stat().st_size / 1e6:.1f} MB)")
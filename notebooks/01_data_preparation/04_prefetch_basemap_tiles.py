@@ -0,0 +1,38 @@
+# %%
+# # Basemap Tile Prefetch
+# Seed the labeling app's offline basemap cache for all treatment wards at the labeling zoom levels.
+# Re-running resumes: tiles that are already cached and fresh are skipped.
+
+# %%
+# Setup and imports
+import geopandas as gpd
+from pathlib import Path
+import sys
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import *
+from labeling_app.utils.tile_cache import TileCache, prefetch_tiles
+
+# Define data paths
+DATA_DIR = project_root / "data"
+PROCESSED_DATA_DIR = DATA_DIR / "processed"
+CACHE_FILE = PROCESSED_DATA_DIR / TILE_CACHE_FILE
+
+print(f"Cache file: {CACHE_FILE}")
+print(f"Sources: {BASEMAP_PREFETCH_SOURCES}, zooms: {BASEMAP_PREFETCH_ZOOMS}")
+
+# %%
+# Treatment ward bounding boxes
+gdf_wards = gpd.read_file(PROCESSED_DATA_DIR / "relevant_wards_with_flags.geojson").to_crs(WEB_CRS)
+treatment_wards = gdf_wards[gdf_wards['is_treatment'] == True]
+bboxes = [tuple(geom.bounds) for geom in treatment_wards.geometry]
+print(f"{len(bboxes)} treatment wards to prefetch")
+
+# %%
+# Prefetch
+tile_cache = TileCache(CACHE_FILE, BASEMAP_SOURCES, max_age_days=TILE_CACHE_MAX_AGE_DAYS)
+counts = prefetch_tiles(tile_cache, bboxes, BASEMAP_PREFETCH_ZOOMS, sources=BASEMAP_PREFETCH_SOURCES)
+print(f"Cache size: {CACHE_FILE.stat().st_size / 1e6:.1f} MB")
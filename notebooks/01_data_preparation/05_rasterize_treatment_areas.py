@@ -0,0 +1,95 @@
+# %%
+# # Treatment Area Rasterization
+# Burn the labeled village polygons onto the 500m parent and 100m child grids of 02_create_grids.py.
+# Per cell: treated_fraction (share of the cell inside a labeled village) and village_id, as GeoTIFFs
+# on the grid's affine transform plus a table of the treated cells keyed by grid_id.
+
+# %%
+# Setup and imports
+import geopandas as gpd
+import pandas as pd
+from pathlib import Path
+import sys
+import time
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import *
+from src.grid_raster import Grid, number_villages, rasterize_treatment, treated_cells, write_raster
+
+# Define data paths
+DATA_DIR = project_root / "data"
+PROCESSED_DATA_DIR = DATA_DIR / "processed"
+RASTER_DIR = PROCESSED_DATA_DIR / TREATMENT_RASTER_DIR
+RASTER_DIR.mkdir(parents=True, exist_ok=True)
+
+print(f"Mode: {TREATMENT_RASTER_MODE} (supersample {TREATMENT_RASTER_SUPERSAMPLE})")
+print(f"Output: {RASTER_DIR}")
+
+# %%
+# Grids - same origin and extent as the fishnet in 02_create_grids.py
+gdf_wards = gpd.read_file(PROCESSED_DATA_DIR / "relevant_wards_with_flags.geojson").to_crs(TARGET_CRS)
+grid_500m = Grid.from_bounds(gdf_wards.total_bounds, GRID_SIZE_LARGE, TARGET_CRS)
+grid_100m = grid_500m.refine(GRID_SIZE_LARGE // GRID_SIZE_SMALL)
+grids = {GRID_SIZE_LARGE: grid_500m, GRID_SIZE_SMALL: grid_100m}
+for size, grid in grids.items():
+    print(f"{size}m grid: {grid.width} x {grid.height} = {grid.width * grid.height:,} cells")
+
+# %%
+# Labeled treatment areas - exported from the labeling app's Progress Tracker
+export_files = [PROCESSED_DATA_DIR / EXPORT_PARQUET_FILE, PROCESSED_DATA_DIR / EXPORT_GEOJSON_FILE]
+export_file = next((path for path in export_files if path.exists()), None)
+if export_file is None:
+    raise FileNotFoundError(f"No labeled treatment areas found - export them from the labeling app first ({[p.name for p in export_files]})")
+
+if export_file.suffix == '.parquet':
+    gdf_treatment = gpd.read_parquet(export_file)
+else:
+    gdf_treatment = gpd.read_file(export_file)
+if gdf_treatment.crs is None:
+    gdf_treatment = gdf_treatment.set_crs(WEB_CRS)
+gdf_treatment = gdf_treatment.to_crs(TARGET_CRS)
+print(f"Loaded {len(gdf_treatment)} treatment areas from {export_file.name}")
+
+village_ids, village_lookup = number_villages(gdf_treatment)
+village_lookup.to_csv(RASTER_DIR / "village_ids.csv", index=False)
+print(f"{len(village_lookup)} villages numbered 1-{len(village_lookup)} (0 = no village)")
+
+# %%
+# Rasterize at both grid levels
+rasterized = {}
+for size, grid in grids.items():
+    start = time.perf_counter()
+    treated_fraction, village_id = rasterize_treatment(
+        gdf_treatment, grid, mode=TREATMENT_RASTER_MODE, village_ids=village_ids,
+        supersample=TREATMENT_RASTER_SUPERSAMPLE
+    )
+    rasterized[size] = (treated_fraction, village_id)
+    treated_area_km2 = treated_fraction.sum() * grid.cell_size ** 2 / 1e6
+    print(f"{size}m: {(treated_fraction > 0).sum():,} treated cells, {treated_area_km2:.1f} km² "
+          f"in {time.perf_counter() - start:.1f}s")
+
+print(f"Polygon area: {gdf_treatment.union_all().area / 1e6:.1f} km²")
+
+# %%
+# Save rasters and the treated-cell tables
+for size, (treated_fraction, village_id) in rasterized.items():
+    grid = grids[size]
+    write_raster(RASTER_DIR / f"treated_fraction_{size}m.tif", treated_fraction, grid)
+    write_raster(RASTER_DIR / f"village_id_{size}m.tif", village_id, grid, nodata=0)
+    cells = treated_cells(grid, treated_fraction, village_id).merge(village_lookup, on='village_id', how='left')
+    cells.to_parquet(RASTER_DIR / f"treated_cells_{size}m.parquet", index=False)
+    print(f"Saved {size}m rasters and {len(cells):,} treated cells")
+
+# %%
+# Compare with the ward-level flag of the 500m grid
+grid_file = PROCESSED_DATA_DIR / "grid_500m_parent.geojson"
+if grid_file.exists():
+    gdf_grid = gpd.read_file(grid_file, columns=['grid_id', 'is_treatment_ward'])
+    cells_500m = pd.read_parquet(RASTER_DIR / f"treated_cells_{GRID_SIZE_LARGE}m.parquet")
+    gdf_grid['is_treated'] = gdf_grid['grid_id'].isin(cells_500m['grid_id'])
+    print(pd.crosstab(gdf_grid['is_treatment_ward'], gdf_grid['is_treated']))
+    print(f"{gdf_grid['is_treatment_ward'].sum():,} cells in treatment wards, "
+          f"{gdf_grid['is_treated'].sum():,} touching a labeled village")
@@ -0,0 +1,92 @@
+# %%
+# # Spillover Buffers
+# Distance from every 500m and 100m grid cell to the nearest treated cell and to the nearest programme-control
+# ward, by Euclidean distance transform on the rasters of 05_rasterize_treatment_areas.py, and eligibility
+# masks of control candidates outside each buffer radius in SPILLOVER_BUFFER_RADII.
+
+# %%
+# Setup and imports
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+import time
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import *
+from src.grid_raster import read_raster, rasterize_mask, write_raster
+from src.grid_distance import distance_to_mask, eligibility_masks
+
+# Define data paths
+DATA_DIR = project_root / "data"
+PROCESSED_DATA_DIR = DATA_DIR / "processed"
+RASTER_DIR = PROCESSED_DATA_DIR / TREATMENT_RASTER_DIR
+
+if max(SPILLOVER_BUFFER_RADII) > SPILLOVER_MAX_DISTANCE:
+    raise ValueError("SPILLOVER_MAX_DISTANCE must be at least the largest buffer radius")
+print(f"Buffer radii: {SPILLOVER_BUFFER_RADII} m (distances computed up to {SPILLOVER_MAX_DISTANCE} m)")
+
+# %%
+# Wards - study area and programme-control wards
+gdf_wards = gpd.read_file(PROCESSED_DATA_DIR / "relevant_wards_with_flags.geojson").to_crs(TARGET_CRS)
+control_wards = gdf_wards[gdf_wards['is_program_control'] == True]
+print(f"{len(gdf_wards)} wards, {len(control_wards)} programme-control wards")
+
+# %%
+# Distances and eligibility masks per grid level
+results = {}
+for size in [GRID_SIZE_LARGE, GRID_SIZE_SMALL]:
+    treated_fraction_file = RASTER_DIR / f"treated_fraction_{size}m.tif"
+    if not treated_fraction_file.exists():
+        raise FileNotFoundError(f"{treated_fraction_file.name} not found - run 05_rasterize_treatment_areas.py first")
+    treated_fraction, grid = read_raster(treated_fraction_file)
+
+    start = time.perf_counter()
+    study_mask = rasterize_mask(gdf_wards.geometry, grid)
+    control_mask = rasterize_mask(control_wards.geometry, grid)
+    distance_to_treated = distance_to_mask(
+        treated_fraction > 0, grid.cell_size, max_distance=SPILLOVER_MAX_DISTANCE, tile_cells=SPILLOVER_TILE_CELLS
+    )
+    distance_to_control = distance_to_mask(
+        control_mask, grid.cell_size, max_distance=SPILLOVER_MAX_DISTANCE, tile_cells=SPILLOVER_TILE_CELLS
+    )
+    eligible = eligibility_masks(distance_to_treated, SPILLOVER_BUFFER_RADII, study_mask)
+    results[size] = (grid, study_mask, distance_to_treated, distance_to_control, eligible)
+    print(f"{size}m: {grid.width} x {grid.height} cells in {time.perf_counter() - start:.1f}s")
+
+# %%
+# Save rasters - inf (farther than SPILLOVER_MAX_DISTANCE) is the nodata value of the distance rasters
+for size, (grid, study_mask, distance_to_treated, distance_to_control, eligible) in results.items():
+    write_raster(RASTER_DIR / f"distance_to_treated_{size}m.tif", distance_to_treated, grid, nodata=np.inf)
+    write_raster(RASTER_DIR / f"distance_to_control_ward_{size}m.tif", distance_to_control, grid, nodata=np.inf)
+    for radius, mask in eligible.items():
+        write_raster(RASTER_DIR / f"eligible_{radius}m_{size}m.tif", mask.astype(np.uint8), grid)
+    print(f"Saved {size}m distance rasters and {len(eligible)} eligibility masks")
+
+# %%
+# Per-cell table of the 500m grid, keyed by grid_id like grid_500m_parent.geojson
+grid, study_mask, distance_to_treated, distance_to_control, eligible = results[GRID_SIZE_LARGE]
+rows, cols = np.nonzero(study_mask)
+cells = pd.DataFrame({
+    'grid_id': grid.grid_ids(rows, cols),
+    'distance_to_treated_m': distance_to_treated[rows, cols],
+    'distance_to_control_ward_m': distance_to_control[rows, cols],
+    **{f"eligible_{radius}m": mask[rows, cols] for radius, mask in eligible.items()},
+})
+cells.to_parquet(RASTER_DIR / f"spillover_cells_{GRID_SIZE_LARGE}m.parquet", index=False)
+print(f"Saved {len(cells):,} study-area cells")
+
+# %%
+# Summary
+for size, (grid, study_mask, distance_to_treated, distance_to_control, eligible) in results.items():
+    cell_km2 = grid.cell_size ** 2 / 1e6
+    print(f"\n{size}m grid ({study_mask.sum():,} study-area cells):")
+    for radius, mask in eligible.items():
+        print(f"  outside {radius:>5} m of treatment: {mask.sum():>12,} cells ({mask.sum() * cell_km2:,.0f} km²)")
+    in_control = study_mask & (distance_to_control == 0)
+    print(f"  in programme-control wards: {in_control.sum():,} cells, "
+          f"{(in_control & eligible[max(eligible)]).sum():,} of them outside the largest buffer")
@@ -0,0 +1,49 @@
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+
+def distance_to_mask(mask, cell_size, max_distance=None, tile_cells=2048):
+    """Euclidean distance in metres from each cell centre to the nearest cell of mask (0 on the mask).
+
+    With max_distance the grid is processed in tiles of tile_cells x
+    tile_cells, each with a halo of max_distance around it: a mask cell
+    within max_distance of a tile cell always lies in its halo, so the tiled
+    result is exact up to max_distance. Farther cells are set to inf. Memory
+    then depends on the tile size instead of the grid, which keeps the 100m
+    grid of the whole study area tractable. Without max_distance the
+    transform runs on the whole grid in one piece.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return np.full(mask.shape, np.inf, dtype=np.float32)
+    if max_distance is None:
+        return distance_transform_edt(~mask, sampling=cell_size).astype(np.float32)
+
+    height, width = mask.shape
+    halo = int(np.ceil(max_distance / cell_size)) + 1
+    distance = np.full(mask.shape, np.inf, dtype=np.float32)
+    for row_off in range(0, height, tile_cells):
+        for col_off in range(0, width, tile_cells):
+            row_start, row_end = max(row_off - halo, 0), min(row_off + tile_cells + halo, height)
+            col_start, col_end = max(col_off - halo, 0), min(col_off + tile_cells + halo, width)
+            window = mask[row_start:row_end, col_start:col_end]
+            if not window.any():
+                continue
+            tile = distance_transform_edt(~window, sampling=cell_size)[
+                row_off - row_start:row_off - row_start + tile_cells,
+                col_off - col_start:col_off - col_start + tile_cells
+            ]
+            tile[tile > max_distance] = np.inf
+            distance[row_off:row_off + tile.shape[0], col_off:col_off + tile.shape[1]] = tile
+    return distance
+
+
+def eligibility_masks(distance_to_treated, radii, study_mask=None):
+    """{radius: cells farther than radius metres from any treated cell}, limited to study_mask"""
+    masks = {}
+    for radius in radii:
+        eligible = distance_to_treated > radius
+        if study_mask is not None:
+            eligible &= study_mask
+        masks[radius] = eligible
+    return masks
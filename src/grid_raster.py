@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+import rasterio
+from affine import Affine
+from rasterio import features
+from rasterio.windows import Window
+
+
+class Grid:
+    """Raster view of the fishnet grid from 02_create_grids.py.
+
+    The fishnet starts at the lower-left corner of the study area bounds and
+    numbers cells G_<col>_<row> with rows counted from the bottom; rasters
+    count rows from the top. refine() gives the nested child grid on the same
+    origin (500 m -> 100 m is factor 5).
+    """
+
+    def __init__(self, minx, miny, cell_size, width, height, crs=None):
+        self.minx = minx
+        self.miny = miny
+        self.cell_size = cell_size
+        self.width = width
+        self.height = height
+        self.crs = crs
+        self.transform = Affine(cell_size, 0, minx, 0, -cell_size, miny + height * cell_size)
+
+    @classmethod
+    def from_bounds(cls, bounds, cell_size, crs=None):
+        """Grid covering (minx, miny, maxx, maxy) the way create_fishnet_grid lays it out"""
+        minx, miny, maxx, maxy = bounds
+        width = int(np.ceil((maxx - minx) / cell_size))
+        height = int(np.ceil((maxy - miny) / cell_size))
+        return cls(minx, miny, cell_size, width, height, crs)
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def refine(self, factor):
+        return Grid(self.minx, self.miny, self.cell_size / factor, self.width * factor, self.height * factor, self.crs)
+
+    def window_of(self, bounds):
+        """Window of whole cells covering bounds, clipped to the grid (None if outside)"""
+        minx, miny, maxx, maxy = bounds
+        col_off = max(int(np.floor((minx - self.minx) / self.cell_size)), 0)
+        col_end = min(int(np.ceil((maxx - self.minx) / self.cell_size)), self.width)
+        top = self.miny + self.height * self.cell_size
+        row_off = max(int(np.floor((top - maxy) / self.cell_size)), 0)
+        row_end = min(int(np.ceil((top - miny) / self.cell_size)), self.height)
+        if col_end <= col_off or row_end <= row_off:
+            return None
+        return Window(col_off, row_off, col_end - col_off, row_end - row_off)
+
+    def window_transform(self, window):
+        return self.transform * Affine.translation(window.col_off, window.row_off)
+
+    def grid_ids(self, rows, cols):
+        """Fishnet grid_id of raster cells"""
+        return [f"G_{col:04d}_{self.height - 1 - row:04d}" for row, col in zip(rows, cols)]
+
+
+def number_villages(treatment_gdf, id_columns=('village_name', 'ward_name')):
+    """village_id 1..n per distinct village (0 is 'no village'), in id_columns order"""
+    keys = treatment_gdf[list(id_columns)].astype(str).agg('|'.join, axis=1)
+    villages = treatment_gdf.assign(_key=keys).drop_duplicates('_key').sort_values(list(id_columns))
+    lookup = villages[list(id_columns)].reset_index(drop=True)
+    lookup.insert(0, 'village_id', np.arange(1, len(lookup) + 1, dtype=np.int32))
+    ids = keys.map(dict(zip(villages['_key'], lookup['village_id']))).to_numpy(np.int32)
+    return ids, lookup
+
+
+def _shapes(geometries, values):
+    return [(geom, int(value)) for geom, value in zip(geometries, values) if geom is not None and not geom.is_empty]
+
+
+def rasterize_all_touched(geometries, village_ids, grid):
+    """Every cell a polygon touches is treated (fraction 1.0); the polygon drawn last sets village_id"""
+    village_id = features.rasterize(
+        _shapes(geometries, village_ids), out_shape=grid.shape, transform=grid.transform,
+        fill=0, all_touched=True, dtype='int32'
+    )
+    return (village_id > 0).astype(np.float32), village_id
+
+
+def rasterize_mask(geometries, grid, all_touched=False):
+    """Cells whose centre lies in any of the geometries (or that they touch, with all_touched)"""
+    shapes = [(geom, 1) for geom in geometries if geom is not None and not geom.is_empty]
+    if not shapes:
+        return np.zeros(grid.shape, dtype=bool)
+    return features.rasterize(
+        shapes, out_shape=grid.shape, transform=grid.transform, fill=0, all_touched=all_touched, dtype='uint8'
+    ).astype(bool)
+
+
+def _majority(cells, values, n_cells):
+    """Most frequent non-zero value per cell index (0 where a cell has none)"""
+    result = np.zeros(n_cells, dtype=np.int32)
+    if len(cells) == 0:
+        return result
+    base = np.int64(values.max()) + 1
+    keys, counts = np.unique(cells.astype(np.int64) * base + values, return_counts=True)
+    key_cells, key_values = keys // base, keys % base
+    # Within each cell the (value, count) pairs sorted by count - keep the last
+    order = np.lexsort((counts, key_cells))
+    last = np.r_[key_cells[order][1:] != key_cells[order][:-1], True]
+    result[key_cells[order][last]] = key_values[order][last]
+    return result
+
+
+def rasterize_area_fraction(geometries, village_ids, grid, supersample=10, chunk_cells=64):
+    """Share of each cell covered by treatment polygons, from cell-centre sampling on a supersampled grid.
+
+    The grid is burned in chunks of chunk_cells x chunk_cells and chunks
+    without polygons are skipped, so the fine grid never has to exist for the
+    whole study area. Overlapping polygons count once in treated_fraction; village_id is
+    the village covering most of the cell. The fraction is exact to about
+    1 / supersample of the cell width along polygon edges.
+    """
+    treated_fraction = np.zeros(grid.shape, dtype=np.float32)
+    village_id = np.zeros(grid.shape, dtype=np.int32)
+    shapes = _shapes(geometries, village_ids)
+    if not shapes:
+        return treated_fraction, village_id
+
+    bounds = np.array([geom.bounds for geom, _ in shapes])
+    extent = grid.window_of((bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max()))
+    if extent is None:
+        return treated_fraction, village_id
+
+    fine_cell = grid.cell_size / supersample
+    for row_off in range(extent.row_off, extent.row_off + extent.height, chunk_cells):
+        for col_off in range(extent.col_off, extent.col_off + extent.width, chunk_cells):
+            window = Window(
+                col_off, row_off,
+                min(chunk_cells, extent.col_off + extent.width - col_off),
+                min(chunk_cells, extent.row_off + extent.height - row_off)
+            )
+            left, top = grid.window_transform(window) * (0, 0)
+            right, bottom = left + window.width * grid.cell_size, top - window.height * grid.cell_size
+            overlaps = np.flatnonzero(
+                (bounds[:, 0] < right) & (bounds[:, 2] > left) & (bounds[:, 1] < top) & (bounds[:, 3] > bottom)
+            )
+            if not len(overlaps):
+                continue
+            in_chunk = [shapes[i] for i in overlaps]
+
+            fine = features.rasterize(
+                in_chunk, out_shape=(window.height * supersample, window.width * supersample),
+                transform=Affine(fine_cell, 0, left, 0, -fine_cell, top), fill=0, dtype='int32'
+            )
+            blocks = fine.reshape(window.height, supersample, window.width, supersample)
+            covered = (blocks > 0).mean(axis=(1, 3), dtype=np.float32)
+
+            rows, cols = np.nonzero(fine)
+            cells = (rows // supersample) * window.width + cols // supersample
+            majority = _majority(cells, fine[rows, cols], window.height * window.width)
+
+            target = (slice(window.row_off, window.row_off + window.height),
+                      slice(window.col_off, window.col_off + window.width))
+            treated_fraction[target] = covered
+            village_id[target] = majority.reshape(window.height, window.width)
+    return treated_fraction, village_id
+
+
+def rasterize_treatment(treatment_gdf, grid, mode='fraction', village_ids=None, supersample=10, chunk_cells=64):
+    """(treated_fraction, village_id) arrays on the grid for treatment polygons in the grid CRS.
+
+    mode 'all_touched' marks every cell a polygon touches as fully treated;
+    'fraction' gives the covered share of each cell. village_ids defaults to
+    number_villages(treatment_gdf).
+    """
+    if village_ids is None:
+        village_ids, _ = number_villages(treatment_gdf)
+    geometries = list(treatment_gdf.geometry)
+    if mode == 'all_touched':
+        return rasterize_all_touched(geometries, village_ids, grid)
+    if mode == 'fraction':
+        return rasterize_area_fraction(geometries, village_ids, grid, supersample, chunk_cells)
+    raise ValueError(f"Unknown rasterization mode '{mode}', expected 'all_touched' or 'fraction'")
+
+
+def treated_cells(grid, treated_fraction, village_id):
+    """Table of the treated cells: grid_id, raster row/col, treated_fraction and village_id"""
+    rows, cols = np.nonzero(treated_fraction > 0)
+    return pd.DataFrame({
+        'grid_id': grid.grid_ids(rows, cols),
+        'raster_row': rows,
+        'raster_col': cols,
+        'treated_fraction': treated_fraction[rows, cols],
+        'village_id': village_id[rows, cols],
+    })
+
+
+def write_raster(path, array, grid, nodata=None):
+    """Single-band, tiled and compressed GeoTIFF of a grid array"""
+    with rasterio.open(
+        path, 'w', driver='GTiff', height=grid.height, width=grid.width, count=1,
+        dtype=array.dtype, crs=grid.crs, transform=grid.transform, nodata=nodata,
+        tiled=True, compress='deflate', BIGTIFF='IF_SAFER'
+    ) as dst:
+        dst.write(array, 1)
+
+
+def read_raster(path):
+    """(array, Grid) of a single-band GeoTIFF written by write_raster"""
+    with rasterio.open(path) as src:
+        transform = src.transform
+        grid = Grid(transform.c, transform.f - src.height * transform.a, transform.a, src.width, src.height, src.crs)
+        return src.read(1), grid